@@ -0,0 +1,259 @@
+# app/admission.py
+
+"""
+Controle de admissão na frente do aggregator (por worker).
+
+Sem ele, com as cotas dos providers saturadas, cada /ask novo entra no
+asyncio.gather e espera até o deadline — e a latência de todos piora.
+Aqui as perguntas que precisam de LLM (o cache não passa por aqui)
+disputam ADMISSION_MAX_IN_FLIGHT vagas (64; 0 = desligado), numa fila FIFO
+de até ADMISSION_MAX_QUEUE (100).
+
+Antes de entrar, a espera é estimada pela latência observada das respostas
+(média móvel por modo, single e fusion; até haver medições,
+ADMISSION_INITIAL_LATENCY_SECONDS):
+
+    espera ≈ (perguntas na fila + 1) / vagas × latência média
+
+  - fusion com a ocupação (em andamento + fila) acima de ADMISSION_DEGRADE_AT
+    (0.8 das vagas), ou que não caberia no deadline, é degradado para um
+    provider só (ADMISSION_DEGRADE_PROVIDER, padrão ROUTER_FAST_PROVIDER): a
+    resposta sai com degraded_from="fusion";
+  - se nem assim a espera + a resposta couberem no deadline, ou a fila
+    estiver cheia, a pergunta é recusada na hora (Overloaded → 503 com
+    Retry-After = espera estimada), em vez de ocupar uma vaga até estourar.
+
+Sem fila (há vaga livre) nada é recusado nem degradado: um deadline curto
+continua sendo tratado pelo aggregator (respostas parciais).
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from app.config import env_float, env_int, env_str
+from app.deadline import get_deadline
+from app.metrics import ADMISSION_DECISIONS, mode_label
+
+logger = logging.getLogger("iscoolgpt.admission")
+
+
+class Overloaded(RuntimeError):
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(f"Servidor sobrecarregado: {reason}")
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_queue: int = 100,
+        degrade_at: float = 0.8,
+        initial_latency: float = 5.0,
+        smoothing: float = 0.2,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.degrade_at = degrade_at
+        self.initial_latency = initial_latency
+        self.smoothing = smoothing
+
+        self.in_flight = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+        # Média móvel exponencial da duração das respostas: "single", "fusion" e "all"
+        self._latency: Dict[str, float] = {}
+        self._stats = {"admitted": 0, "queued": 0, "degraded": 0, "rejected": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_in_flight > 0
+
+    # ---------------- estimativas ----------------
+    def latency(self, mode: str) -> float:
+        return self._latency.get(mode, self._latency.get("all", self.initial_latency))
+
+    def estimate_wait(self) -> float:
+        """Segundos até uma pergunta que chegasse agora ganhar uma vaga (0 = há vaga)."""
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            return 0.0
+        # Cada vaga se libera a cada ~latência média: a fila anda N vagas por vez
+        return (len(self._waiters) + 1) / self.max_in_flight * self.latency("all")
+
+    def pressure(self) -> float:
+        return (self.in_flight + len(self._waiters)) / self.max_in_flight
+
+    # ---------------- decisão ----------------
+    def plan(self, providers: List[str]) -> List[str]:
+        """
+        Decide antes de a pergunta ir para o aggregator: devolve os mesmos
+        providers, os de uma versão degradada, ou levanta Overloaded.
+        """
+        if not self.enabled:
+            return providers
+
+        if len(self._waiters) >= self.max_queue:
+            self._reject(f"fila de admissão cheia ({len(self._waiters)} aguardando)", self.estimate_wait())
+
+        wait = self.estimate_wait()
+        deadline = get_deadline()
+        remaining = deadline.remaining() if deadline is not None else None
+        mode = mode_label(providers)
+
+        if mode == "fusion":
+            too_slow = wait > 0 and remaining is not None and wait + self.latency("fusion") > remaining
+            if too_slow or self.pressure() >= self.degrade_at:
+                degraded = [degrade_provider()]
+                self._stats["degraded"] += 1
+                ADMISSION_DECISIONS.labels("degraded").inc()
+                logger.info(
+                    f"[Admission] fusion degradado para {degraded[0]} "
+                    f"(ocupação {self.pressure():.0%}, espera estimada {wait:.1f}s)"
+                )
+                return degraded
+
+        if wait > 0 and remaining is not None and wait + self.latency(mode) > remaining:
+            self._reject(
+                f"espera estimada de {wait:.1f}s + {self.latency(mode):.1f}s de resposta "
+                f"não cabe no deadline ({remaining:.1f}s)",
+                wait,
+            )
+        return providers
+
+    def _reject(self, reason: str, retry_after: float) -> None:
+        self._stats["rejected"] += 1
+        ADMISSION_DECISIONS.labels("rejected").inc()
+        logger.warning(f"[Admission] Recusada: {reason}")
+        raise Overloaded(reason, retry_after)
+
+    # ---------------- vagas ----------------
+    async def acquire(self) -> None:
+        """Ocupa uma vaga, esperando na fila até o fim do deadline (se houver)."""
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return
+
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._stats["queued"] += 1
+        deadline = get_deadline()
+        try:
+            await asyncio.wait_for(waiter, timeout=deadline.remaining() if deadline is not None else None)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # A vaga chegou junto com o cancelamento: passa adiante
+                self._release()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject("deadline estourado na fila de admissão", self.estimate_wait())
+            raise
+
+    def release(self, mode: str, elapsed: Optional[float]) -> None:
+        """Libera a vaga; elapsed (None se a chamada falhou) entra na média de latência."""
+        if elapsed is not None:
+            for key in (mode, "all"):
+                previous = self._latency.get(key)
+                self._latency[key] = (
+                    elapsed if previous is None else previous + self.smoothing * (elapsed - previous)
+                )
+        self._release()
+
+    def _release(self) -> None:
+        # A vaga passa direto para o próximo da fila (in_flight não muda)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    async def _admit(self) -> None:
+        await self.acquire()
+        self._stats["admitted"] += 1
+        ADMISSION_DECISIONS.labels("admitted").inc()
+
+    @asynccontextmanager
+    async def slot(self, mode: str) -> AsyncIterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        await self._admit()
+        started = time.monotonic()
+        elapsed: Optional[float] = None
+        try:
+            yield
+            elapsed = time.monotonic() - started
+        finally:
+            self.release(mode, elapsed)
+
+    async def admit_stream(self, mode: str) -> "StreamAdmission":
+        """
+        Para o streaming: ocupa a vaga antes de a resposta começar (o
+        Overloaded ainda vira 503 com Retry-After, não um erro no meio do
+        stream). A vaga sai com StreamAdmission.release, no fim da resposta.
+        """
+        if self.enabled:
+            await self._admit()
+        return StreamAdmission(self if self.enabled else None, mode)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "enabled": self.enabled,
+            "in_flight": self.in_flight,
+            "queued_now": len(self._waiters),
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "estimated_wait_seconds": round(self.estimate_wait(), 2) if self.enabled else 0.0,
+            "latency_seconds": {mode: round(value, 2) for mode, value in self._latency.items()},
+        }
+
+
+class StreamAdmission:
+    """Vaga de um stream: liberada uma vez só, terminando o stream ou não."""
+
+    def __init__(self, controller: Optional[AdmissionController], mode: str) -> None:
+        self.controller = controller
+        self.mode = mode
+        self.started = time.monotonic()
+        # Só streams que chegaram ao fim entram na média de latência
+        self.elapsed: Optional[float] = None
+
+    async def events(self, events: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        async for event in events:
+            yield event
+        self.elapsed = time.monotonic() - self.started
+
+    def release(self) -> None:
+        if self.controller is not None:
+            controller, self.controller = self.controller, None
+            controller.release(self.mode, self.elapsed)
+
+
+def degrade_provider() -> str:
+    return env_str("ADMISSION_DEGRADE_PROVIDER", env_str("ROUTER_FAST_PROVIDER", "huggingface"))
+
+
+def build_admission_controller() -> AdmissionController:
+    return AdmissionController(
+        max_in_flight=env_int("ADMISSION_MAX_IN_FLIGHT", 64),
+        max_queue=env_int("ADMISSION_MAX_QUEUE", 100),
+        degrade_at=env_float("ADMISSION_DEGRADE_AT", 0.8),
+        initial_latency=env_float("ADMISSION_INITIAL_LATENCY_SECONDS", 5.0),
+    )
+
+
+admission = build_admission_controller()
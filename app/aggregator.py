@@ -2,14 +2,24 @@
 
 import asyncio
 import logging
-from typing import List, Dict, Callable
+import time
+from itertools import combinations
+from typing import Any, AsyncIterator, Awaitable, List, Dict, Callable, Optional, Tuple
 
 from app.schemas import ProviderAnswer, AggregatedResponse
-from app.llm_base import LLMClient
-
-from app.llms.huggingface_llm import HuggingFaceLLM
-from app.llms.gemini_llm import GeminiLLM
-from app.llms.gemini_reasoner_llm import GeminiReasonerLLM
+from app.agreement import merge_answers, similarity
+from app.breaker import CircuitOpenError, breakers_enabled, get_breaker
+from app.config import env_bool, env_float
+from app.conversation import conversation_key
+from app.deadline import Deadline, get_deadline
+from app.fusion import fusion_providers, fusion_quorum, fusion_synthesizer
+from app.llm_base import LLMClient, is_error_answer
+from app.metrics import PROVIDER_CALLS, PROVIDER_LATENCY, SYNTHESIS_LATENCY
+from app.rate_limit import RateLimitExceeded, call_tokens, get_limiter
+from app.registry import LazyFactory, ProviderRegistry
+from app.router import resolve_providers
+from app.singleflight import SingleFlight
+from app.tracing import span
 
 logger = logging.getLogger("iscoolgpt.aggregator")
 
@@ -17,21 +27,258 @@ logger = logging.getLogger("iscoolgpt.aggregator")
 # ------------------------------------------------------
 # Providers disponíveis para modo SINGLE
 # ------------------------------------------------------
+# (importados só no primeiro uso: o SDK do Gemini é pesado e nem todo deploy usa)
 LLM_FACTORIES: Dict[str, Callable[[], LLMClient]] = {
-    "huggingface": HuggingFaceLLM,
-    "gemini": GeminiLLM,
+    "huggingface": LazyFactory("app.llms.huggingface_llm", "HuggingFaceLLM"),
+    "gemini": LazyFactory("app.llms.gemini_llm", "GeminiLLM"),
+    "deepseek_chat": LazyFactory("app.llms.deepseek_chat_llm", "DeepSeekChatLLM"),
+}
+
+# Providers usados apenas internamente (sintetizadores do modo FUSION)
+INTERNAL_FACTORIES: Dict[str, Callable[[], LLMClient]] = {
+    "gemini_reasoner": LazyFactory("app.llms.gemini_reasoner_llm", "GeminiReasonerLLM"),
+    "deepseek_reasoner": LazyFactory("app.llms.deepseek_reasoner_llm", "DeepSeekReasonerLLM"),
+}
+
+# Rótulo usado nas mensagens de erro do modo FUSION
+FUSION_ERROR_LABELS = {
+    "gemini": "Gemini",
+    "huggingface": "HF",
+    "deepseek_chat": "DeepSeek",
+    "gemini_reasoner": "Reasoner Gemini",
+    "deepseek_reasoner": "Reasoner DeepSeek",
 }
 
+# Instâncias de longa duração, reaproveitadas entre requisições
+registry = ProviderRegistry(LLM_FACTORIES, INTERNAL_FACTORIES)
+
+# Perguntas idênticas em andamento compartilham a mesma chamada ao provider
+provider_flight = SingleFlight("provider")
+
+# Falhas "rápidas": o provider nem foi chamado (circuito aberto, cota esgotada)
+FAST_FAILURES = (CircuitOpenError, RateLimitExceeded)
+
+# Quantas vezes o fusion chamou o reasoner e quantas resolveu sem ele
+fusion_stats: Dict[str, int] = {
+    "synthesized": 0,
+    "skipped_agreement": 0,
+    "skipped_single_answer": 0,
+}
+
+
+def describe_mode(providers: List[str]) -> str:
+    return "fusion" if "fusion" in providers else ",".join(providers)
+
+
+def describe_models(providers: List[str]) -> Dict[str, str]:
+    """
+    Nome do modelo de cada provider envolvido na requisição
+    (usado, por exemplo, na chave do cache de respostas).
+    """
+    if "fusion" in providers:
+        names = _fusion_names() + [fusion_synthesizer()]
+    else:
+        names = [name for name in providers if name in LLM_FACTORIES]
+
+    models: Dict[str, str] = {}
+    for name in names:
+        try:
+            models[name] = getattr(registry.get(name), "model_name", name)
+        except Exception:
+            models[name] = "indisponivel"
+    return models
+
+
+async def _ask_provider(provider_name: str, client: LLMClient, question: str) -> str:
+    """
+    Chamada a um provider. Perguntas idênticas já em andamento para o mesmo
+    provider/modelo aguardam a mesma resposta, em vez de gastar cota de novo.
+    """
+    model_name = getattr(client, "model_name", None)
+    # Numa sessão, a mesma pergunta com outro histórico é outra chamada
+    key = (provider_name, model_name, question, conversation_key())
+    with span(provider_name, model=model_name or provider_name):
+        return await provider_flight.do(
+            key, lambda: _limited_call(provider_name, question, lambda: client.ask(question))
+        )
+
+
+async def _limited_call(
+    provider_name: str, prompt: str, call: Callable[[], Awaitable[str]]
+) -> str:
+    """
+    Espera a vez no limitador de uso do provider (app/rate_limit.py) e então
+    faz a chamada pelo circuit breaker. O tempo na fila não conta como
+    latência do provider.
+    """
+    try:
+        if breakers_enabled():
+            breaker = get_breaker(provider_name)
+            await breaker.sync_shared()
+            if breaker.rejects_now():
+                raise CircuitOpenError(provider_name, breaker.retry_in())
+
+        async with get_limiter(provider_name).slot(call_tokens(prompt)):
+            return await _guarded_call(provider_name, call)
+    except FAST_FAILURES as e:
+        PROVIDER_CALLS.labels(provider_name, type(e).__name__).inc()
+        raise
+
+
+async def _guarded_call(provider_name: str, call: Callable[[], Awaitable[str]]) -> str:
+    """
+    Passa a chamada pelo circuit breaker do provider (app/breaker.py):
+    com o circuito aberto falha na hora, sem esperar o timeout. Exceções e
+    respostas de erro em texto contam como falha; a latência entra na janela.
+    """
+    breaker = get_breaker(provider_name) if breakers_enabled() else None
+    if breaker is not None and not breaker.allow():
+        raise CircuitOpenError(provider_name, breaker.retry_in())
+
+    started = time.monotonic()
+    try:
+        text = await call()
+    except asyncio.CancelledError:
+        if breaker is not None:
+            breaker.release()
+        raise
+    except Exception as e:
+        latency = time.monotonic() - started
+        _record_call(provider_name, type(e).__name__, latency)
+        if breaker is not None:
+            breaker.record(False, latency)
+        raise
+
+    latency = time.monotonic() - started
+    ok = not is_error_answer(text)
+    _record_call(provider_name, "ok" if ok else "error_answer", latency)
+    if breaker is not None:
+        breaker.record(ok, latency)
+    return text
+
+
+async def _limited_stream(
+    provider_name: str, prompt: str, stream: Callable[[], AsyncIterator[str]]
+) -> AsyncIterator[str]:
+    """
+    _limited_call para streams: a vaga no limitador fica reservada enquanto
+    o stream durar e o circuit breaker vê o stream inteiro como uma chamada
+    (exceção ou texto de erro = falha; latência até o último pedaço).
+    """
+    try:
+        breaker = get_breaker(provider_name) if breakers_enabled() else None
+        if breaker is not None:
+            await breaker.sync_shared()
+            if breaker.rejects_now():
+                raise CircuitOpenError(provider_name, breaker.retry_in())
+
+        async with get_limiter(provider_name).slot(call_tokens(prompt)):
+            if breaker is not None and not breaker.allow():
+                raise CircuitOpenError(provider_name, breaker.retry_in())
+
+            parts: List[str] = []
+            started = time.monotonic()
+            try:
+                async for chunk in stream():
+                    parts.append(chunk)
+                    yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                # Cancelado (quorum, deadline, cliente saiu): não é falha
+                if breaker is not None:
+                    breaker.release()
+                raise
+            except Exception as e:
+                latency = time.monotonic() - started
+                _record_call(provider_name, type(e).__name__, latency)
+                if breaker is not None:
+                    breaker.record(False, latency)
+                raise
+
+            latency = time.monotonic() - started
+            ok = not is_error_answer("".join(parts))
+            _record_call(provider_name, "ok" if ok else "error_answer", latency)
+            if breaker is not None:
+                breaker.record(ok, latency)
+    except FAST_FAILURES as e:
+        PROVIDER_CALLS.labels(provider_name, type(e).__name__).inc()
+        raise
+
+
+def _record_call(provider_name: str, outcome: str, latency: float) -> None:
+    PROVIDER_CALLS.labels(provider_name, outcome).inc()
+    PROVIDER_LATENCY.labels(provider_name).observe(latency)
+
+
+async def _gather_until(
+    calls: Dict[str, Awaitable[str]],
+    timeout: Optional[float],
+    quorum: Optional[int] = None,
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Roda as chamadas em paralelo por no máximo `timeout` segundos
+    (None = sem limite). Com `quorum`, para assim que esse número de
+    providers responder sem erro; os que ainda estiverem rodando são
+    cancelados. Retorna:
+      - o resultado (ou a exceção) de cada provider que terminou a tempo;
+      - a lista de providers descartados (prazo estourado ou quorum atingido).
+    """
+    tasks = {name: asyncio.ensure_future(call) for name, call in calls.items()}
+    pending = set(tasks.values())
+    loop = asyncio.get_running_loop()
+    end = loop.time() + timeout if timeout is not None else None
+    usable = 0
+
+    try:
+        while pending:
+            remaining = end - loop.time() if end is not None else None
+            if remaining is not None and remaining <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=remaining,
+                return_when=asyncio.ALL_COMPLETED if quorum is None else asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                break
+            usable += sum(_is_usable(task) for task in done)
+            if quorum is not None and usable >= quorum:
+                break
+    finally:
+        for task in tasks.values():
+            if not task.done():
+                task.cancel()
+
+    reason = "quorum atingido" if quorum is not None and usable >= quorum else "deadline estourado"
+    results: Dict[str, Any] = {}
+    dropped: List[str] = []
+    for name, task in tasks.items():
+        if task in pending:
+            logger.warning(f"[Aggregator] Provider '{name}' descartado: {reason}.")
+            dropped.append(name)
+        else:
+            results[name] = task.exception() or task.result()
+
+    return results, dropped
+
+
+def _is_usable(task: "asyncio.Future[str]") -> bool:
+    if task.cancelled() or task.exception() is not None:
+        return False
+    return not is_error_answer(task.result())
+
 
 # ------------------------------------------------------
-# Função principal — agora com modo FUSION (Gemini + HF + GeminiReasoner)
+# Função principal — modos SINGLE e FUSION
 # ------------------------------------------------------
 async def aggregate_answers(question: str, providers: List[str]) -> AggregatedResponse:
     """
-    Suporta 3 modos:
-      - ["gemini"]
-      - ["huggingface"]
-      - ["fusion"]  → Gemini + HF + Gemini Reasoner (síntese final)
+    Suporta os modos:
+      - ["gemini"], ["huggingface"], ["deepseek_chat"] (ou vários juntos)
+      - ["fusion"]  → FUSION_PROVIDERS + FUSION_SYNTHESIZER (síntese final;
+                      padrão Gemini + HF + Gemini Reasoner)
+
+    Se houver um deadline ativo (app/deadline.py), providers que não
+    respondem a tempo são descartados e listados em dropped_providers.
     """
 
     # --------------------------------------------------
@@ -43,34 +290,43 @@ async def aggregate_answers(question: str, providers: List[str]) -> AggregatedRe
     # --------------------------------------------------
     # 2. MODO SINGLE PROVIDER
     # --------------------------------------------------
-    tasks = []
-    used_providers: List[str] = []
+    calls: Dict[str, Awaitable[str]] = {}
 
     for provider_name in providers:
-        factory = LLM_FACTORIES.get(provider_name)
-        if factory is None:
+        if provider_name not in LLM_FACTORIES:
             logger.warning(f"[Aggregator] Provider desconhecido: {provider_name}")
             continue
 
         try:
-            client = factory()
+            client = registry.get(provider_name)
         except Exception as e:
             logger.exception(f"[Aggregator] Falha ao inicializar {provider_name}: {e}")
             continue
 
-        used_providers.append(provider_name)
-        tasks.append(client.ask(question))
+        calls[provider_name] = _ask_provider(provider_name, client, question)
 
-    if not tasks:
+    if not calls:
         raise ValueError("Nenhum provider válido foi informado.")
 
-    # Executa tudo em paralelo
-    answers_raw = await asyncio.gather(*tasks, return_exceptions=True)
+    # Executa tudo em paralelo (até o fim do deadline, se houver)
+    deadline = get_deadline()
+    results, dropped = await _gather_until(
+        calls, deadline.remaining() if deadline is not None else None
+    )
 
     answers: List[ProviderAnswer] = []
 
-    for provider_name, result in zip(used_providers, answers_raw):
-        if isinstance(result, Exception):
+    for provider_name in calls:
+        result = results.get(provider_name)
+        if provider_name in dropped:
+            text = (
+                f"[ERRO no provider '{provider_name}'] "
+                "Tempo esgotado: sem resposta dentro do deadline."
+            )
+        elif isinstance(result, FAST_FAILURES):
+            logger.warning(f"[Aggregator] {result}")
+            text = f"[ERRO no provider '{provider_name}'] {result}"
+        elif isinstance(result, Exception):
             logger.exception(
                 f"[Aggregator] Erro ao chamar provider '{provider_name}': {result}"
             )
@@ -88,68 +344,438 @@ async def aggregate_answers(question: str, providers: List[str]) -> AggregatedRe
         [f"{ans.provider.upper()}: {ans.answer}" for ans in answers]
     )
 
-    return AggregatedResponse(final_answer=final_answer, answers=answers)
+    return AggregatedResponse(
+        final_answer=final_answer, answers=answers, dropped_providers=dropped
+    )
 
 
 # ------------------------------------------------------
 # Função auxiliar do modo FUSION
 # ------------------------------------------------------
+def _fusion_names() -> List[str]:
+    names = []
+    for name in fusion_providers():
+        if name in LLM_FACTORIES:
+            names.append(name)
+        else:
+            logger.warning(f"[Fusion] Provider desconhecido em FUSION_PROVIDERS: {name}")
+    if not names:
+        raise ValueError("Nenhum provider válido em FUSION_PROVIDERS.")
+    return names
+
+
 async def _run_fusion_mode(question: str) -> AggregatedResponse:
     """
-    Executa:
-      - Gemini
-      - HuggingFace
-    E depois usa GeminiReasonerLLM para sintetizar.
-    """
+    Executa os providers de FUSION_PROVIDERS (padrão: Gemini e HF) em
+    paralelo e depois usa o FUSION_SYNTHESIZER (padrão: Gemini Reasoner)
+    para sintetizar (app/fusion.py).
 
-    gemini = GeminiLLM()
-    hf = HuggingFaceLLM()
-    reasoner = GeminiReasonerLLM()
+    Quorum (FUSION_QUORUM = k de N): assim que k providers respondem sem
+    erro, os demais são cancelados e vão para dropped_providers.
 
-    # 1. Rodar Gemini e HF em paralelo
-    gemini_task = gemini.ask(question)
-    hf_task = hf.ask(question)
+    Com deadline: os providers têm FUSION_ANSWER_BUDGET_FRACTION do tempo
+    restante. Quem não responder é descartado; com uma só resposta, ela é
+    devolvida sem síntese. A síntese também só roda se sobrar pelo menos
+    FUSION_MIN_SYNTHESIS_SECONDS — senão vale a melhor resposta disponível.
+
+    Respostas de erro (provider fora do ar, circuito aberto) continuam em
+    `answers`, mas não entram na síntese: o provider vai para
+    dropped_providers e o sintetizador só recebe respostas de verdade.
+
+    Se as respostas já concordam (app/agreement.py), elas são mescladas
+    localmente e o sintetizador não é chamado.
+    """
+    names = _fusion_names()
+    quorum = fusion_quorum(len(names))
+    synthesizer = fusion_synthesizer()
+
+    deadline = get_deadline()
+    answer_timeout = None
+    if deadline is not None:
+        answer_timeout = deadline.remaining() * env_float("FUSION_ANSWER_BUDGET_FRACTION", 0.6)
+
+    # 1. Rodar os providers em paralelo (até o quorum ou o prazo)
+    calls: Dict[str, Awaitable[str]] = {}
+    build_errors: Dict[str, Exception] = {}
+    for provider_name in names:
+        try:
+            calls[provider_name] = _ask_provider(
+                provider_name, registry.get(provider_name), question
+            )
+        except Exception as e:
+            logger.exception(f"[Fusion] Falha ao inicializar {provider_name}: {e}")
+            build_errors[provider_name] = e
 
-    gemini_resp, hf_resp = await asyncio.gather(
-        gemini_task, hf_task, return_exceptions=True
+    results, dropped = await _gather_until(
+        calls, answer_timeout, quorum if quorum < len(names) else None
     )
+    results.update(build_errors)
 
     answers_list: List[ProviderAnswer] = []
+    texts: Dict[str, str] = {}
 
-    # Gemini
-    if isinstance(gemini_resp, Exception):
-        logger.exception(f"[Fusion] Erro Gemini: {gemini_resp}")
-        g_text = f"[ERRO Gemini] {type(gemini_resp).__name__}: {gemini_resp}"
-    else:
-        g_text = gemini_resp
+    for provider_name in names:
+        if provider_name not in results:
+            continue
 
-    answers_list.append(ProviderAnswer(provider="gemini", answer=g_text))
+        label = FUSION_ERROR_LABELS.get(provider_name, provider_name)
+        result = results[provider_name]
+        if isinstance(result, FAST_FAILURES):
+            logger.warning(f"[Fusion] {label} ignorado: {result}")
+            text = f"[ERRO {label}] {type(result).__name__}: {result}"
+        elif isinstance(result, Exception):
+            logger.exception(f"[Fusion] Erro {label}: {result}")
+            text = f"[ERRO {label}] {type(result).__name__}: {result}"
+        else:
+            text = result
 
-    # HuggingFace
-    if isinstance(hf_resp, Exception):
-        logger.exception(f"[Fusion] Erro HF: {hf_resp}")
-        h_text = f"[ERRO HF] {type(hf_resp).__name__}: {hf_resp}"
-    else:
-        h_text = hf_resp
+        answers_list.append(ProviderAnswer(provider=provider_name, answer=text))
+        if is_error_answer(text):
+            dropped.append(provider_name)
+        else:
+            texts[provider_name] = text
+
+    # 2. Rodar o sintetizador, se houver o que sintetizar e tempo
+    agreed = None
+    if len(texts) >= 2:
+        with span("agreement"):
+            agreed = _agreed_answer(texts)
+
+    if len(texts) < 2:
+        if texts:
+            logger.warning(f"[Fusion] Sem síntese: providers descartados {dropped}")
+            fusion_stats["skipped_single_answer"] += 1
+            final_answer = _best_answer(texts)
+        elif answers_list:
+            final_answer = "[ERRO Fusion] Nenhum provider respondeu sem erro."
+        else:
+            final_answer = "[ERRO Fusion] Nenhum provider respondeu dentro do prazo."
 
-    answers_list.append(ProviderAnswer(provider="huggingface", answer=h_text))
+    elif agreed is not None:
+        fusion_stats["skipped_agreement"] += 1
+        final_answer = agreed
 
-    # 2. Rodar Gemini Reasoner (síntese)
-    try:
-        final_answer = await reasoner.synthesize(
-            question,
-            g_text,
-            h_text,
-        )
-    except Exception as e:
-        logger.exception(f"[Fusion] Erro no Gemini Reasoner: {e}")
-        final_answer = (
-            "[ERRO Reasoner Gemini] "
-            f"{type(e).__name__}: {e}"
-        )
+    elif deadline is not None and deadline.remaining() < env_float(
+        "FUSION_MIN_SYNTHESIS_SECONDS", 3.0
+    ):
+        logger.warning("[Fusion] Sem tempo para a síntese; usando a melhor resposta.")
+        final_answer = _best_answer(texts)
+        dropped.append(synthesizer)
+
+    else:
+        final_answer = await _synthesize(question, texts, synthesizer, dropped)
 
     # 3. Retornar tudo
     return AggregatedResponse(
         final_answer=final_answer,
         answers=answers_list,
+        dropped_providers=dropped,
     )
+
+
+async def _synthesize(
+    question: str, texts: Dict[str, str], synthesizer: str, dropped: List[str]
+) -> str:
+    """Síntese das respostas; em qualquer falha vale a melhor resposta."""
+    fusion_stats["synthesized"] += 1
+    label = FUSION_ERROR_LABELS.get(synthesizer, synthesizer)
+    deadline = get_deadline()
+    synthesis_started = time.monotonic()
+    outcome = "ok"
+    try:
+        reasoner = registry.get(synthesizer)
+        with span("reasoner", synthesizer=synthesizer):
+            final_answer = await asyncio.wait_for(
+                _limited_call(
+                    synthesizer,
+                    question + "".join(texts.values()),
+                    lambda: reasoner.synthesize(question, *texts.values()),
+                ),
+                timeout=deadline.remaining() if deadline is not None else None,
+            )
+    except asyncio.TimeoutError:
+        logger.warning("[Fusion] Reasoner estourou o deadline; usando a melhor resposta.")
+        outcome = "timeout"
+        final_answer = _best_answer(texts)
+        dropped.append(synthesizer)
+    except FAST_FAILURES as e:
+        logger.warning(f"[Fusion] {e}; usando a melhor resposta.")
+        outcome = "rejected"
+        final_answer = _best_answer(texts)
+        dropped.append(synthesizer)
+    except Exception as e:
+        logger.exception(f"[Fusion] Erro no {label}: {e}")
+        final_answer = f"[ERRO {label}] {type(e).__name__}: {e}"
+
+    if is_error_answer(final_answer):
+        logger.warning("[Fusion] Síntese falhou; usando a melhor resposta.")
+        outcome = "error"
+        final_answer = _best_answer(texts)
+        dropped.append(synthesizer)
+
+    SYNTHESIS_LATENCY.labels(outcome).observe(time.monotonic() - synthesis_started)
+    return final_answer
+
+
+def _agreed_answer(texts: Dict[str, str]) -> Optional[str]:
+    """
+    Mescla local das respostas quando a semelhança entre elas passa de
+    FUSION_AGREEMENT_THRESHOLD (None = discordam, o reasoner decide).
+    """
+    if not env_bool("FUSION_SKIP_ON_AGREEMENT", True):
+        return None
+
+    threshold = env_float("FUSION_AGREEMENT_THRESHOLD", 0.7)
+    # Com mais de duas respostas, vale o par que menos concorda
+    score = min(similarity(a, b) for a, b in combinations(texts.values(), 2))
+    if score < threshold:
+        return None
+
+    logger.info(f"[Fusion] Respostas concordam (similaridade {score:.2f}); síntese dispensada.")
+    return merge_answers(texts, threshold)
+
+
+def _best_answer(texts: Dict[str, str]) -> str:
+    """Primeira resposta sem erro, na ordem de preferência do FUSION."""
+    for text in texts.values():
+        if not is_error_answer(text):
+            return text
+    return next(iter(texts.values()))
+
+
+# ------------------------------------------------------
+# Streaming (SSE) — mesmos modos, com eventos gerados conforme chegam
+# ------------------------------------------------------
+async def stream_answers(
+    question: str, providers: List[str]
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Gera eventos:
+      {"event": "token", "provider": ..., "data": "<pedaço de texto>"}
+      {"event": "error", "provider": ..., "data": "<mensagem de erro>"}
+      {"event": "done",  "provider": ..., "data": "<resposta completa>"}
+      {"event": "final", "data": <AggregatedResponse como dict>}
+
+    No modo FUSION, os providers de FUSION_PROVIDERS são transmitidos em
+    paralelo (até o FUSION_QUORUM; os demais são cancelados) e a síntese é
+    transmitida depois, como último canal ("reasoner").
+
+    Limitador, circuit breaker e deadline valem como no aggregate_answers:
+    providers que não terminam a tempo são cancelados (evento "error") e
+    vão para dropped_providers; no fusion eles têm
+    FUSION_ANSWER_BUDGET_FRACTION do tempo restante, e a síntese que
+    estourar o deadline (ou nem tiver FUSION_MIN_SYNTHESIS_SECONDS) dá lugar
+    à melhor resposta.
+    """
+    providers = resolve_providers(question, providers)
+    fusion = "fusion" in providers
+
+    clients: List[Tuple[str, LLMClient]] = []
+    for provider_name in (_fusion_names() if fusion else providers):
+        if provider_name not in LLM_FACTORIES:
+            logger.warning(f"[Aggregator] Provider desconhecido: {provider_name}")
+            continue
+        try:
+            clients.append((provider_name, registry.get(provider_name)))
+        except Exception as e:
+            logger.exception(f"[Aggregator] Falha ao inicializar {provider_name}: {e}")
+
+    if not clients:
+        raise ValueError("Nenhum provider válido foi informado.")
+
+    deadline = get_deadline()
+    answer_timeout = None
+    if deadline is not None:
+        answer_timeout = deadline.remaining()
+        if fusion:
+            answer_timeout *= env_float("FUSION_ANSWER_BUDGET_FRACTION", 0.6)
+
+    quorum = fusion_quorum(len(clients)) if fusion else len(clients)
+    texts: Dict[str, str] = {}
+    async for event in _merge_provider_streams(
+        question, clients, texts, quorum if quorum < len(clients) else None, answer_timeout
+    ):
+        yield event
+
+    answers = [
+        ProviderAnswer(provider=name, answer=texts[name]) for name, _ in clients if name in texts
+    ]
+    dropped = [name for name, _ in clients if name not in texts]
+
+    if fusion:
+        # Na ordem de FUSION_PROVIDERS, não na de chegada
+        usable = {
+            answer.provider: answer.answer
+            for answer in answers
+            if not is_error_answer(answer.answer)
+        }
+        local_answer: Optional[str] = None
+        if len(usable) < 2:
+            fusion_stats["skipped_single_answer"] += 1
+            local_answer = _best_answer(texts)
+        else:
+            local_answer = _agreed_answer(usable)
+            if local_answer is not None:
+                fusion_stats["skipped_agreement"] += 1
+
+        synthesizer = fusion_synthesizer()
+        if local_answer is None and deadline is not None and deadline.remaining() < env_float(
+            "FUSION_MIN_SYNTHESIS_SECONDS", 3.0
+        ):
+            logger.warning("[Fusion] Sem tempo para a síntese; usando a melhor resposta.")
+            local_answer = _best_answer(usable)
+            dropped.append(synthesizer)
+
+        if local_answer is not None:
+            # Sem síntese: a resposta local sai inteira no canal do reasoner
+            final_answer = local_answer
+            yield {"event": "token", "provider": "reasoner", "data": final_answer}
+        else:
+            fusion_stats["synthesized"] += 1
+            label = FUSION_ERROR_LABELS.get(synthesizer, synthesizer)
+            parts: List[str] = []
+            synthesis_started = time.monotonic()
+            outcome = "ok"
+            try:
+                reasoner = registry.get(synthesizer)
+                chunks = _limited_stream(
+                    synthesizer,
+                    question + "".join(usable.values()),
+                    lambda: reasoner.stream_synthesis(question, *usable.values()),
+                )
+                async for chunk in _until_deadline(chunks, deadline):
+                    parts.append(chunk)
+                    yield {"event": "token", "provider": "reasoner", "data": chunk}
+                final_answer = "".join(parts)
+                if is_error_answer(final_answer):
+                    outcome = "error"
+            except (asyncio.TimeoutError, *FAST_FAILURES) as e:
+                timed_out = isinstance(e, asyncio.TimeoutError)
+                outcome = "timeout" if timed_out else "rejected"
+                reason = "estourou o deadline" if timed_out else str(e)
+                logger.warning(f"[Fusion] Reasoner {reason}; usando a melhor resposta.")
+                final_answer = _best_answer(usable)
+                dropped.append(synthesizer)
+                yield {
+                    "event": "error",
+                    "provider": "reasoner",
+                    "data": f"[ERRO {label}] {reason}; usando a melhor resposta.",
+                }
+            except Exception as e:
+                logger.exception(f"[Fusion] Erro no {label}: {e}")
+                outcome = "error"
+                final_answer = f"[ERRO {label}] {type(e).__name__}: {e}"
+                yield {"event": "error", "provider": "reasoner", "data": final_answer}
+
+            SYNTHESIS_LATENCY.labels(outcome).observe(time.monotonic() - synthesis_started)
+
+        yield {"event": "done", "provider": "reasoner", "data": final_answer}
+    else:
+        final_answer = "\n".join(
+            [f"{ans.provider.upper()}: {ans.answer}" for ans in answers]
+        )
+
+    response = AggregatedResponse(
+        final_answer=final_answer, answers=answers, dropped_providers=dropped
+    )
+    yield {"event": "final", "data": response.model_dump(exclude={"timings"})}
+
+
+async def _until_deadline(
+    chunks: AsyncIterator[str], deadline: Optional[Deadline]
+) -> AsyncIterator[str]:
+    """Repassa os pedaços; se o próximo não chegar antes do deadline, asyncio.TimeoutError."""
+    iterator = chunks.__aiter__()
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(
+                    iterator.__anext__(),
+                    timeout=deadline.remaining() if deadline is not None else None,
+                )
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        await iterator.aclose()
+
+
+async def _merge_provider_streams(
+    question: str,
+    clients: List[Tuple[str, LLMClient]],
+    texts: Dict[str, str],
+    quorum: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Roda o stream de cada provider em paralelo e intercala os eventos numa
+    única fila. Ao terminar, `texts` contém a resposta completa de cada um.
+    Com `quorum`, para quando esse número de providers terminar sem erro;
+    com `timeout` (segundos), quando o prazo acabar. Os que ainda estiverem
+    rodando são cancelados (evento "error") e ficam fora de `texts`.
+    Se o consumidor desistir (cliente desconectou), os streams são cancelados.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def _pump(provider_name: str, client: LLMClient) -> None:
+        parts: List[str] = []
+        try:
+            async for chunk in _limited_stream(
+                provider_name, question, lambda: client.stream(question)
+            ):
+                parts.append(chunk)
+                await queue.put(
+                    {"event": "token", "provider": provider_name, "data": chunk}
+                )
+            text = "".join(parts)
+        except Exception as e:
+            if isinstance(e, FAST_FAILURES):
+                logger.warning(f"[Aggregator] Stream de '{provider_name}' recusado: {e}")
+            else:
+                logger.exception(
+                    f"[Aggregator] Erro no stream do provider '{provider_name}': {e}"
+                )
+            text = (
+                f"[ERRO no provider '{provider_name}'] "
+                f"{type(e).__name__}: {e}"
+            )
+            await queue.put({"event": "error", "provider": provider_name, "data": text})
+
+        texts[provider_name] = text
+        await queue.put({"event": "done", "provider": provider_name, "data": text})
+
+    tasks = [asyncio.create_task(_pump(name, client)) for name, client in clients]
+    finished: List[str] = []
+    loop = asyncio.get_running_loop()
+    end = loop.time() + timeout if timeout is not None else None
+    reason = f"quorum de {quorum} atingido"
+    try:
+        usable = 0
+        while len(finished) < len(tasks):
+            try:
+                event = await asyncio.wait_for(
+                    queue.get(), timeout=end - loop.time() if end is not None else None
+                )
+            except asyncio.TimeoutError:
+                reason = "deadline estourado"
+                break
+            yield event
+            if event["event"] != "done":
+                continue
+            finished.append(event["provider"])
+            usable += not is_error_answer(event["data"])
+            if quorum is not None and usable >= quorum:
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    for name, _ in clients:
+        if name not in finished:
+            texts.pop(name, None)
+            logger.warning(f"[Aggregator] Stream de '{name}' cancelado: {reason}.")
+            yield {
+                "event": "error",
+                "provider": name,
+                "data": f"[ERRO no provider '{name}'] Cancelado: {reason}.",
+            }
@@ -0,0 +1,83 @@
+# app/agreement.py
+
+"""
+Concordância entre as respostas do modo FUSION, calculada localmente.
+
+Quando Gemini e HF dizem praticamente a mesma coisa, a síntese do reasoner
+(a terceira e mais longa chamada do fusion) não acrescenta nada. Aqui a
+semelhança é estimada por MinHash sobre shingles de palavras — assinatura
+calculada de uma vez só com NumPy, sem rede — e, se passar do limiar, as
+respostas são mescladas localmente.
+"""
+
+import re
+import zlib
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from app.cache import normalize_question
+
+SHINGLE_SIZE = 2
+NUM_PERMUTATIONS = 128
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_PARAGRAPH = re.compile(r"\n\s*\n")
+
+# Hash multiply-shift: (a * x + b) mod 2^64, usando os 32 bits altos.
+# `a` precisa ser ímpar; overflow de uint64 é intencional.
+_rng = np.random.default_rng(11)
+_A = _rng.integers(1, 2**63, size=NUM_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2**63, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> List[str]:
+    words = _TOKEN.findall(normalize_question(text))
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def minhash_signature(items: Sequence[str]) -> np.ndarray:
+    """Assinatura MinHash (NUM_PERMUTATIONS valores uint64) de um conjunto de shingles."""
+    if not items:
+        return np.full(NUM_PERMUTATIONS, np.iinfo(np.uint64).max, dtype=np.uint64)
+
+    hashes = np.fromiter(
+        (zlib.crc32(item.encode("utf-8")) for item in set(items)),
+        dtype=np.uint64,
+    )
+    with np.errstate(over="ignore"):
+        permuted = (_A[:, None] * hashes[None, :] + _B[:, None]) >> np.uint64(32)
+    return permuted.min(axis=1)
+
+
+def similarity(a: str, b: str) -> float:
+    """Jaccard estimado (0.0 a 1.0) entre os shingles das duas respostas."""
+    shingles_a, shingles_b = shingles(a), shingles(b)
+    if not shingles_a or not shingles_b:
+        return 0.0
+    return float(np.mean(minhash_signature(shingles_a) == minhash_signature(shingles_b)))
+
+
+def merge_answers(texts: Dict[str, str], threshold: float) -> str:
+    """
+    Mescla respostas que já concordam: a mais completa é a base e, das
+    outras, entram só os parágrafos cujos shingles a base ainda não cobre
+    (cobertura < threshold).
+    """
+    ordered = sorted(texts.values(), key=len, reverse=True)
+    merged = [ordered[0].strip()]
+    covered = set(shingles(merged[0]))
+
+    for other in ordered[1:]:
+        for paragraph in _PARAGRAPH.split(other):
+            paragraph = paragraph.strip()
+            items = set(shingles(paragraph))
+            if not items:
+                continue
+            if len(items & covered) / len(items) < threshold:
+                merged.append(paragraph)
+                covered |= items
+
+    return "\n\n".join(merged)
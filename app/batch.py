@@ -0,0 +1,219 @@
+# app/batch.py
+
+"""
+Lotes de perguntas: POST /ask/batch e scripts/run_batch.py.
+
+Cada pergunta passa pelo mesmo caminho do /ask (cache, single-flight,
+deadline). O lote roda com concorrência limitada em dois níveis:
+  - BATCH_CONCURRENCY: perguntas em andamento ao mesmo tempo;
+  - BATCH_PROVIDER_CONCURRENCY: perguntas usando o mesmo provider ao
+    mesmo tempo (no fusion, cada provider de FUSION_PROVIDERS conta).
+Os resultados saem na ordem em que ficam prontos, um objeto JSON por linha
+(NDJSON), com o `id` e o `index` da pergunta para casar com a entrada.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple
+
+from app.config import env_int, env_str
+from app.deadline import request_deadline
+from app.fusion import fusion_providers
+from app.pipeline import answer_question, is_cacheable
+from app.schemas import AggregatedResponse, BatchQuestion, BatchResult
+
+logger = logging.getLogger("iscoolgpt.batch")
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def providers_used(providers: Sequence[str]) -> List[str]:
+    names: List[str] = []
+    for provider in providers:
+        if provider == "fusion":
+            # O sintetizador roda depois, fora da disputa
+            names.extend(fusion_providers())
+        elif provider == "auto":
+            # Pior caso: a rota pode ser qualquer uma das duas
+            names.extend(fusion_providers())
+            names.append(env_str("ROUTER_FAST_PROVIDER", "huggingface"))
+        else:
+            names.append(provider)
+    return sorted(set(names))
+
+
+class ProviderSlots:
+    """Um semáforo por provider, compartilhado pelas perguntas do lote."""
+
+    def __init__(self, per_provider: int) -> None:
+        self.per_provider = per_provider
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore(self, provider: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(provider)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_provider)
+            self._semaphores[provider] = semaphore
+        return semaphore
+
+    @asynccontextmanager
+    async def hold(self, providers: Sequence[str]):
+        # Sempre na mesma ordem (providers_used ordena): sem deadlock
+        acquired: List[asyncio.Semaphore] = []
+        try:
+            for provider in providers_used(providers):
+                semaphore = self._semaphore(provider)
+                await semaphore.acquire()
+                acquired.append(semaphore)
+            yield
+        finally:
+            for semaphore in reversed(acquired):
+                semaphore.release()
+
+
+async def run_batch(
+    questions: Sequence[BatchQuestion],
+    providers: List[str],
+    concurrency: Optional[int] = None,
+    per_provider: Optional[int] = None,
+) -> AsyncIterator[BatchResult]:
+    """Responde o lote e gera os resultados conforme ficam prontos."""
+    if not questions:
+        return
+
+    concurrency = concurrency or env_int("BATCH_CONCURRENCY", 8)
+    slots = ProviderSlots(per_provider or env_int("BATCH_PROVIDER_CONCURRENCY", 4))
+
+    pending: "asyncio.Queue[Tuple[int, BatchQuestion]]" = asyncio.Queue()
+    for index, item in enumerate(questions):
+        pending.put_nowait((index, item))
+
+    # Fila limitada: se quem consome (cliente HTTP, arquivo) ficar para trás,
+    # os workers esperam em vez de acumular resultados na memória.
+    results: "asyncio.Queue[BatchResult]" = asyncio.Queue(maxsize=concurrency)
+
+    async def _worker() -> None:
+        while True:
+            try:
+                index, item = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await results.put(await _answer_one(index, item, providers, slots))
+
+    workers = [
+        asyncio.create_task(_worker()) for _ in range(min(concurrency, len(questions)))
+    ]
+    try:
+        for _ in range(len(questions)):
+            yield await results.get()
+    finally:
+        for worker in workers:
+            worker.cancel()
+
+
+async def _answer_one(
+    index: int,
+    item: BatchQuestion,
+    default_providers: List[str],
+    slots: ProviderSlots,
+) -> BatchResult:
+    providers = item.providers or default_providers
+    item_id = item.id if item.id is not None else str(index)
+
+    async with slots.hold(providers):
+        # O deadline de cada pergunta começa quando ela sai da fila
+        started = time.perf_counter()
+        try:
+            response, cache_status = await answer_question(
+                item.question, providers, deadline=request_deadline({})
+            )
+        except Exception as e:
+            logger.exception(f"[Batch] Erro na pergunta {item_id}: {e}")
+            return BatchResult(
+                id=item_id,
+                index=index,
+                question=item.question,
+                elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+                error=f"{type(e).__name__}: {e}",
+            )
+
+    return BatchResult(
+        id=item_id,
+        index=index,
+        question=item.question,
+        cache=cache_status,
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+        response=response,
+    )
+
+
+async def encode_ndjson(results: AsyncIterator[BatchResult]) -> AsyncIterator[str]:
+    async for result in results:
+        yield result.model_dump_json(exclude={"response": {"timings"}}) + "\n"
+
+
+# ------------------------------------------------------
+# Arquivos JSONL (scripts/run_batch.py)
+# ------------------------------------------------------
+def read_jsonl_questions(path: str) -> List[BatchQuestion]:
+    """
+    Uma pergunta por linha. Aceita {"question": ...} ou o formato do
+    requests.jsonl ({"request_id", "title", "body"}). Sem id, vale o número
+    da linha.
+    """
+    questions: List[BatchQuestion] = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            question = data.get("question") or data.get("body") or data.get("title")
+            if not question:
+                raise ValueError(f"{path}:{number}: linha sem pergunta.")
+            item_id = data.get("id") or data.get("request_id") or str(number)
+            questions.append(
+                BatchQuestion(
+                    id=str(item_id), question=question, providers=data.get("providers")
+                )
+            )
+    return questions
+
+
+def prepare_output(path: str) -> Set[str]:
+    """
+    Ids já respondidos (sem erro) num arquivo de saída de uma execução
+    anterior, para retomar de onde parou. Vale o critério do cache: uma
+    resposta cujo texto é a mensagem de erro de um provider, ou parcial
+    (deadline), é refeita. Uma última linha cortada no meio
+    (queda durante a escrita) é ignorada e o arquivo volta a terminar em
+    quebra de linha, pronto para receber novas linhas.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+
+    with open(path, "rb") as f:
+        content = f.read()
+
+    for line in content.decode("utf-8", errors="replace").splitlines():
+        try:
+            data = json.loads(line)
+        except ValueError:
+            continue
+        if data.get("response") is None or data.get("error"):
+            continue
+        try:
+            response = AggregatedResponse.model_validate(data["response"])
+        except ValueError:
+            continue
+        if is_cacheable(response):
+            done.add(str(data["id"]))
+
+    if content and not content.endswith(b"\n"):
+        with open(path, "ab") as f:
+            f.write(b"\n")
+
+    return done
@@ -0,0 +1,264 @@
+# app/breaker.py
+
+"""
+Circuit breaker por provider, com janela deslizante de erros e latência.
+
+Estados:
+  - closed: chamadas normais; cada resultado entra na janela
+    (BREAKER_WINDOW_SECONDS). Se a taxa de erro passar de BREAKER_ERROR_RATE
+    ou a de chamadas lentas (> BREAKER_SLOW_CALL_SECONDS) passar de
+    BREAKER_SLOW_CALL_RATE — com pelo menos BREAKER_MIN_CALLS na janela —
+    o circuito abre.
+  - open: falha na hora (CircuitOpenError) por BREAKER_OPEN_SECONDS, sem
+    esperar o timeout do provider.
+  - half_open: deixa passar uma única chamada de teste. Sucesso fecha o
+    circuito; falha abre de novo.
+
+Respostas de erro devolvidas como texto ("[ERRO HuggingFace] HTTP 429 ...")
+contam como falha, igual a exceções.
+
+Com SHARED_STATE_BACKEND (app/shared_state.py), quem abre o circuito publica
+até quando ele fica aberto; os outros workers, ainda fechados, consultam
+essa marca (no máximo a cada BREAKER_SHARED_POLL_SECONDS, em sync_shared(),
+antes de a chamada entrar na fila do limitador) e abrem também, em vez de
+cada um gastar BREAKER_MIN_CALLS chamadas para descobrir sozinho. Leitura e
+publicação rodam na thread do estado compartilhado, fora do event loop.
+"""
+
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from app.config import env_bool, env_float, env_int
+from app.shared_state import SharedState, get_shared_state
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, provider: str, retry_in: float) -> None:
+        super().__init__(
+            f"Circuit breaker aberto para '{provider}' "
+            f"(nova tentativa em {retry_in:.0f}s)"
+        )
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float = 60.0,
+        min_calls: int = 5,
+        error_rate: float = 0.5,
+        slow_call_seconds: float = 20.0,
+        slow_call_rate: float = 0.8,
+        open_seconds: float = 30.0,
+        shared: Optional[SharedState] = None,
+        shared_poll_seconds: float = 1.0,
+    ) -> None:
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate
+        self.open_seconds = open_seconds
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        # (timestamp, sucesso, latência)
+        self._events: Deque[Tuple[float, bool, float]] = deque()
+        self.rejected = 0
+
+        self.shared = shared
+        self.shared_poll_seconds = shared_poll_seconds
+        self._next_poll = 0.0
+
+    # ------------------------------------------------------
+    # Antes da chamada
+    # ------------------------------------------------------
+    def allow(self) -> bool:
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected += 1
+                return False
+            self._probe_in_flight = True
+
+        return True
+
+    def rejects_now(self) -> bool:
+        """Circuito aberto e ainda em espera: a chamada nem deve entrar na fila."""
+        if self.state == OPEN and time.monotonic() - self.opened_at < self.open_seconds:
+            self.rejected += 1
+            return True
+        return False
+
+    def retry_in(self) -> float:
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.open_seconds - (time.monotonic() - self.opened_at))
+
+    # ------------------------------------------------------
+    # Depois da chamada
+    # ------------------------------------------------------
+    def record(self, success: bool, latency: float) -> None:
+        now = time.monotonic()
+        self._events.append((now, success, latency))
+        self._trim(now)
+
+        if self.state == HALF_OPEN:
+            self._probe_in_flight = False
+            if success and latency <= self.slow_call_seconds:
+                self._close()
+            else:
+                self._open(now)
+            return
+
+        if self.state == CLOSED and self._should_open():
+            self._open(now)
+
+    def release(self) -> None:
+        """Chamada cancelada sem resultado: libera a vaga de teste do half-open."""
+        self._probe_in_flight = False
+
+    # ------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------
+    def _trim(self, now: float) -> None:
+        while self._events and now - self._events[0][0] > self.window_seconds:
+            self._events.popleft()
+
+    def _rates(self) -> Tuple[int, float, float, float]:
+        calls = len(self._events)
+        if not calls:
+            return 0, 0.0, 0.0, 0.0
+        errors = sum(1 for _, success, _ in self._events if not success)
+        slow = sum(1 for _, _, latency in self._events if latency > self.slow_call_seconds)
+        avg_latency = sum(latency for _, _, latency in self._events) / calls
+        return calls, errors / calls, slow / calls, avg_latency
+
+    def _should_open(self) -> bool:
+        calls, error_rate, slow_rate, _ = self._rates()
+        if calls < self.min_calls:
+            return False
+        return (
+            error_rate >= self.error_rate_threshold
+            or slow_rate >= self.slow_call_rate_threshold
+        )
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self.opened_at = now
+        if self.shared is not None:
+            # Relógio de parede: o monotonic não vale entre processos
+            shared, key, open_until = self.shared, self._shared_key, repr(time.time() + self.open_seconds)
+            shared.run_soon(lambda: shared.set(key, open_until, self.open_seconds))
+
+    @property
+    def _shared_key(self) -> str:
+        return f"breaker:{self.name}:open_until"
+
+    async def sync_shared(self) -> None:
+        """Fechado aqui, mas aberto por outro worker: adota o circuito aberto."""
+        if self.shared is None or self.state != CLOSED:
+            return
+        if time.monotonic() < self._next_poll:
+            return
+        self._next_poll = time.monotonic() + self.shared_poll_seconds
+
+        shared, key = self.shared, self._shared_key
+        raw = await shared.run(lambda: shared.get(key))
+        if raw is None or self.state != CLOSED:
+            return
+        try:
+            remaining = float(raw) - time.time()
+        except ValueError:
+            return
+        if remaining > 0:
+            self.state = OPEN
+            self.opened_at = time.monotonic() - max(0.0, self.open_seconds - remaining)
+
+    def _close(self) -> None:
+        self.state = CLOSED
+        self._events.clear()
+
+    # ------------------------------------------------------
+    # Saúde
+    # ------------------------------------------------------
+    def health_score(self) -> float:
+        """
+        0.0 (indisponível) a 1.0 (saudável): taxa de sucesso na janela,
+        penalizada quando a latência média passa do limite de chamada lenta.
+        """
+        if self.state == OPEN:
+            return 0.0
+
+        self._trim(time.monotonic())
+        calls, error_rate, _, avg_latency = self._rates()
+        if not calls:
+            return 1.0
+
+        latency_factor = min(1.0, self.slow_call_seconds / avg_latency) if avg_latency else 1.0
+        return round((1.0 - error_rate) * latency_factor, 3)
+
+    def stats(self) -> Dict[str, object]:
+        self._trim(time.monotonic())
+        calls, error_rate, slow_rate, avg_latency = self._rates()
+        return {
+            "state": self.state,
+            "health_score": self.health_score(),
+            "calls": calls,
+            "error_rate": round(error_rate, 3),
+            "slow_call_rate": round(slow_rate, 3),
+            "avg_latency_seconds": round(avg_latency, 3),
+            "rejected": self.rejected,
+            "retry_in_seconds": round(self.retry_in(), 1),
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def breakers_enabled() -> bool:
+    return env_bool("BREAKER_ENABLED", True)
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    breaker = _breakers.get(provider)
+    if breaker is None:
+        breaker = CircuitBreaker(
+            provider,
+            window_seconds=env_float("BREAKER_WINDOW_SECONDS", 60.0),
+            min_calls=env_int("BREAKER_MIN_CALLS", 5),
+            error_rate=env_float("BREAKER_ERROR_RATE", 0.5),
+            slow_call_seconds=env_float("BREAKER_SLOW_CALL_SECONDS", 20.0),
+            slow_call_rate=env_float("BREAKER_SLOW_CALL_RATE", 0.8),
+            open_seconds=env_float("BREAKER_OPEN_SECONDS", 30.0),
+            shared=get_shared_state(),
+            shared_poll_seconds=env_float("BREAKER_SHARED_POLL_SECONDS", 1.0),
+        )
+        _breakers[provider] = breaker
+    return breaker
+
+
+def breaker_stats() -> Dict[str, Dict[str, object]]:
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
+
+
+def reset_breakers(provider: Optional[str] = None) -> None:
+    if provider is None:
+        _breakers.clear()
+    else:
+        _breakers.pop(provider, None)
@@ -0,0 +1,328 @@
+# app/cache.py
+
+"""
+Cache de respostas do /ask.
+
+A chave combina a pergunta normalizada, o modo (provider único ou fusion),
+os nomes dos modelos envolvidos e a versão dos templates de prompt — se
+qualquer um deles mudar, a entrada antiga simplesmente deixa de ser usada.
+
+Backends:
+  - memória: LRU limitado (ANSWER_CACHE_MAX_ENTRIES) com TTL (ANSWER_CACHE_TTL);
+  - SQLite (opcional, ANSWER_CACHE_SQLITE_PATH): sobrevive a restarts.
+    Quando configurado, fica atrás do LRU em memória;
+  - estado compartilhado (SHARED_STATE_BACKEND, app/shared_state.py):
+    a última camada, vista por todos os workers.
+
+No event loop (get_async/set_async) as camadas com I/O são lidas e gravadas
+fora dele: o SQLite numa thread própria, o estado compartilhado na thread
+dele. Só o LRU em memória roda no loop.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from app.config import env_bool, env_float, env_int, env_str
+from app.executors import get_executor
+from app.shared_state import get_shared_state
+
+logger = logging.getLogger("iscoolgpt.cache")
+
+# Incrementar sempre que os prompts (_build_prompt, _build_messages,
+# _build_synthesis_prompt) mudarem de forma relevante.
+PROMPT_TEMPLATE_VERSION = "2"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """
+    "  O que é   VPC? " e "o que é vpc" viram a mesma chave.
+    Acentos são mantidos (em português eles mudam o sentido).
+    """
+    text = unicodedata.normalize("NFKC", question).casefold()
+    text = _WHITESPACE.sub(" ", text).strip()
+    return text.rstrip("?!.;: ")
+
+
+def cache_namespace(mode: str, models: Dict[str, str]) -> str:
+    """Identifica "modo + modelos + versão dos prompts", sem a pergunta."""
+    raw = json.dumps(
+        [PROMPT_TEMPLATE_VERSION, mode, sorted(models.items())], ensure_ascii=False
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def cache_key(question: str, mode: str, models: Dict[str, str]) -> str:
+    raw = json.dumps(
+        [PROMPT_TEMPLATE_VERSION, mode, sorted(models.items()), normalize_question(question)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# ------------------------------------------------------
+# Backends
+# ------------------------------------------------------
+class MemoryCacheBackend:
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    def __init__(self, path: str, ttl: float) -> None:
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM answers WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time() + self.ttl),
+            )
+            self._conn.commit()
+
+    async def get_async(self, key: str) -> Optional[Dict[str, Any]]:
+        return await self._executor().run(lambda: self.get(key))
+
+    async def set_async(self, key: str, value: Dict[str, Any]) -> None:
+        await self._executor().run(lambda: self.set(key, value))
+
+    @staticmethod
+    def _executor():
+        # Uma thread só: as gravações saem na ordem em que foram pedidas
+        return get_executor("answer_cache_sqlite", size=1)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SharedCacheBackend:
+    """Camada no estado compartilhado entre workers (app/shared_state.py)."""
+
+    def __init__(self, state: Any, ttl: float) -> None:
+        self.state = state
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self.state.get(f"answers:{key}")
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self.state.set(f"answers:{key}", json.dumps(value, ensure_ascii=False), self.ttl)
+
+    async def get_async(self, key: str) -> Optional[Dict[str, Any]]:
+        return await self.state.run(lambda: self.get(key))
+
+    async def set_async(self, key: str, value: Dict[str, Any]) -> None:
+        await self.state.run(lambda: self.set(key, value))
+
+    def clear(self) -> None:
+        # As entradas expiram pelo TTL; apagar o prefixo exigiria varrer o backend
+        pass
+
+
+# ------------------------------------------------------
+# Cache em camadas + contadores
+# ------------------------------------------------------
+class AnswerCache:
+    def __init__(self, backends: List[Any]) -> None:
+        # Ordem = ordem de consulta (o mais rápido primeiro)
+        self.backends = backends
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.backends)
+
+    def get(self, key: str, count: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        count=False não altera os contadores de hit/miss (usado quando a
+        chave veio do cache semântico, que tem contadores próprios).
+        """
+        for index, backend in enumerate(self.backends):
+            try:
+                value = backend.get(key)
+            except Exception as e:
+                logger.warning(f"[Cache] Falha ao ler do backend {type(backend).__name__}: {e}")
+                continue
+            if value is not None:
+                # Promove para as camadas mais rápidas
+                for faster in self.backends[:index]:
+                    faster.set(key, value)
+                return self._found(value, count)
+
+        return self._missed(count)
+
+    async def get_async(self, key: str, count: bool = True) -> Optional[Dict[str, Any]]:
+        """get() para o event loop: camadas com get_async (SQLite, estado compartilhado) não o bloqueiam."""
+        for index, backend in enumerate(self.backends):
+            try:
+                if hasattr(backend, "get_async"):
+                    value = await backend.get_async(key)
+                else:
+                    value = backend.get(key)
+            except Exception as e:
+                logger.warning(f"[Cache] Falha ao ler do backend {type(backend).__name__}: {e}")
+                continue
+            if value is not None:
+                for faster in self.backends[:index]:
+                    await self._set_async(faster, key, value)
+                return self._found(value, count)
+
+        return self._missed(count)
+
+    def _found(self, value: Dict[str, Any], count: bool) -> Dict[str, Any]:
+        if count:
+            self.hits += 1
+        return value
+
+    def _missed(self, count: bool) -> None:
+        if count:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        for backend in self.backends:
+            try:
+                backend.set(key, value)
+            except Exception as e:
+                logger.warning(f"[Cache] Falha ao gravar no backend {type(backend).__name__}: {e}")
+
+    async def set_async(self, key: str, value: Dict[str, Any]) -> None:
+        for backend in self.backends:
+            await self._set_async(backend, key, value)
+
+    @staticmethod
+    async def _set_async(backend: Any, key: str, value: Dict[str, Any]) -> None:
+        try:
+            if hasattr(backend, "set_async"):
+                await backend.set_async(key, value)
+            else:
+                backend.set(key, value)
+        except Exception as e:
+            logger.warning(f"[Cache] Falha ao gravar no backend {type(backend).__name__}: {e}")
+
+    def record_bypass(self) -> None:
+        self.bypasses += 1
+
+    def clear(self) -> None:
+        for backend in self.backends:
+            backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "backends": [type(backend).__name__ for backend in self.backends],
+        }
+
+
+def build_answer_cache() -> AnswerCache:
+    if not env_bool("ANSWER_CACHE_ENABLED", True):
+        return AnswerCache([])
+
+    ttl = env_float("ANSWER_CACHE_TTL", 24 * 3600.0)
+    backends: List[Any] = [
+        MemoryCacheBackend(env_int("ANSWER_CACHE_MAX_ENTRIES", 1024), ttl)
+    ]
+
+    sqlite_path = env_str("ANSWER_CACHE_SQLITE_PATH")
+    if sqlite_path:
+        try:
+            backends.append(SQLiteCacheBackend(sqlite_path, ttl))
+        except sqlite3.Error as e:
+            logger.warning(f"[Cache] Não foi possível abrir {sqlite_path}: {e}")
+
+    # Com vários workers, o que um deles respondeu serve para todos
+    state = get_shared_state()
+    if state is not None:
+        backends.append(SharedCacheBackend(state, ttl))
+
+    return AnswerCache(backends)
+
+
+# ------------------------------------------------------
+# Bypass pelo cliente
+# ------------------------------------------------------
+CACHE_BYPASS_HEADER = "X-Cache-Bypass"
+
+
+def wants_bypass(headers: Mapping[str, str]) -> bool:
+    """
+    O cliente pode pular o cache com `X-Cache-Bypass: 1` ou
+    `Cache-Control: no-cache`. A resposta nova ainda é gravada no cache.
+    """
+    if headers.get(CACHE_BYPASS_HEADER, "").strip().lower() in ("1", "true", "yes"):
+        return True
+    return "no-cache" in headers.get("Cache-Control", "").lower()
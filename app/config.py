@@ -0,0 +1,56 @@
+# app/config.py
+
+"""
+Helpers para ler configuração das variáveis de ambiente.
+
+Tudo é lido sob demanda (e não no import), para que mudanças no ambiente
+— testes com monkeypatch, reload de configuração — tenham efeito sem
+reiniciar o processo.
+"""
+
+import os
+from typing import List, Optional
+
+
+_TRUE_VALUES = {"1", "true", "yes", "on", "sim"}
+
+
+def env_str(name: str, default: Optional[str] = None) -> Optional[str]:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip()
+
+
+def env_int(name: str, default: int) -> int:
+    value = env_str(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise RuntimeError(f"{name} deve ser um número inteiro (recebido: {value!r}).")
+
+
+def env_float(name: str, default: float) -> float:
+    value = env_str(name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise RuntimeError(f"{name} deve ser um número (recebido: {value!r}).")
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    value = env_str(name)
+    if value is None:
+        return default
+    return value.lower() in _TRUE_VALUES
+
+
+def env_list(name: str, default: Optional[List[str]] = None) -> List[str]:
+    value = env_str(name)
+    if value is None:
+        return list(default or [])
+    return [item.strip() for item in value.split(",") if item.strip()]
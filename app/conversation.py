@@ -0,0 +1,115 @@
+# app/conversation.py
+
+"""
+Contexto de conversa (sessões multi-turno) para os providers.
+
+O /ask com `session_id` define, via contextvar, o histórico já compactado
+da sessão (resumo + últimos turnos, dentro do orçamento de tokens —
+app/sessions.py). Os clientes dos providers o leem ao montar a requisição
+e o enviam como mensagens de chat de verdade; sem sessão, nada muda.
+Como o contexto é um contextvar, as tasks do fan-out o herdam, igual ao
+deadline (app/deadline.py).
+"""
+
+import hashlib
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+SUMMARY_HEADER = "Resumo da conversa até aqui:"
+
+
+class Conversation(NamedTuple):
+    summary: str
+    # (papel, texto), do turno mais antigo para o mais recente;
+    # papel é "user" ou "assistant"
+    turns: Tuple[Tuple[str, str], ...]
+
+
+_current_conversation: ContextVar[Optional[Conversation]] = ContextVar(
+    "iscoolgpt_conversation", default=None
+)
+
+
+def get_conversation() -> Optional[Conversation]:
+    """O contexto da requisição atual, ou None se não houver histórico."""
+    conversation = _current_conversation.get()
+    if conversation is None or (not conversation.summary and not conversation.turns):
+        return None
+    return conversation
+
+
+@contextmanager
+def conversation_scope(conversation: Optional[Conversation]) -> Iterator[Optional[Conversation]]:
+    """Define o histórico enviado pelas chamadas feitas dentro do bloco."""
+    token = _current_conversation.set(conversation)
+    try:
+        yield conversation
+    finally:
+        _current_conversation.reset(token)
+
+
+def conversation_key() -> str:
+    """
+    Impressão digital do contexto atual ("" sem histórico). Entra nas chaves
+    de single-flight: a mesma pergunta em conversas diferentes não é a mesma
+    chamada.
+    """
+    conversation = get_conversation()
+    if conversation is None:
+        return ""
+    raw = json.dumps([conversation.summary, conversation.turns], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+# ------------------------------------------------------
+# Formatos de cada API
+# ------------------------------------------------------
+def openai_history() -> List[Dict[str, str]]:
+    """Mensagens no formato de chat completions (HF, DeepSeek)."""
+    conversation = get_conversation()
+    if conversation is None:
+        return []
+
+    messages = []
+    if conversation.summary:
+        messages.append({"role": "system", "content": f"{SUMMARY_HEADER}\n{conversation.summary}"})
+    messages.extend({"role": role, "content": text} for role, text in conversation.turns)
+    return messages
+
+
+def gemini_history() -> List[Dict[str, Any]]:
+    """Conteúdos no formato do Gemini (papel "model" no lugar de "assistant")."""
+    conversation = get_conversation()
+    if conversation is None:
+        return []
+
+    contents = []
+    if conversation.summary:
+        # O Gemini exige turnos alternados começando pelo usuário
+        contents.append({"role": "user", "parts": [{"text": f"{SUMMARY_HEADER}\n{conversation.summary}"}]})
+        contents.append({"role": "model", "parts": [{"text": "Entendido."}]})
+    for role, text in conversation.turns:
+        contents.append({
+            "role": "model" if role == "assistant" else "user",
+            "parts": [{"text": text}],
+        })
+    return contents
+
+
+def conversation_block() -> str:
+    """
+    Histórico em texto, para prompts de um turno só (síntese do fusion).
+    Vazio sem sessão, para não alterar o prompt de quem não usa sessões.
+    """
+    conversation = get_conversation()
+    if conversation is None:
+        return ""
+
+    lines = []
+    if conversation.summary:
+        lines.append(f"{SUMMARY_HEADER}\n{conversation.summary}")
+    for role, text in conversation.turns:
+        lines.append(f"{'Aluno' if role == 'user' else 'Assistente'}: {text}")
+    return "Contexto da conversa (a pergunta pode depender dele):\n" + "\n\n".join(lines) + "\n\n"
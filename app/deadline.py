@@ -0,0 +1,77 @@
+# app/deadline.py
+
+"""
+Orçamento de tempo (deadline) de ponta a ponta para uma requisição.
+
+O deadline é definido pela configuração (ASK_DEADLINE_SECONDS) ou pelo
+cliente (header X-Request-Timeout, em segundos, limitado a
+ASK_DEADLINE_MAX_SECONDS) e propagado via contextvar: provider_timeout()
+nunca devolve um timeout maior que o tempo que ainda resta.
+"""
+
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Mapping, Optional
+
+from app.config import env_float
+
+DEADLINE_HEADER = "X-Request-Timeout"
+
+# O idle timeout padrão do ALB é 60s: o deadline precisa caber com folga.
+DEFAULT_DEADLINE_SECONDS = 25.0
+DEFAULT_MAX_DEADLINE_SECONDS = 55.0
+
+
+class Deadline:
+    def __init__(self, seconds: float) -> None:
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def __repr__(self) -> str:
+        return f"Deadline(budget={self.budget:.1f}s, remaining={self.remaining():.1f}s)"
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar(
+    "iscoolgpt_deadline", default=None
+)
+
+
+def get_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Define o deadline das chamadas feitas dentro do bloco (e das tasks criadas nele)."""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def request_deadline(headers: Mapping[str, str]) -> Deadline:
+    default = env_float("ASK_DEADLINE_SECONDS", DEFAULT_DEADLINE_SECONDS)
+    maximum = env_float("ASK_DEADLINE_MAX_SECONDS", DEFAULT_MAX_DEADLINE_SECONDS)
+
+    seconds = default
+    raw = headers.get(DEADLINE_HEADER)
+    if raw:
+        try:
+            seconds = float(raw)
+        except ValueError:
+            seconds = default
+        if not math.isfinite(seconds):
+            # "nan" expiraria na hora e "inf" não é um prazo
+            seconds = default
+
+    return Deadline(min(max(seconds, 0.1), maximum))
@@ -0,0 +1,122 @@
+# app/executors.py
+
+"""
+Thread pools dedicados por provider.
+
+Usados apenas como fallback para SDKs bloqueantes (ex.: GEMINI_BACKEND=sdk).
+Cada provider tem o seu próprio pool — o tamanho vem de
+<PROVIDER>_THREAD_POOL_SIZE — para que um provider lento não consuma as
+threads do limiter global do anyio (40 tokens) nem as dos outros providers.
+O estado compartilhado (app/shared_state.py) tem um pool próprio também.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, TypeVar
+
+from app.config import env_int
+
+T = TypeVar("T")
+
+DEFAULT_THREAD_POOL_SIZE = 8
+
+
+class ProviderExecutor:
+    def __init__(self, name: str, max_workers: int) -> None:
+        self.name = name
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=f"{name}-worker",
+        )
+        self._lock = threading.Lock()
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+
+    async def run(self, fn: Callable[[], T]) -> T:
+        return await self.submit(fn)
+
+    def submit(self, fn: Callable[[], T]) -> "asyncio.Future[T]":
+        """Enfileira `fn` já (na ordem das chamadas) e devolve o future, para quem não vai esperar."""
+        loop = asyncio.get_running_loop()
+        # Quem tirar a tarefa da contagem de "queued" primeiro (o worker ao
+        # começar ou o cancelamento) marca aqui, sob o lock; o outro não desconta
+        dequeued = False
+
+        def _dequeue() -> bool:
+            nonlocal dequeued
+            if dequeued:
+                return False
+            dequeued = True
+            self.queued -= 1
+            return True
+
+        def _wrapped() -> T:
+            with self._lock:
+                _dequeue()
+                self.active += 1
+            try:
+                return fn()
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+
+        def _cancelled(future: "asyncio.Future[T]") -> None:
+            # Se a tarefa foi cancelada antes de começar, ela nunca vai rodar
+            if future.cancelled():
+                with self._lock:
+                    _dequeue()
+
+        with self._lock:
+            self.queued += 1
+
+        future = loop.run_in_executor(self._pool, _wrapped)
+        future.add_done_callback(_cancelled)
+        return future
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "active": self.active,
+                "queued": self.queued,
+                "completed": self.completed,
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executors: Dict[str, ProviderExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(provider: str, size: Optional[int] = None) -> ProviderExecutor:
+    """`size` fixa o tamanho do pool (sem <PROVIDER>_THREAD_POOL_SIZE)."""
+    with _executors_lock:
+        executor = _executors.get(provider)
+        if executor is None:
+            if size is None:
+                size = env_int(
+                    f"{provider.upper()}_THREAD_POOL_SIZE", DEFAULT_THREAD_POOL_SIZE
+                )
+            executor = ProviderExecutor(provider, max(1, size))
+            _executors[provider] = executor
+        return executor
+
+
+def executor_stats() -> Dict[str, Dict[str, int]]:
+    with _executors_lock:
+        executors = list(_executors.values())
+    return {executor.name: executor.stats() for executor in executors}
+
+
+def shutdown_executors() -> None:
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown()
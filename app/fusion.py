@@ -0,0 +1,79 @@
+# app/fusion.py
+
+"""
+Topologia do modo FUSION (lida do ambiente a cada requisição):
+
+  - FUSION_PROVIDERS: providers que respondem à pergunta, separados por
+    vírgula (padrão "gemini,huggingface"; também "deepseek_chat");
+  - FUSION_QUORUM: quantas respostas válidas bastam para seguir (k de N).
+    Assim que as k mais rápidas chegam, as demais são canceladas e a síntese
+    começa — um provider lento não segura a resposta. Padrão: N (espera todos);
+  - FUSION_SYNTHESIZER: quem sintetiza ("gemini_reasoner", padrão, ou
+    "deepseek_reasoner").
+"""
+
+import logging
+import string
+from typing import List, Sequence
+
+from app.config import env_int, env_str
+
+logger = logging.getLogger("iscoolgpt.fusion")
+
+DEFAULT_FUSION_PROVIDERS = ("gemini", "huggingface")
+FUSION_SYNTHESIZERS = ("gemini_reasoner", "deepseek_reasoner")
+DEFAULT_SYNTHESIZER = "gemini_reasoner"
+
+
+def fusion_providers() -> List[str]:
+    configured = env_str("FUSION_PROVIDERS")
+    if configured is None:
+        return list(DEFAULT_FUSION_PROVIDERS)
+
+    names: List[str] = []
+    for name in (item.strip() for item in configured.split(",")):
+        if name and name not in names:
+            names.append(name)
+    return names or list(DEFAULT_FUSION_PROVIDERS)
+
+
+def fusion_quorum(total: int) -> int:
+    """k entre 1 e N; fora disso (ou não configurado) vale N."""
+    quorum = env_int("FUSION_QUORUM", total)
+    if quorum < 1 or quorum > total:
+        return total
+    return quorum
+
+
+def fusion_synthesizer() -> str:
+    name = env_str("FUSION_SYNTHESIZER", DEFAULT_SYNTHESIZER)
+    if name not in FUSION_SYNTHESIZERS:
+        logger.warning(
+            f"[Fusion] FUSION_SYNTHESIZER inválido: '{name}'; usando {DEFAULT_SYNTHESIZER}."
+        )
+        return DEFAULT_SYNTHESIZER
+    return name
+
+
+def synthesis_prompt(
+    head: str, answers: Sequence[str], title: str, tail: str, numbered: bool = False
+) -> str:
+    """
+    Prompt de síntese no formato:
+
+        <head>Resposta A:
+        <texto>
+
+        Resposta B:
+        <texto><tail>
+
+    Montado num único join: as respostas são o grosso do prompt (KBs cada)
+    e cada bloco ou template intermediário copiaria todas de novo.
+    """
+    parts = [head]
+    for index, text in enumerate(answers):
+        label = str(index + 1) if numbered else string.ascii_uppercase[index % 26]
+        parts.append(f"\n\n{title} {label}:\n" if index else f"{title} {label}:\n")
+        parts.append(text)
+    parts.append(tail)
+    return "".join(parts)
@@ -0,0 +1,133 @@
+# app/http_client.py
+
+"""
+Pool HTTP compartilhado por todos os providers compatíveis com a API OpenAI
+(HuggingFace Router, DeepSeek Chat e DeepSeek Reasoner).
+
+O cliente é aberto e fechado pelo lifespan do FastAPI (app/main.py).
+Fora do servidor (scripts, testes) ele é criado sob demanda no primeiro uso.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+import httpx
+
+from app.config import env_bool, env_float, env_int
+from app.deadline import get_deadline
+
+logger = logging.getLogger("iscoolgpt.http")
+
+
+# Timeouts padrão (em segundos) de cada provider — os mesmos valores que
+# antes estavam fixos em cada cliente. Sobrescreva via <PROVIDER>_TIMEOUT,
+# ex.: HUGGINGFACE_TIMEOUT=20
+DEFAULT_PROVIDER_TIMEOUTS = {
+    "gemini": 60.0,
+    "gemini_reasoner": 60.0,
+    "huggingface": 40.0,
+    "deepseek_chat": 40.0,
+    "deepseek_reasoner": 50.0,
+}
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def provider_timeout(provider: str) -> httpx.Timeout:
+    """
+    Timeout de uma chamada para o provider informado.
+    O connect timeout é global (HTTP_CONNECT_TIMEOUT) e nunca maior que o total.
+    Se a requisição tiver um deadline, o timeout não passa do tempo restante.
+    """
+    total = env_float(
+        f"{provider.upper()}_TIMEOUT",
+        DEFAULT_PROVIDER_TIMEOUTS.get(provider, 40.0),
+    )
+
+    deadline = get_deadline()
+    if deadline is not None:
+        total = min(total, max(deadline.remaining(), 0.1))
+    connect = env_float("HTTP_CONNECT_TIMEOUT", 5.0)
+    return httpx.Timeout(total, connect=min(connect, total))
+
+
+def _http2_enabled() -> bool:
+    if not env_bool("HTTP_HTTP2", False):
+        return False
+
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning(
+            "[HTTP] HTTP_HTTP2=true, mas o pacote 'h2' não está instalado. "
+            "Usando HTTP/1.1 (pip install 'httpx[http2]')."
+        )
+        return False
+
+    return True
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=env_int("HTTP_MAX_CONNECTIONS", 100),
+        max_keepalive_connections=env_int("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20),
+        keepalive_expiry=env_float("HTTP_KEEPALIVE_EXPIRY", 30.0),
+    )
+
+    http2 = _http2_enabled()
+    logger.info(
+        f"[HTTP] Abrindo pool compartilhado (max_connections={limits.max_connections}, "
+        f"keepalive={limits.max_keepalive_connections}, http2={http2})"
+    )
+
+    return httpx.AsyncClient(
+        limits=limits,
+        http2=http2,
+        timeout=httpx.Timeout(60.0, connect=5.0),
+    )
+
+
+def _client_usable(loop: asyncio.AbstractEventLoop) -> bool:
+    return _client is not None and not _client.is_closed and _client_loop is loop
+
+
+async def open_http_client() -> httpx.AsyncClient:
+    """Abre o pool (chamado no startup da aplicação)."""
+    global _client, _client_loop
+
+    loop = asyncio.get_running_loop()
+    if not _client_usable(loop):
+        # Um pool de outro event loop (já encerrado) não pode ser reaproveitado
+        # nem fechado daqui: as conexões dele morreram com o loop
+        _client = _build_client()
+        _client_loop = loop
+
+    return _client
+
+
+async def close_http_client() -> None:
+    """Fecha o pool e todas as conexões keep-alive (chamado no shutdown)."""
+    global _client, _client_loop
+
+    client, _client, _client_loop = _client, None, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Retorna o cliente compartilhado.
+
+    Se o pool ainda não foi aberto (ou pertence a outro event loop, como
+    acontece com vários asyncio.run() em scripts e testes), cria um novo.
+    """
+    global _client, _client_loop
+
+    loop = asyncio.get_running_loop()
+    if not _client_usable(loop):
+        _client = _build_client()
+        _client_loop = loop
+
+    return _client
@@ -0,0 +1,378 @@
+# app/jobs.py
+
+"""
+Modo assíncrono: POST /ask/jobs devolve um id na hora e a pergunta é
+respondida em segundo plano, sem prender a conexão HTTP (nem o worker do
+uvicorn) pelos 30s+ de um fusion — e sem esbarrar no idle timeout do ALB.
+
+  - JOBS_WORKERS (4): jobs respondidos ao mesmo tempo, cada um pelo mesmo
+    caminho do /ask (cache, single-flight, router), com deadline próprio de
+    JOBS_DEADLINE_SECONDS (120s, já que não há conexão esperando);
+  - JOBS_MAX_QUEUE (100): jobs esperando um worker. Com a fila cheia o
+    POST responde 503 + Retry-After, em vez de acumular trabalho sem limite;
+  - JOBS_MAX_STORED (10 mil) / JOBS_TTL_SECONDS (1h): jobs guardados para
+    consulta. Jobs terminados expiram após o TTL e, acima do limite, os
+    terminados há mais tempo saem primeiro;
+  - JOBS_SQLITE_PATH: se definido, cada mudança de estado é gravada num
+    SQLite. Num restart os jobs terminados voltam a ser consultáveis e os
+    que estavam na fila (ou rodando) voltam para a fila — de um worker só:
+    cada um reivindica o job com um UPDATE condicional no dono, e só quem
+    ganha a disputa o roda de novo.
+
+O cliente acompanha o job por GET /ask/jobs/{id} (polling) ou pelo
+WebSocket /ask/jobs/{id}/ws, que envia o estado a cada mudança.
+
+Com vários workers, o job roda no worker que recebeu o POST. Com
+SHARED_STATE_BACKEND (app/shared_state.py) cada mudança de estado também vai
+para o estado compartilhado, e o GET/WebSocket que cair em outro worker lê
+de lá (o WebSocket consulta a cada JOBS_SHARED_POLL_SECONDS, 0.5s).
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.config import env_float, env_int, env_str
+from app.deadline import Deadline
+from app.pipeline import answer_question
+from app.schemas import JobStatus
+from app.shared_state import get_shared_state
+
+logger = logging.getLogger("iscoolgpt.jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+FINISHED = (DONE, ERROR)
+
+
+class JobQueueFull(Exception):
+    """A fila de jobs está cheia; o cliente deve tentar de novo mais tarde."""
+
+
+# ------------------------------------------------------
+# Persistência opcional (SQLite)
+# ------------------------------------------------------
+class SQLiteJobBackend:
+    """
+    Uma linha por job, com o JobStatus inteiro em JSON e o worker dono
+    (owner). As gravações rodam numa única thread dedicada: ficam fora do
+    event loop e na mesma ordem em que foram pedidas (queued → running →
+    done nunca se invertem).
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jobs-sqlite")
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, status TEXT NOT NULL,"
+                " created_at REAL NOT NULL, finished_at REAL, data TEXT NOT NULL,"
+                " owner TEXT)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "owner" not in columns:
+                # Arquivo de uma versão anterior
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+
+    async def _run(self, fn, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, fn, *args)
+
+    def _save(self, job: JobStatus, owner: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, status, created_at, finished_at, data, owner)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (job.id, job.status, job.created_at, job.finished_at, job.model_dump_json(), owner),
+            )
+
+    def _claim(self, job_id: str, owner: str, previous: Optional[str]) -> bool:
+        # Troca de dono atômica: com vários workers lendo o mesmo arquivo no
+        # restart, só o primeiro UPDATE ainda encontra o dono antigo
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = ? WHERE id = ? AND status IN (?, ?)"
+                " AND owner IS ?",
+                (QUEUED, owner, job_id, QUEUED, RUNNING, previous),
+            )
+        return cursor.rowcount == 1
+
+    def _delete(self, ids: List[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in ids])
+
+    def _load(self, ttl: float) -> List[Tuple[JobStatus, Optional[str]]]:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - ttl,),
+            )
+            rows = self._conn.execute("SELECT data, owner FROM jobs ORDER BY created_at").fetchall()
+        return [(JobStatus.model_validate_json(data), owner) for data, owner in rows]
+
+    async def save(self, job: JobStatus, owner: str) -> None:
+        # Cópia: o job pode mudar de novo antes de a thread gravar
+        await self._run(self._save, job.model_copy(), owner)
+
+    async def claim(self, job_id: str, owner: str, previous: Optional[str]) -> bool:
+        """Passa o job interrompido para `owner` se ele ainda for de `previous`."""
+        return await self._run(self._claim, job_id, owner, previous)
+
+    async def delete(self, ids: List[str]) -> None:
+        if ids:
+            await self._run(self._delete, ids)
+
+    async def load(self, ttl: float) -> List[Tuple[JobStatus, Optional[str]]]:
+        return await self._run(self._load, ttl)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+
+# ------------------------------------------------------
+# Fila, workers e assinantes
+# ------------------------------------------------------
+class JobManager:
+    def __init__(
+        self,
+        workers: int,
+        max_queue: int,
+        max_stored: int,
+        ttl: float,
+        backend: Optional[SQLiteJobBackend] = None,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.max_stored = max(1, max_stored)
+        self.ttl = ttl
+        self.backend = backend
+        # Identifica este worker (processo) como dono dos jobs que roda
+        self.owner = uuid.uuid4().hex
+
+        self._jobs: Dict[str, JobStatus] = {}
+        # Jobs terminados, do que terminou há mais tempo para o mais recente
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self._subscribers: Dict[str, Set["asyncio.Queue[JobStatus]"]] = {}
+        self._queue: Optional["asyncio.Queue[str]"] = None
+        self._tasks: List[asyncio.Task] = []
+        self._stats = {"submitted": 0, "rejected": 0, "done": 0, "error": 0, "evicted": 0}
+
+    # ---------------- ciclo de vida ----------------
+    async def start(self) -> None:
+        """Recarrega o SQLite (se houver) e sobe os workers."""
+        self._spawn_workers()
+        if self.backend is None:
+            return
+
+        restored = requeued = 0
+        for job, owner in await self.backend.load(self.ttl):
+            if job.id in self._jobs:
+                continue
+            if job.status not in FINISHED:
+                # Interrompido pelo restart: volta para a fila do zero, na
+                # fila de quem o reivindicar primeiro
+                if not await self.backend.claim(job.id, self.owner, owner):
+                    continue
+                if self._queue.full():
+                    self._finish(job, error="Job descartado no restart: fila cheia.")
+                    await self.backend.save(job, self.owner)
+                    continue
+                job.status, job.started_at = QUEUED, None
+                self._jobs[job.id] = job
+                self._queue.put_nowait(job.id)
+                requeued += 1
+            else:
+                self._jobs[job.id] = job
+                self._finished[job.id] = job.finished_at or time.time()
+            restored += 1
+        await self._evict()
+        logger.info(
+            f"[Jobs] {restored} jobs recarregados de {self.backend.path} ({requeued} de volta à fila)"
+        )
+
+    def _spawn_workers(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    # ---------------- API ----------------
+    async def submit(self, question: str, providers: List[str]) -> JobStatus:
+        self._spawn_workers()
+        await self._evict()
+        if self._queue.full():
+            self._stats["rejected"] += 1
+            raise JobQueueFull(f"Fila de jobs cheia ({self.max_queue} aguardando).")
+
+        job = JobStatus(
+            id=uuid.uuid4().hex,
+            status=QUEUED,
+            question=question,
+            providers=providers,
+            created_at=time.time(),
+        )
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job.id)
+        self._stats["submitted"] += 1
+        await self._persist(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[JobStatus]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return await self.get_shared(job_id)
+        if job.status in FINISHED and self._expired(job_id):
+            return None
+        return job
+
+    def is_local(self, job_id: str) -> bool:
+        """O job roda (ou rodou) neste worker: as mudanças chegam pelo subscribe."""
+        return job_id in self._jobs
+
+    async def get_shared(self, job_id: str) -> Optional[JobStatus]:
+        """Job de outro worker, pelo estado compartilhado (None se não configurado)."""
+        state = get_shared_state()
+        if state is None:
+            return None
+        raw = await state.run(lambda: state.get(f"job:{job_id}"))
+        return JobStatus.model_validate_json(raw) if raw is not None else None
+
+    def subscribe(self, job_id: str) -> "asyncio.Queue[JobStatus]":
+        """Fila que recebe uma cópia do job a cada mudança de estado."""
+        updates: "asyncio.Queue[JobStatus]" = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(updates)
+        return updates
+
+    def unsubscribe(self, job_id: str, updates: "asyncio.Queue[JobStatus]") -> None:
+        subscribers = self._subscribers.get(job_id)
+        if subscribers is not None:
+            subscribers.discard(updates)
+            if not subscribers:
+                del self._subscribers[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        by_status = {QUEUED: 0, RUNNING: 0, DONE: 0, ERROR: 0}
+        for job in self._jobs.values():
+            by_status[job.status] += 1
+        return {
+            **self._stats,
+            "stored": len(self._jobs),
+            "by_status": by_status,
+            "queue_size": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "workers": self.workers,
+            "sqlite": self.backend.path if self.backend is not None else None,
+        }
+
+    # ---------------- internos ----------------
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None:
+                continue
+            await self._run(job)
+
+    async def _run(self, job: JobStatus) -> None:
+        job.status, job.started_at = RUNNING, time.time()
+        await self._changed(job)
+
+        deadline = Deadline(env_float("JOBS_DEADLINE_SECONDS", 120.0))
+        try:
+            response, cache_status = await answer_question(
+                job.question, job.providers, deadline=deadline
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"[Jobs] Erro no job {job.id}: {e}")
+            self._finish(job, error=f"{type(e).__name__}: {e}")
+        else:
+            self._finish(job, response=response, cache=cache_status)
+        await self._changed(job)
+
+    def _finish(self, job: JobStatus, error: Optional[str] = None, **fields: Any) -> None:
+        job.status = ERROR if error else DONE
+        job.error = error
+        job.finished_at = time.time()
+        for name, value in fields.items():
+            setattr(job, name, value)
+        self._stats[job.status] += 1
+        self._finished[job.id] = job.finished_at
+
+    async def _changed(self, job: JobStatus) -> None:
+        for updates in self._subscribers.get(job.id, ()):
+            updates.put_nowait(job.model_copy())
+        await self._persist(job)
+
+    async def _persist(self, job: JobStatus) -> None:
+        state = get_shared_state()
+        if state is not None:
+            raw = job.model_dump_json()
+            await state.run(lambda: state.set(f"job:{job.id}", raw, self.ttl))
+
+        if self.backend is None:
+            return
+        try:
+            await self.backend.save(job, self.owner)
+        except Exception as e:
+            # O SQLite é só para sobreviver a restarts: não derruba o job
+            logger.warning(f"[Jobs] Não foi possível gravar o job {job.id}: {e}")
+
+    def _expired(self, job_id: str) -> bool:
+        finished_at = self._finished.get(job_id)
+        return finished_at is not None and time.time() - finished_at > self.ttl
+
+    async def _evict(self) -> None:
+        """Remove os expirados e, acima de JOBS_MAX_STORED, os terminados mais antigos."""
+        removed: List[str] = []
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            expired = time.time() - finished_at > self.ttl
+            if not expired and len(self._jobs) < self.max_stored:
+                break
+            self._finished.popitem(last=False)
+            self._jobs.pop(job_id, None)
+            removed.append(job_id)
+            self._stats["evicted"] += 1
+
+        if removed and self.backend is not None:
+            try:
+                await self.backend.delete(removed)
+            except Exception as e:
+                logger.warning(f"[Jobs] Não foi possível remover jobs do SQLite: {e}")
+
+
+def build_job_manager() -> JobManager:
+    path = env_str("JOBS_SQLITE_PATH")
+    return JobManager(
+        workers=env_int("JOBS_WORKERS", 4),
+        max_queue=env_int("JOBS_MAX_QUEUE", 100),
+        max_stored=env_int("JOBS_MAX_STORED", 10_000),
+        ttl=env_float("JOBS_TTL_SECONDS", 3600.0),
+        backend=SQLiteJobBackend(path) if path else None,
+    )
+
+
+job_manager = build_job_manager()
@@ -1,7 +1,25 @@
 from abc import ABC, abstractmethod
+from typing import AsyncIterator
 
 class LLMClient(ABC):
 
     @abstractmethod
     async def ask(self, prompt: str) -> str:
-        pass
\ No newline at end of file
+        pass
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Gera a resposta em pedaços conforme ela chega.
+        Providers sem suporte a streaming devolvem a resposta inteira
+        como um único pedaço.
+        """
+        yield await self.ask(prompt)
+
+
+# Prefixos usados pelos clientes quando devolvem um erro como texto
+# (ex.: "[ERRO HuggingFace] HTTP 429: ..." ou "Erro inesperado no Gemini Reasoner")
+ERROR_ANSWER_PREFIXES = ("[ERRO", "Erro:", "Erro inesperado")
+
+
+def is_error_answer(text: str) -> bool:
+    return text.lstrip().startswith(ERROR_ANSWER_PREFIXES)
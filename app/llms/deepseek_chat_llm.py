@@ -1,8 +1,13 @@
 # app/llms/deepseek_chat_llm.py
 
 import os
-import httpx
+from typing import AsyncIterator
+
+from app.conversation import openai_history
 from app.llm_base import LLMClient
+from app.http_client import get_http_client, provider_timeout
+from app.retry import with_retries
+from app.llms.openai_compat import stream_chat_completion
 
 
 class DeepSeekChatLLM(LLMClient):
@@ -11,6 +16,8 @@ class DeepSeekChatLLM(LLMClient):
     Aqui usamos um modelo de chat/coder do DeepSeek.
     """
 
+    ENV_VARS = ("DEEPSEEK_API_KEY", "DEEPSEEK_CHAT_MODEL", "DEEPSEEK_API_BASE")
+
     def __init__(self, model_name: str = None):
         self.api_key = os.getenv("DEEPSEEK_API_KEY")
         if not self.api_key:
@@ -21,7 +28,8 @@ class DeepSeekChatLLM(LLMClient):
             "DEEPSEEK_CHAT_MODEL", "deepseek-coder"
         )
 
-        self.url = "https://api.deepseek.com/chat/completions"
+        base_url = os.getenv("DEEPSEEK_API_BASE", "https://api.deepseek.com")
+        self.url = f"{base_url.rstrip('/')}/chat/completions"
 
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -53,22 +61,28 @@ Regras de resposta:
 
         return f"{system_instructions}\n\n--- pergunta do usuário ---\n{user_prompt}\n"
 
-    async def ask(self, prompt: str) -> str:
-        final_prompt = self._build_prompt(prompt)
-
-        body = {
+    def _build_body(self, user_prompt: str) -> dict:
+        return {
             "model": self.model_name,
             "messages": [
-                {"role": "user", "content": final_prompt}
+                *openai_history(),
+                {"role": "user", "content": self._build_prompt(user_prompt)}
             ]
         }
 
-        async with httpx.AsyncClient(timeout=40) as client:
-            response = await client.post(
+    async def ask(self, prompt: str) -> str:
+        body = self._build_body(prompt)
+
+        client = get_http_client()
+        response = await with_retries(
+            "deepseek_chat",
+            lambda: client.post(
                 self.url,
                 headers=self.headers,
-                json=body
-            )
+                json=body,
+                timeout=provider_timeout("deepseek_chat"),
+            ),
+        )
 
         if response.status_code != 200:
             # aqui mantemos o erro visível para debug,
@@ -84,3 +98,13 @@ Regras de resposta:
             return data["choices"][0]["message"]["content"]
         except Exception:
             return str(data)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        async for chunk in stream_chat_completion(
+            self.url,
+            self.headers,
+            self._build_body(prompt),
+            provider_timeout("deepseek_chat"),
+            "ERRO DeepSeek-Chat",
+        ):
+            yield chunk
@@ -1,16 +1,24 @@
 # app/llms/deepseek_reasoner_llm.py
 
 import os
-import httpx
+from typing import AsyncIterator
+
+from app.conversation import conversation_block
 from app.llm_base import LLMClient
+from app.http_client import get_http_client, provider_timeout
+from app.retry import with_retries
+from app.fusion import synthesis_prompt
+from app.llms.openai_compat import stream_chat_completion
 
 
 class DeepSeekReasonerLLM(LLMClient):
     """
-    Modelo para síntese entre LLMs (Gemini + HuggingFace).
+    Modelo para síntese entre LLMs (FUSION_SYNTHESIZER=deepseek_reasoner).
     Modelo recomendado: deepseek-r1
     """
 
+    ENV_VARS = ("DEEPSEEK_API_KEY", "DEEPSEEK_REASONER_MODEL", "DEEPSEEK_API_BASE")
+
     def __init__(self, model_name: str = None):
         self.api_key = os.getenv("DEEPSEEK_API_KEY")
         if not self.api_key:
@@ -20,22 +28,22 @@ class DeepSeekReasonerLLM(LLMClient):
             "DEEPSEEK_REASONER_MODEL", "deepseek-r1"
         )
 
-        self.url = "https://api.deepseek.com/chat/completions"
+        base_url = os.getenv("DEEPSEEK_API_BASE", "https://api.deepseek.com")
+        self.url = f"{base_url.rstrip('/')}/chat/completions"
 
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
 
-    def _build_synthesis_prompt(self, question: str, gemini: str, hf: str) -> str:
-        return f"""
-Você é o IsCoolGPT-Sintetizador, especializado em combinar respostas de múltiplos modelos de IA
+    def _build_synthesis_prompt(self, question: str, *answers: str) -> str:
+        head = f"""Você é o IsCoolGPT-Sintetizador, especializado em combinar respostas de múltiplos modelos de IA
 (Gemini, HuggingFace, etc.) e produzir a versão FINAL mais correta, clara e completa.
 
 Sua tarefa:
 
 1. Leia a pergunta original do usuário.
-2. Leia duas respostas fornecidas por outros modelos.
+2. Leia as {len(answers)} respostas fornecidas por outros modelos.
 3. Compare as respostas:
    - identifique pontos corretos,
    - elimine contradições,
@@ -55,30 +63,36 @@ Regras extras:
 - Se houver divergências entre as respostas, escolha a correta.
 - Não invente informações.
 
-PERGUNTA DO USUÁRIO:
+{conversation_block()}PERGUNTA DO USUÁRIO:
 {question}
 
-RESPOSTA 1 (Gemini):
-{gemini}
-
-RESPOSTA 2 (HuggingFace):
-{hf}
-
-RESPOSTA FINAL DO ASSISTENTE:
-""".strip()
-
-    async def synthesize(self, question: str, gemini: str, hf: str) -> str:
-        prompt = self._build_synthesis_prompt(question, gemini, hf)
+"""
+        return synthesis_prompt(
+            head, answers, "RESPOSTA", "\n\nRESPOSTA FINAL DO ASSISTENTE:", numbered=True
+        )
 
-        body = {
+    def _build_body(self, prompt: str) -> dict:
+        return {
             "model": self.model_name,
             "messages": [
                 {"role": "user", "content": prompt}
             ]
         }
 
-        async with httpx.AsyncClient(timeout=50) as client:
-            response = await client.post(self.url, headers=self.headers, json=body)
+    async def synthesize(self, question: str, *answers: str) -> str:
+        prompt = self._build_synthesis_prompt(question, *answers)
+        body = self._build_body(prompt)
+
+        client = get_http_client()
+        response = await with_retries(
+            "deepseek_reasoner",
+            lambda: client.post(
+                self.url,
+                headers=self.headers,
+                json=body,
+                timeout=provider_timeout("deepseek_reasoner"),
+            ),
+        )
 
         if response.status_code != 200:
             return f"[ERRO DeepSeek-Reasoner] {response.status_code}: {response.text[:200]}"
@@ -89,3 +103,19 @@ RESPOSTA FINAL DO ASSISTENTE:
             return data["choices"][0]["message"]["content"]
         except Exception:
             return str(data)
+
+    async def stream_synthesis(self, question: str, *answers: str) -> AsyncIterator[str]:
+        prompt = self._build_synthesis_prompt(question, *answers)
+        async for chunk in stream_chat_completion(
+            self.url,
+            self.headers,
+            self._build_body(prompt),
+            provider_timeout("deepseek_reasoner"),
+            "ERRO DeepSeek-Reasoner",
+        ):
+            yield chunk
+
+    async def ask(self, prompt: str) -> str:
+        raise NotImplementedError(
+            "Use synthesize() para esta classe."
+        )
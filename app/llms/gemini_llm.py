@@ -1,14 +1,25 @@
 # app/llms/gemini_llm.py
 
 import os
-from typing import Optional
-
-import anyio
-import google.generativeai as genai
+from typing import AsyncIterator, Optional
 
+from app.conversation import gemini_history
 from app.llm_base import LLMClient
+from app.executors import get_executor
+from app.llms import gemini_rest
+from app.retry import with_retries
 
 class GeminiLLM(LLMClient):
+    """
+    Backends (GEMINI_BACKEND):
+      - "rest" (padrão): chamada assíncrona à API REST pelo pool HTTP compartilhado.
+      - "sdk": google.generativeai bloqueante, rodando no thread pool dedicado
+        do provider (GEMINI_THREAD_POOL_SIZE).
+    """
+
+    # Variáveis lidas no construtor (usadas pelo registry para hot reload)
+    ENV_VARS = ("GEMINI_API_KEY", "GEMINI_MODEL", "GEMINI_BACKEND")
+
     def __init__(
         self,
         model_name: Optional[str] = None,
@@ -21,13 +32,20 @@ class GeminiLLM(LLMClient):
                 "GEMINI_API_KEY não encontrada nas variáveis de ambiente. "
                 "Defina essa variável no ECS Task Definition ou no ambiente local."
             )
-        
-        genai.configure(api_key=api_key)
 
+        self._api_key = api_key
         self.model_name = model_name or os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
         self.temperature = temperature
+        self.backend = os.getenv("GEMINI_BACKEND", "rest").lower()
 
-        self._model = genai.GenerativeModel(self.model_name)
+        # Só o backend "sdk" precisa do GenerativeModel — e do SDK, que é
+        # pesado de importar (gRPC/protobuf), então o import fica aqui
+        self._model = None
+        if self.backend == "sdk":
+            import google.generativeai as genai
+
+            genai.configure(api_key=api_key)
+            self._model = genai.GenerativeModel(self.model_name)
 
         self.name = name or f"gemini-{self.model_name}"
     
@@ -65,10 +83,22 @@ Regras de resposta:
     async def ask(self, prompt: str) -> str:
 
         final_prompt = self._build_prompt(prompt)
+        history = gemini_history()
+
+        if self._model is None:
+            data = await gemini_rest.generate_content(
+                self._api_key,
+                self.model_name,
+                gemini_rest.build_body(final_prompt, self.temperature, history=history),
+            )
+            return (
+                gemini_rest.extract_text(data)
+                or "Não foi possível extair o texto da resposta do Gemini"
+            )
 
         def _call_gemini() -> str:
             response = self._model.generate_content(
-                final_prompt,
+                history + [{"role": "user", "parts": [{"text": final_prompt}]}] if history else final_prompt,
                 generation_config={"temperature": self.temperature},
             )
 
@@ -87,5 +117,23 @@ Regras de resposta:
 
             return "Não foi possível extair o texto da resposta do Gemini"
         
-        answer = await anyio.to_thread.run_sync(_call_gemini)
-        return answer
\ No newline at end of file
+        # Exceções do SDK com status repetível (429/503...) passam pelo retry
+        answer = await with_retries(
+            "gemini", lambda: get_executor("gemini").run(_call_gemini)
+        )
+        return answer
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        if self._model is not None:
+            # Backend "sdk": sem streaming, devolve a resposta inteira
+            yield await self.ask(prompt)
+            return
+
+        async for chunk in gemini_rest.stream_generate_content(
+            self._api_key,
+            self.model_name,
+            gemini_rest.build_body(
+                self._build_prompt(prompt), self.temperature, history=gemini_history()
+            ),
+        ):
+            yield chunk
@@ -1,14 +1,15 @@
 # app/llms/gemini_reasoner_llm.py
 
 import os
-from typing import Optional
+from typing import AsyncIterator, Optional
 import logging
 
-import anyio
-import google.generativeai as genai
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
-
 from app.llm_base import LLMClient
+from app.conversation import conversation_block
+from app.executors import get_executor
+from app.fusion import synthesis_prompt
+from app.llms import gemini_rest
+from app.retry import with_retries
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +18,21 @@ class GeminiReasonerLLM(LLMClient):
     """
     Modelo Gemini usado como "funil" (reasoner) para sintetizar
     as respostas.
+
+    Mesmos backends do GeminiLLM (GEMINI_BACKEND=rest|sdk); no modo "sdk"
+    usa o pool GEMINI_REASONER_THREAD_POOL_SIZE.
     """
 
+    ENV_VARS = ("GEMINI_API_KEY", "GEMINI_REASONER_MODEL", "GEMINI_BACKEND")
+
+    # Mesmos filtros do SDK, no formato da API REST
+    REST_SAFETY_SETTINGS = [
+        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+    ]
+
     def __init__(
         self,
         model_name: Optional[str] = None,
@@ -31,41 +45,54 @@ class GeminiReasonerLLM(LLMClient):
                 "GEMINI_API_KEY não encontrada nas variáveis de ambiente."
             )
 
-        genai.configure(api_key=api_key)
+        self._api_key = api_key
 
         # Usa o mesmo modelo que está OK no GeminiLLM
-        self.model_name = model_name or "gemini-2.5-flash"
+        # (pode sobrescrever via GEMINI_REASONER_MODEL)
+        self.model_name = model_name or os.getenv(
+            "GEMINI_REASONER_MODEL", "gemini-2.5-flash"
+        )
         self.temperature = temperature
         self.name = name or f"gemini-reasoner-{self.model_name}"
 
-        # Desliga filtros de segurança (conteúdo vem de outros LLMs)
-        self.safety_settings = {
-            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-        }
-
-        self._model = genai.GenerativeModel(
-            model_name=self.model_name,
-            safety_settings=self.safety_settings,
-        )
+        self.backend = os.getenv("GEMINI_BACKEND", "rest").lower()
+
+        # Só o backend "sdk" precisa do GenerativeModel — e do SDK, que é
+        # pesado de importar (gRPC/protobuf), então o import fica aqui
+        self._model = None
+        self.safety_settings = None
+        if self.backend == "sdk":
+            import google.generativeai as genai
+            from google.generativeai.types import HarmBlockThreshold, HarmCategory
+
+            # Desliga filtros de segurança (conteúdo vem de outros LLMs)
+            self.safety_settings = {
+                HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+                HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+            }
+
+            genai.configure(api_key=api_key)
+            self._model = genai.GenerativeModel(
+                model_name=self.model_name,
+                safety_settings=self.safety_settings,
+            )
 
     # ----------------------------------------------------------------------
     # Prompt de síntese mais robusto (sem ficar neurótico com tamanho)
     # ----------------------------------------------------------------------
-    def _build_synthesis_prompt(self, question: str, gemini: str, hf: str) -> str:
-        return f"""
-Você é o IsCoolGPT, um assistente especializado em Cloud Computing (AWS, GCP e Azure),
+    def _build_synthesis_prompt(self, question: str, *answers: str) -> str:
+        head = f"""Você é o IsCoolGPT, um assistente especializado em Cloud Computing (AWS, GCP e Azure),
 agindo agora como um sintetizador de respostas.
 
 Você receberá:
 - uma pergunta de um aluno;
-- duas respostas geradas por outros assistentes.
+- {len(answers)} respostas geradas por outros assistentes.
 
 Sua tarefa é:
 1. Ler com atenção a pergunta do aluno.
-2. Ler as duas respostas.
+2. Ler todas as respostas.
 3. Identificar o que está correto e útil em cada resposta.
 4. Corrigir eventuais erros ou pontos confusos.
 5. Organizar as informações em uma única resposta final, clara e didática.
@@ -79,23 +106,22 @@ Regras importantes:
 - NÃO fale em "Resposta 1", "Resposta 2" ou "outros assistentes".
 - Entregue apenas a resposta final, como se fosse você mesmo respondendo ao aluno.
 
-Pergunta do aluno:
+{conversation_block()}Pergunta do aluno:
 {question}
 
-Resposta A:
-{gemini}
-
-Resposta B:
-{hf}
-
-Agora produza apenas a RESPOSTA FINAL para o aluno:
-""".strip()
+"""
+        return synthesis_prompt(
+            head, answers, "Resposta", "\n\nAgora produza apenas a RESPOSTA FINAL para o aluno:"
+        )
 
     # ----------------------------------------------------------------------
     # Síntese final
     # ----------------------------------------------------------------------
-    async def synthesize(self, question: str, gemini: str, hf: str) -> str:
-        prompt = self._build_synthesis_prompt(question, gemini, hf)
+    async def synthesize(self, question: str, *answers: str) -> str:
+        prompt = self._build_synthesis_prompt(question, *answers)
+
+        if self._model is None:
+            return await self._synthesize_rest(prompt)
 
         def _call_gemini() -> str:
             try:
@@ -119,12 +145,61 @@ Agora produza apenas a RESPOSTA FINAL para o aluno:
                     )
                 return msg
 
-            except Exception as e:
-                logger.exception(f"[GeminiReasoner] Erro inesperado: {e}")
-                return f"Erro inesperado no Gemini Reasoner: {str(e)}"
-
-        answer = await anyio.to_thread.run_sync(_call_gemini)
-        return answer
+        # Exceções do SDK com status repetível (429/503...) passam pelo retry,
+        # como no GeminiLLM; as que sobrarem viram a mensagem de erro
+        try:
+            return await with_retries(
+                "gemini_reasoner", lambda: get_executor("gemini_reasoner").run(_call_gemini)
+            )
+        except Exception as e:
+            logger.exception(f"[GeminiReasoner] Erro inesperado: {e}")
+            return f"Erro inesperado no Gemini Reasoner: {str(e)}"
+
+    async def _synthesize_rest(self, prompt: str) -> str:
+        try:
+            data = await gemini_rest.generate_content(
+                self._api_key,
+                self.model_name,
+                gemini_rest.build_body(
+                    prompt, self.temperature, self.REST_SAFETY_SETTINGS
+                ),
+                provider="gemini_reasoner",
+            )
+        except Exception as e:
+            logger.exception(f"[GeminiReasoner] Erro inesperado: {e}")
+            return f"Erro inesperado no Gemini Reasoner: {str(e)}"
+
+        text = gemini_rest.extract_text(data)
+        if text is None:
+            # Ex.: finish_reason de safety ou nenhuma parte gerada
+            if data.get("promptFeedback"):
+                logger.warning(
+                    f"[GeminiReasoner] Feedback de segurança: {data['promptFeedback']}"
+                )
+            return "Erro: o Gemini bloqueou a resposta do reasoner (Safety Filter ou saída vazia)."
+
+        return text
+
+    async def stream_synthesis(self, question: str, *answers: str) -> AsyncIterator[str]:
+        """
+        Versão em streaming do synthesize(). No backend "sdk" devolve a
+        síntese inteira; erros viram uma mensagem, como no synthesize().
+        """
+        if self._model is not None:
+            yield await self.synthesize(question, *answers)
+            return
+
+        prompt = self._build_synthesis_prompt(question, *answers)
+        body = gemini_rest.build_body(prompt, self.temperature, self.REST_SAFETY_SETTINGS)
+
+        try:
+            async for chunk in gemini_rest.stream_generate_content(
+                self._api_key, self.model_name, body, provider="gemini_reasoner"
+            ):
+                yield chunk
+        except Exception as e:
+            logger.exception(f"[GeminiReasoner] Erro inesperado: {e}")
+            yield f"Erro inesperado no Gemini Reasoner: {str(e)}"
 
     async def ask(self, prompt: str) -> str:
         raise NotImplementedError(
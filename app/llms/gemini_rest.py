@@ -0,0 +1,125 @@
+# app/llms/gemini_rest.py
+
+"""
+Cliente assíncrono para a API REST do Gemini (generateContent e
+streamGenerateContent).
+
+Usa o pool HTTP compartilhado (app/http_client.py), então não ocupa threads
+e pode ser cancelado normalmente — ao contrário do SDK google.generativeai,
+cujo generate_content é bloqueante.
+"""
+
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.config import env_str
+from app.http_client import get_http_client, provider_timeout
+from app.llms.openai_compat import iter_sse_data
+from app.retry import with_retries
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+
+class GeminiAPIError(RuntimeError):
+    def __init__(self, status_code: int, message: str) -> None:
+        super().__init__(f"Gemini HTTP {status_code}: {message}")
+        self.status_code = status_code
+
+
+def build_body(
+    prompt: str,
+    temperature: float,
+    safety_settings: Optional[List[Dict[str, str]]] = None,
+    history: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """history: turnos anteriores da sessão (app/conversation.gemini_history)."""
+    body: Dict[str, Any] = {
+        "contents": [*(history or []), {"role": "user", "parts": [{"text": prompt}]}],
+        "generationConfig": {"temperature": temperature},
+    }
+    if safety_settings:
+        body["safetySettings"] = safety_settings
+    return body
+
+
+def extract_text(data: Dict[str, Any]) -> Optional[str]:
+    """
+    Junta as partes de texto do primeiro candidato.
+    Retorna None se não houver texto (safety filter ou saída vazia).
+    """
+    candidates = data.get("candidates") or []
+    if not candidates:
+        return None
+
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    text = "".join(part.get("text", "") for part in parts)
+    return text or None
+
+
+def _model_url(model_name: str, method: str) -> str:
+    base_url = env_str("GEMINI_API_BASE", DEFAULT_BASE_URL).rstrip("/")
+    return f"{base_url}/models/{model_name}:{method}"
+
+
+def _headers(api_key: str) -> Dict[str, str]:
+    return {"x-goog-api-key": api_key, "Content-Type": "application/json"}
+
+
+async def generate_content(
+    api_key: str,
+    model_name: str,
+    body: Dict[str, Any],
+    provider: str = "gemini",
+) -> Dict[str, Any]:
+    """
+    POST {base}/models/{model}:generateContent e retorna o JSON da resposta.
+    Lança GeminiAPIError se o status não for 200.
+    """
+    client = get_http_client()
+    response = await with_retries(
+        provider,
+        lambda: client.post(
+            _model_url(model_name, "generateContent"),
+            headers=_headers(api_key),
+            json=body,
+            timeout=provider_timeout(provider),
+        ),
+    )
+
+    if response.status_code != 200:
+        raise GeminiAPIError(response.status_code, response.text[:200])
+
+    return response.json()
+
+
+async def stream_generate_content(
+    api_key: str,
+    model_name: str,
+    body: Dict[str, Any],
+    provider: str = "gemini",
+) -> AsyncIterator[str]:
+    """
+    POST {base}/models/{model}:streamGenerateContent?alt=sse e gera os
+    pedaços de texto conforme chegam.
+    Lança GeminiAPIError se o status não for 200.
+    """
+    client = get_http_client()
+    async with client.stream(
+        "POST",
+        _model_url(model_name, "streamGenerateContent"),
+        params={"alt": "sse"},
+        headers=_headers(api_key),
+        json=body,
+        timeout=provider_timeout(provider),
+    ) as response:
+        if response.status_code != 200:
+            error_body = (await response.aread()).decode("utf-8", "replace")
+            raise GeminiAPIError(response.status_code, error_body[:200])
+
+        async for data in iter_sse_data(response):
+            try:
+                text = extract_text(json.loads(data))
+            except ValueError:
+                continue
+            if text:
+                yield text
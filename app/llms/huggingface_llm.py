@@ -1,8 +1,13 @@
 # app/llms/huggingface_llm.py
 
 import os
-import httpx
+from typing import AsyncIterator
+
+from app.conversation import openai_history
 from app.llm_base import LLMClient
+from app.http_client import get_http_client, provider_timeout
+from app.retry import with_retries
+from app.llms.openai_compat import stream_chat_completion
 
 
 class HuggingFaceLLM(LLMClient):
@@ -16,6 +21,8 @@ class HuggingFaceLLM(LLMClient):
     Você ainda pode sobrescrever via HUGGINGFACE_MODEL se quiser.
     """
 
+    ENV_VARS = ("HUGGINGFACE_API_KEY", "HUGGINGFACE_MODEL", "HUGGINGFACE_API_BASE")
+
     def __init__(self, model_name: str = None):
         self.api_key = os.getenv("HUGGINGFACE_API_KEY")
         if not self.api_key:
@@ -29,8 +36,10 @@ class HuggingFaceLLM(LLMClient):
             "meta-llama/Llama-3.1-8B-Instruct:cerebras",
         )
 
-        # Endpoint do router para chat completions
-        self.url = "https://router.huggingface.co/v1/chat/completions"
+        # Endpoint do router para chat completions (HUGGINGFACE_API_BASE
+        # aponta para outro servidor compatível, ex.: os stubs do load test)
+        base_url = os.getenv("HUGGINGFACE_API_BASE", "https://router.huggingface.co/v1")
+        self.url = f"{base_url.rstrip('/')}/chat/completions"
 
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
@@ -40,7 +49,8 @@ class HuggingFaceLLM(LLMClient):
     def _build_messages(self, user_prompt: str):
         """
         Constrói a lista de mensagens no formato de chat (OpenAI-like).
-        Prompt enxuto e focado em respostas curtas.
+        Prompt enxuto e focado em respostas curtas. Numa sessão, o histórico
+        compactado vai entre o system e a pergunta.
         """
         system_instructions = """
 Você é o IsCoolGPT, um assistente especializado em Cloud Computing (AWS, GCP, Azure).
@@ -61,28 +71,34 @@ Regras de resposta:
 
         return [
             {"role": "system", "content": system_instructions},
+            *openai_history(),
             {"role": "user", "content": user_prompt},
         ]
 
-    async def ask(self, prompt: str) -> str:
-        """
-        Envia uma requisição de chat completion para o Hugging Face Router.
-        """
-        messages = self._build_messages(prompt)
-
-        body = {
+    def _build_body(self, user_prompt: str) -> dict:
+        return {
             "model": self.model_name,
-            "messages": messages,
+            "messages": self._build_messages(user_prompt),
             "max_tokens": 256,   # << respostas mais curtas
             "temperature": 0.6,
         }
 
-        async with httpx.AsyncClient(timeout=40) as client:
-            response = await client.post(
+    async def ask(self, prompt: str) -> str:
+        """
+        Envia uma requisição de chat completion para o Hugging Face Router.
+        """
+        body = self._build_body(prompt)
+
+        client = get_http_client()
+        response = await with_retries(
+            "huggingface",
+            lambda: client.post(
                 self.url,
                 headers=self.headers,
                 json=body,
-            )
+                timeout=provider_timeout("huggingface"),
+            ),
+        )
 
         if response.status_code != 200:
             return (
@@ -98,3 +114,16 @@ Regras de resposta:
         except Exception:
             # fallback útil pra debug se o formato mudar
             return str(data)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Mesma requisição do ask(), com "stream": true.
+        """
+        async for chunk in stream_chat_completion(
+            self.url,
+            self.headers,
+            self._build_body(prompt),
+            provider_timeout("huggingface"),
+            "ERRO HuggingFace",
+        ):
+            yield chunk
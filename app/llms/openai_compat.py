@@ -0,0 +1,58 @@
+# app/llms/openai_compat.py
+
+"""
+Streaming para APIs de chat completions no formato OpenAI
+(HuggingFace Router e DeepSeek), usando o pool HTTP compartilhado.
+"""
+
+import json
+from typing import Any, AsyncIterator, Dict
+
+import httpx
+
+from app.http_client import get_http_client
+
+
+async def iter_sse_data(response: httpx.Response) -> AsyncIterator[str]:
+    """Itera o campo `data:` de cada evento Server-Sent Events da resposta."""
+    async for line in response.aiter_lines():
+        if line.startswith("data:"):
+            yield line[len("data:"):].strip()
+
+
+async def stream_chat_completion(
+    url: str,
+    headers: Dict[str, str],
+    body: Dict[str, Any],
+    timeout: httpx.Timeout,
+    error_label: str,
+) -> AsyncIterator[str]:
+    """
+    Envia o body com "stream": true e gera os pedaços de texto (delta.content)
+    conforme chegam. Em caso de HTTP != 200 gera uma única mensagem de erro,
+    no mesmo formato que o ask() dos clientes retorna.
+    """
+    client = get_http_client()
+    payload = {**body, "stream": True}
+
+    async with client.stream(
+        "POST", url, headers=headers, json=payload, timeout=timeout
+    ) as response:
+        if response.status_code != 200:
+            error_body = (await response.aread()).decode("utf-8", "replace")
+            yield f"[{error_label}] HTTP {response.status_code}: {error_body[:200]}"
+            return
+
+        async for data in iter_sse_data(response):
+            if data == "[DONE]":
+                break
+
+            try:
+                chunk = json.loads(data)
+                delta = chunk["choices"][0].get("delta") or {}
+            except (ValueError, KeyError, IndexError):
+                continue
+
+            content = delta.get("content")
+            if content:
+                yield content
@@ -1,15 +1,75 @@
 # app/main.py
 
-from fastapi import FastAPI
+import time
+
+_import_started = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List
+
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from app.schemas import BatchRequest, JobStatus, QuestionRequest, AggregatedResponse
+from app.admission import Overloaded, admission
+from app.aggregator import fusion_stats, provider_flight, registry, stream_answers
+from app.batch import NDJSON_MEDIA_TYPE, encode_ndjson, run_batch
+from app.breaker import breaker_stats
+from app.cache import wants_bypass
+from app.config import env_float, env_int
+from app.conversation import conversation_scope
+from app.deadline import Deadline, deadline_scope, request_deadline
+from app.jobs import FINISHED, JobQueueFull, job_manager
+from app.llm_base import is_error_answer
+from app.metrics import CONTENT_TYPE, MetricsMiddleware, metrics_enabled, mode_label, render_metrics
+from app.pipeline import answer_cache, answer_question, request_flight, semantic_index
+from app.rate_limit import limiter_stats
+from app.responses import CompressionMiddleware, FastJSONResponse, compression_enabled, model_json, model_response
+from app.readiness import is_ready, readiness_report, record_app_import, run_warm_up
+from app.retry import retry_stats
+from app.router import AUTO, record_llm_calls, resolve_providers, router_stats
+from app.semantic_cache import save_semantic_index
+from app.sessions import Session, session_store
+from app.shared_state import flush_shared_state, shared_state_stats
+from app.streaming import SSE_HEADERS, ReleasingStreamingResponse, encode_sse
+from app.tracing import span, start_trace, wants_timings
+from app.http_client import open_http_client, close_http_client
+from app.executors import shutdown_executors
+
+record_app_import(time.perf_counter() - _import_started)
+
+
+# ---------------------------------------------------------
+# Ciclo de vida: pool HTTP compartilhado, warm-up dos providers
+# (em segundo plano; o GET /ready avisa quando terminou) e workers dos jobs
+# ---------------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await open_http_client()
+    warm_up = asyncio.create_task(run_warm_up(registry))
+    await job_manager.start()
+    try:
+        yield
+    finally:
+        warm_up.cancel()
+        await job_manager.stop()
+        # Resumos de sessão em andamento (eles chamam o provider pelo pool HTTP)
+        await session_store.drain()
+        await flush_shared_state()
+        await close_http_client()
+        shutdown_executors()
+        save_semantic_index(semantic_index)
 
-from app.schemas import QuestionRequest, AggregatedResponse
-from app.aggregator import aggregate_answers
 
 app = FastAPI(
     title="IsCoolGPT - Multi LLM API",
     version="1.0.0",
     description="API que consulta múltiplas LLMs e gera uma resposta final agregada",
+    lifespan=lifespan,
+    # orjson com FAST_JSON=true; sem ele, o mesmo JSON do JSONResponse
+    default_response_class=FastJSONResponse,
 )
 
 # ---------------------------------------------------------
@@ -30,19 +90,272 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cache", "Server-Timing"],
 )
 
+# gzip/brotli para respostas grandes (RESPONSE_COMPRESSION=true)
+if compression_enabled():
+    app.add_middleware(CompressionMiddleware)
+
+# Contagem e latência por rota/modo (GET /metrics)
+if metrics_enabled():
+    app.add_middleware(MetricsMiddleware)
+
 # ---------------------------------------------------------
 # Rotas
 # ---------------------------------------------------------
 
 @app.get("/health")
-async def health():
-    return {"status": "ok"}
+async def health(details: bool = False):
+    if not details:
+        return {"status": "ok"}
+
+    # Com ?details=true: estado do circuit breaker e nota de saúde de cada
+    # provider já chamado desde o início do processo, fila/espera dos
+    # limitadores de uso, tentativas/retries, quantas vezes o fusion
+    # dispensou o reasoner, as rotas escolhidas no modo auto, a fila de jobs,
+    # as sessões de conversa e a admissão (vagas, fila e latência estimada).
+    return {
+        "status": "ok",
+        "providers": breaker_stats(),
+        "rate_limits": limiter_stats(),
+        "retries": retry_stats(),
+        "fusion": fusion_stats,
+        "router": router_stats(),
+        "jobs": job_manager.stats(),
+        "sessions": session_store.stats(),
+        "shared_state": shared_state_stats(),
+        "admission": admission.stats(),
+    }
+
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness para o load balancer: 503 até o warm-up terminar (providers
+    construídos e, se configurado, probes feitos), 200 depois. O corpo traz
+    o relatório do warm-up e o tempo de import do app e de cada provider.
+    """
+    report = readiness_report(registry)
+    return FastJSONResponse(report, status_code=200 if is_ready() else 503)
 
 
 @app.post("/ask", response_model=AggregatedResponse)
-async def ask(payload: QuestionRequest):
-    # processa tudo normalmente
-    result = await aggregate_answers(payload.question, payload.providers)
-    return result
+async def ask(payload: QuestionRequest, request: Request):
+    request.state.mode = mode_label(payload.providers)
+    debug = wants_timings(request.headers)
+
+    session = await session_store.get_or_create(payload.session_id) if payload.session_id else None
+
+    with start_trace("POST /ask") as trace:
+        # processa tudo normalmente (passando pelo cache de respostas);
+        # numa sessão, o histórico compactado vai junto para os providers
+        with conversation_scope(session_store.context(session) if session else None):
+            try:
+                result, cache_status = await answer_question(
+                    payload.question,
+                    payload.providers,
+                    bypass_cache=wants_bypass(request.headers),
+                    deadline=request_deadline(request.headers),
+                )
+            except Overloaded as e:
+                raise HTTPException(
+                    status_code=503, detail=str(e), headers={"Retry-After": e.retry_after_header}
+                )
+        if session is not None and not is_error_answer(result.final_answer):
+            session_store.record_turn(session, payload.question, result.final_answer)
+        with span("serialize"):
+            if debug:
+                result = result.model_copy(update={"timings": trace.timings()})
+                content = model_json(result)
+            else:
+                content = model_json(result, exclude={"timings"})
+
+        headers = {"X-Cache": cache_status, "Server-Timing": trace.server_timing()}
+    return Response(content, media_type="application/json", headers=headers)
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    stats = answer_cache.stats()
+    stats["semantic"] = semantic_index.stats() if semantic_index is not None else None
+    stats["coalescing"] = {
+        "requests": request_flight.stats(),
+        "providers": provider_flight.stats(),
+    }
+    return stats
+
+
+@app.post("/ask/stream")
+async def ask_stream(payload: QuestionRequest, request: Request):
+    """
+    Mesmo contrato do /ask, mas responde com Server-Sent Events:
+    tokens de cada provider conforme chegam e, no modo fusion,
+    a síntese do reasoner como último canal.
+    """
+    request.state.mode = mode_label(payload.providers)
+    session = await session_store.get_or_create(payload.session_id) if payload.session_id else None
+
+    # Recusa (503), degrada ou espera a vaga antes de abrir o stream (a
+    # espera na fila vai até o deadline da requisição); a vaga é liberada
+    # quando a resposta termina
+    deadline = request_deadline(request.headers)
+    requested = resolve_providers(payload.question, payload.providers)
+    try:
+        with deadline_scope(deadline):
+            providers = admission.plan(requested)
+            admitted = await admission.admit_stream(mode_label(providers))
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": e.retry_after_header})
+    headers = dict(SSE_HEADERS)
+    if providers != requested:
+        headers["X-Degraded-From"] = mode_label(requested)
+    if AUTO in payload.providers:
+        # O stream não passa pelo cache: sempre vai aos providers
+        record_llm_calls(providers)
+
+    if session is not None:
+        events = _session_stream(session, payload.question, providers)
+    else:
+        events = stream_answers(payload.question, providers)
+    return ReleasingStreamingResponse(
+        encode_sse(admitted.events(_within_deadline(deadline, events))),
+        on_close=admitted.release,
+        media_type="text/event-stream",
+        headers=headers,
+    )
+
+
+async def _within_deadline(deadline: Deadline, events: AsyncIterator[Dict[str, Any]]):
+    """O stream roda depois que o endpoint retorna: o deadline vai junto com ele."""
+    with deadline_scope(deadline):
+        async for event in events:
+            yield event
+
+
+async def _session_stream(session: Session, question: str, providers: List[str]):
+    """stream_answers com o histórico da sessão; o turno é gravado no evento final."""
+    with conversation_scope(session_store.context(session)):
+        async for event in stream_answers(question, providers):
+            if event.get("event") == "final":
+                final_answer = event["data"]["final_answer"]
+                if not is_error_answer(final_answer):
+                    session_store.record_turn(session, question, final_answer)
+            yield event
+
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    """Histórico compactado da sessão: resumo, turnos guardados e tokens de contexto."""
+    session = await session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Sessão não encontrada (ou já expirou).")
+    return session.to_dict()
+
+
+@app.delete("/sessions/{session_id}", status_code=204)
+async def delete_session(session_id: str):
+    if not await session_store.delete(session_id):
+        raise HTTPException(status_code=404, detail="Sessão não encontrada (ou já expirou).")
+    return Response(status_code=204)
+
+
+def _reject_session(endpoint: str) -> None:
+    # Melhor recusar do que responder sem o histórico que o cliente espera
+    raise HTTPException(
+        status_code=422,
+        detail=f"session_id não é suportado em {endpoint}; use /ask ou /ask/stream para conversas.",
+    )
+
+
+@app.post("/ask/batch")
+async def ask_batch(payload: BatchRequest, request: Request):
+    """
+    Várias perguntas de uma vez (ex.: um simulado de certificação inteiro).
+    Responde em NDJSON: uma linha por pergunta, na ordem em que ficam
+    prontas, com `id`/`index` para casar com a entrada.
+    """
+    request.state.mode = "batch"
+    limit = env_int("BATCH_MAX_QUESTIONS", 500)
+    if len(payload.questions) > limit:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote muito grande: máximo de {limit} perguntas por requisição.",
+        )
+    if payload.session_id or any(item.session_id for item in payload.questions):
+        _reject_session("/ask/batch")
+
+    results = run_batch(payload.questions, payload.providers)
+    return StreamingResponse(encode_ndjson(results), media_type=NDJSON_MEDIA_TYPE)
+
+
+@app.post("/ask/jobs", response_model=JobStatus, status_code=202)
+async def create_job(payload: QuestionRequest, request: Request):
+    """
+    Enfileira a pergunta e responde na hora com o id do job. O resultado
+    sai em GET /ask/jobs/{id} ou pelo WebSocket /ask/jobs/{id}/ws.
+    """
+    request.state.mode = mode_label(payload.providers)
+    if payload.session_id:
+        _reject_session("/ask/jobs")
+    try:
+        job = await job_manager.submit(payload.question, payload.providers)
+    except JobQueueFull as e:
+        retry_after = env_int("JOBS_RETRY_AFTER_SECONDS", 5)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(retry_after)})
+
+    return model_response(job, status_code=202, headers={"Location": f"/ask/jobs/{job.id}"})
+
+
+@app.get("/ask/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado (ou já expirou).")
+    return model_response(job)
+
+
+@app.websocket("/ask/jobs/{job_id}/ws")
+async def job_updates(websocket: WebSocket, job_id: str):
+    """Envia o estado do job agora e a cada mudança; fecha quando ele termina."""
+    await websocket.accept()
+    job = await job_manager.get(job_id)
+    if job is None:
+        await websocket.send_json({"detail": "Job não encontrado (ou já expirou)."})
+        await websocket.close(code=4404)
+        return
+
+    if not job_manager.is_local(job_id):
+        # Job de outro worker: acompanha pelo estado compartilhado
+        try:
+            await websocket.send_text(job.model_dump_json())
+            while job.status not in FINISHED:
+                await asyncio.sleep(env_float("JOBS_SHARED_POLL_SECONDS", 0.5))
+                latest = await job_manager.get_shared(job_id)
+                if latest is None:
+                    break
+                if latest.status != job.status:
+                    await websocket.send_text(latest.model_dump_json())
+                job = latest
+            await websocket.close()
+        except WebSocketDisconnect:
+            pass
+        return
+
+    updates = job_manager.subscribe(job_id)
+    try:
+        await websocket.send_text(job.model_dump_json())
+        while job.status not in FINISHED:
+            job = await updates.get()
+            await websocket.send_text(job.model_dump_json())
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        job_manager.unsubscribe(job_id, updates)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Métricas no formato de texto do Prometheus."""
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
@@ -0,0 +1,408 @@
+# app/metrics.py
+
+"""
+Métricas no formato de texto do Prometheus, expostas em GET /metrics.
+
+Implementação própria e mínima (contadores, gauges e histogramas com
+labels), sem dependência extra: registrar um valor é uma busca em dict e,
+no histograma, uma busca binária nos buckets — barato o bastante para ficar
+sempre ligado. Estatísticas que já existem em outros módulos (cache,
+single-flight, thread pools, breakers, limitadores) não são duplicadas:
+são lidas só no momento do scrape, por collect_runtime_stats().
+"""
+
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from starlette.routing import Match
+
+from app.config import env_bool
+
+# Latências de LLM vão de dezenas de ms (cache) a dezenas de segundos
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+Family = Tuple[str, str, str, List[Sample]]  # (nome, tipo, help, amostras)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels.items())
+    return "{" + inner + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: esperados labels {self.labelnames}")
+            child = self._new_child()
+            self._children[values] = child
+        return child
+
+    def _new_child(self) -> object:
+        raise NotImplementedError
+
+    def _label_dict(self, values: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+    def collect(self) -> Family:
+        raise NotImplementedError
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def collect(self) -> Family:
+        samples = [
+            (f"{self.name}_total", self._label_dict(values), child.value)
+            for values, child in self._children.items()
+        ]
+        return self.name, self.kind, self.documentation, samples
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def collect(self) -> Family:
+        samples = [
+            (self.name, self._label_dict(values), child.value)
+            for values, child in self._children.items()
+        ]
+        return self.name, self.kind, self.documentation, samples
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # último = +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def collect(self) -> Family:
+        samples: List[Sample] = []
+        for values, child in self._children.items():
+            labels = self._label_dict(values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                samples.append(
+                    (f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative)
+                )
+            samples.append((f"{self.name}_sum", labels, child.sum))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return self.name, self.kind, self.documentation, samples
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        self._collectors.append(collector)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        families: List[Family] = [metric.collect() for metric in self._metrics]
+        for collector in self._collectors:
+            families.extend(collector())
+
+        lines: List[str] = []
+        for name, kind, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ------------------------------------------------------
+# Métricas do caminho quente
+# ------------------------------------------------------
+HTTP_REQUESTS = registry.counter(
+    "iscoolgpt_http_requests", "Requisições HTTP por rota, modo e status.",
+    ("route", "method", "mode", "status"),
+)
+HTTP_LATENCY = registry.histogram(
+    "iscoolgpt_http_request_duration_seconds",
+    "Duração das requisições HTTP (até o último byte) por rota e modo.",
+    ("route", "mode"),
+)
+HTTP_IN_FLIGHT = registry.gauge(
+    "iscoolgpt_http_requests_in_flight", "Requisições HTTP em andamento por rota.", ("route",)
+)
+PROVIDER_CALLS = registry.counter(
+    "iscoolgpt_provider_calls",
+    "Chamadas aos providers por resultado (ok, error_answer ou classe da exceção).",
+    ("provider", "outcome"),
+)
+PROVIDER_LATENCY = registry.histogram(
+    "iscoolgpt_provider_call_duration_seconds",
+    "Latência das chamadas aos providers (inclui retries, exclui fila do limitador).",
+    ("provider",),
+)
+PROVIDER_ATTEMPTS = registry.counter(
+    "iscoolgpt_provider_attempts",
+    "Tentativas HTTP aos providers por status (ou classe da exceção de rede).",
+    ("provider", "status"),
+)
+SYNTHESIS_LATENCY = registry.histogram(
+    "iscoolgpt_fusion_synthesis_duration_seconds",
+    "Duração da síntese do reasoner no modo fusion.",
+    ("outcome",),
+)
+ASK_CACHE = registry.counter(
+    "iscoolgpt_ask_cache", "Respostas do /ask por status de cache (X-Cache).", ("status",)
+)
+ROUTER_DECISIONS = registry.counter(
+    "iscoolgpt_router_decisions", "Rota escolhida no modo auto.", ("route",)
+)
+ADMISSION_DECISIONS = registry.counter(
+    "iscoolgpt_admission_decisions",
+    "Perguntas admitidas, degradadas (fusion -> single) ou recusadas (503) pela admissão.",
+    ("decision",),
+)
+
+
+def metrics_enabled() -> bool:
+    return env_bool("METRICS_ENABLED", True)
+
+
+def mode_label(providers: Sequence[str]) -> str:
+    if "auto" in providers:
+        return "auto"
+    return "fusion" if "fusion" in providers else "single"
+
+
+# ------------------------------------------------------
+# Middleware ASGI (sem BaseHTTPMiddleware: não atrapalha o streaming)
+# ------------------------------------------------------
+class MetricsMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    def _route_label(self, scope) -> str:
+        # O label é o template da rota ("/ask/jobs/{job_id}"), o mesmo que o
+        # Starlette põe em scope["route"] — mas o gauge de em andamento precisa
+        # dele antes do roteamento, então a busca é feita aqui. Sem rota é
+        # "other", para não explodir a cardinalidade (scanners, 404...).
+        partial = None
+        for route in scope["app"].routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+            if match == Match.PARTIAL and partial is None:
+                partial = route.path  # caminho certo, método errado (405)
+        return partial or "other"
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        route = self._route_label(scope)
+
+        async def _send(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(route)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            in_flight.dec()
+            # O handler informa o modo (single/fusion/batch) em request.state
+            mode = (scope.get("state") or {}).get("mode", "-")
+            HTTP_REQUESTS.labels(route, scope["method"], mode, str(status)).inc()
+            HTTP_LATENCY.labels(route, mode).observe(time.perf_counter() - started)
+
+
+# ------------------------------------------------------
+# Estatísticas lidas no momento do scrape
+# ------------------------------------------------------
+def _family(name: str, kind: str, documentation: str, samples: List[Sample]) -> Family:
+    return name, kind, documentation, samples
+
+
+def collect_runtime_stats() -> List[Family]:
+    # Imports locais: estes módulos importam app.metrics
+    from app.aggregator import fusion_stats, provider_flight
+    from app.breaker import breaker_stats
+    from app.executors import executor_stats
+    from app.pipeline import answer_cache, request_flight, semantic_index
+    from app.rate_limit import limiter_stats
+
+    families: List[Family] = []
+
+    cache = answer_cache.stats()
+    families.append(_family(
+        "iscoolgpt_answer_cache_lookups", "counter", "Consultas ao cache exato do /ask.",
+        [
+            ("iscoolgpt_answer_cache_lookups_total", {"result": "hit"}, cache["hits"]),
+            ("iscoolgpt_answer_cache_lookups_total", {"result": "miss"}, cache["misses"]),
+            ("iscoolgpt_answer_cache_lookups_total", {"result": "bypass"}, cache["bypasses"]),
+        ],
+    ))
+    families.append(_family(
+        "iscoolgpt_answer_cache_hit_ratio", "gauge", "Taxa de acerto do cache exato.",
+        [("iscoolgpt_answer_cache_hit_ratio", {}, cache["hit_rate"])],
+    ))
+
+    if semantic_index is not None:
+        semantic = semantic_index.stats()
+        families.append(_family(
+            "iscoolgpt_semantic_cache_hit_ratio", "gauge", "Taxa de acerto do cache semântico.",
+            [("iscoolgpt_semantic_cache_hit_ratio", {}, semantic["hit_rate"])],
+        ))
+        families.append(_family(
+            "iscoolgpt_semantic_cache_entries", "gauge", "Entradas no índice semântico.",
+            [("iscoolgpt_semantic_cache_entries", {}, semantic["entries"])],
+        ))
+
+    coalescing: List[Sample] = []
+    for layer, flight in (("request", request_flight), ("provider", provider_flight)):
+        stats = flight.stats()
+        coalescing.append(("iscoolgpt_coalescing_calls_total", {"layer": layer, "role": "leader"}, stats["leaders"]))
+        coalescing.append(("iscoolgpt_coalescing_calls_total", {"layer": layer, "role": "coalesced"}, stats["coalesced"]))
+    families.append(_family(
+        "iscoolgpt_coalescing_calls", "counter",
+        "Chamadas single-flight: líderes (executaram) e coalescidas (aguardaram).", coalescing,
+    ))
+
+    pools = executor_stats()
+    for field, documentation in (
+        ("active", "Threads ocupadas no pool do provider."),
+        ("queued", "Tarefas aguardando thread no pool do provider."),
+        ("max_workers", "Tamanho do pool do provider."),
+    ):
+        families.append(_family(
+            f"iscoolgpt_executor_{field}", "gauge", documentation,
+            [(f"iscoolgpt_executor_{field}", {"pool": name}, stats[field]) for name, stats in pools.items()],
+        ))
+
+    breakers = breaker_stats()
+    states = {"closed": 0, "half_open": 1, "open": 2}
+    families.append(_family(
+        "iscoolgpt_breaker_state", "gauge", "Circuit breaker: 0 closed, 1 half_open, 2 open.",
+        [("iscoolgpt_breaker_state", {"provider": name}, states[stats["state"]]) for name, stats in breakers.items()],
+    ))
+    families.append(_family(
+        "iscoolgpt_provider_health_score", "gauge", "Nota de saúde do provider (0 a 1).",
+        [("iscoolgpt_provider_health_score", {"provider": name}, stats["health_score"]) for name, stats in breakers.items()],
+    ))
+
+    limiters = limiter_stats()
+    families.append(_family(
+        "iscoolgpt_rate_limit_queued", "gauge", "Chamadas aguardando no limitador de uso.",
+        [("iscoolgpt_rate_limit_queued", {"provider": name}, stats["queued"]) for name, stats in limiters.items()],
+    ))
+
+    families.append(_family(
+        "iscoolgpt_fusion_decisions", "counter", "Fusion: sínteses feitas e dispensadas.",
+        [("iscoolgpt_fusion_decisions_total", {"decision": name}, value) for name, value in fusion_stats.items()],
+    ))
+
+    return families
+
+
+registry.add_collector(collect_runtime_stats)
+
+
+def render_metrics() -> str:
+    return registry.render()
+
@@ -0,0 +1,174 @@
+# app/pipeline.py
+
+"""
+Caminho completo de uma pergunta do /ask: camadas que ficam na frente do
+aggregate_answers (cache exato, cache semântico e, num miss, a admissão de
+app/admission.py) sem que o aggregator precise saber delas.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from app.admission import admission
+from app.aggregator import aggregate_answers, describe_mode, describe_models
+from app.cache import build_answer_cache, cache_key, cache_namespace
+from app.conversation import conversation_key
+from app.deadline import Deadline, deadline_scope
+from app.llm_base import is_error_answer
+from app.metrics import ASK_CACHE, mode_label
+from app.router import AUTO, record_cache_hit, record_llm_calls, resolve_providers
+from app.schemas import AggregatedResponse
+from app.semantic_cache import build_semantic_index, embed, semantic_scope
+from app.singleflight import SingleFlight
+from app.tracing import span
+
+logger = logging.getLogger("iscoolgpt.pipeline")
+
+answer_cache = build_answer_cache()
+semantic_index = build_semantic_index() if answer_cache.enabled else None
+
+# /ask idênticos em andamento compartilham o mesmo aggregate_answers
+request_flight = SingleFlight("request")
+
+
+def is_cacheable(response: AggregatedResponse) -> bool:
+    """Respostas com erro ou parciais (deadline) não vão para o cache."""
+    if response.dropped_providers:
+        return False
+    if is_error_answer(response.final_answer):
+        return False
+    return not any(is_error_answer(answer.answer) for answer in response.answers)
+
+
+async def answer_question(
+    question: str,
+    providers: List[str],
+    bypass_cache: bool = False,
+    deadline: Optional[Deadline] = None,
+) -> Tuple[AggregatedResponse, str]:
+    """
+    Retorna a resposta e o status do cache: HIT, SEMANTIC (pergunta
+    parecida já respondida), MISS, COALESCED (aguardou uma pergunta idêntica
+    que já estava em andamento), BYPASS, DISABLED ou SESSION (pergunta com
+    histórico de sessão: a resposta depende dele e não passa pelo cache).
+
+    O deadline (se houver) vale para todas as chamadas aos providers.
+    providers=["auto"] é resolvido antes do cache (app/router.py).
+    """
+    routed = AUTO in providers
+    providers = resolve_providers(question, providers)
+    with deadline_scope(deadline):
+        result, cache_status = await _answer_question(question, providers, bypass_cache, routed)
+
+    ASK_CACHE.labels(cache_status).inc()
+    if cache_status in ("HIT", "SEMANTIC"):
+        record_cache_hit(question)
+    return result, cache_status
+
+
+async def _answer_question(
+    question: str, providers: List[str], bypass_cache: bool, routed: bool = False
+) -> Tuple[AggregatedResponse, str]:
+    mode, models = describe_mode(providers), describe_models(providers)
+    key = cache_key(question, mode, models)
+    # Negações fazem parte do namespace semântico (app/semantic_cache.py)
+    scope = semantic_scope(cache_namespace(mode, models), question)
+    vector: Optional[np.ndarray] = None
+    store: Optional[Callable[[AggregatedResponse], Awaitable[None]]] = None
+
+    context = conversation_key()
+    if context:
+        # "E quanto custa?" só faz sentido com o histórico da sessão
+        key, status = f"{key}:{context}", "SESSION"
+    elif not answer_cache.enabled:
+        status = "DISABLED"
+    else:
+        status = "BYPASS" if bypass_cache else None
+        if bypass_cache:
+            answer_cache.record_bypass()
+        else:
+            with span("cache"):
+                cached = await answer_cache.get_async(key)
+                if cached is not None:
+                    return AggregatedResponse.model_validate(cached), "HIT"
+
+                if semantic_index is not None:
+                    vector = embed(question)
+                    match = semantic_index.search(vector, scope)
+                    if match is not None:
+                        similar_key, score = match
+                        cached = await answer_cache.get_async(similar_key, count=False)
+                        if cached is not None:
+                            logger.info(f"[Pipeline] Cache semântico (similaridade={score:.2f})")
+                            return AggregatedResponse.model_validate(cached), "SEMANTIC"
+                        # A resposta já saiu do cache exato: a entrada não serve mais
+                        semantic_index.remove(scope, similar_key)
+
+        async def _store(result: AggregatedResponse) -> None:
+            if not is_cacheable(result):
+                logger.info("[Pipeline] Resposta com erro de provider; não será cacheada.")
+                return
+
+            await answer_cache.set_async(key, result.model_dump())
+            if semantic_index is not None:
+                semantic_index.add(
+                    vector if vector is not None else embed(question), scope, key
+                )
+
+        store = _store
+
+    # Vai precisar de LLM: passa pela admissão (quem só aguardaria uma
+    # execução idêntica já em andamento não ocupa vaga nova)
+    if not request_flight.running(key):
+        planned = admission.plan(providers)
+        if planned != providers:
+            # Degradado: o provider único tem cache e chave próprios
+            result, status = await _answer_question(question, planned, bypass_cache, routed)
+            return result.model_copy(update={"degraded_from": mode}), status
+
+    result, leader = await _aggregate_once(key, question, providers, store=store, routed=routed)
+
+    if status is not None:
+        return result, status
+    return result, "MISS" if leader else "COALESCED"
+
+
+async def _aggregate_once(
+    key: str,
+    question: str,
+    providers: List[str],
+    store: Optional[Callable[[AggregatedResponse], Awaitable[None]]],
+    routed: bool = False,
+) -> Tuple[AggregatedResponse, bool]:
+    """
+    Executa o aggregate_answers via single-flight.
+    A execução compartilhada segue enquanto houver alguém esperando por ela,
+    mesmo que o cliente que a disparou desista; quando o último desiste, ela
+    é cancelada (app/singleflight.py) e nada vai para o cache. Uma resposta
+    que já ficou pronta é gravada mesmo assim: a gravação não é cancelada
+    junto. Com `routed` (pergunta em modo auto), as chamadas entram no
+    router_stats().
+    Retorna (resposta, True se esta chamada foi a que disparou a execução).
+    """
+    leader = False
+
+    async def _run() -> AggregatedResponse:
+        async with admission.slot(mode_label(providers)):
+            if routed:
+                record_llm_calls(providers)
+            result = await aggregate_answers(question, providers)
+        if store is not None:
+            # A resposta já foi paga: o cancelamento não descarta a gravação
+            await asyncio.shield(store(result))
+        return result
+
+    def _start() -> Awaitable[AggregatedResponse]:
+        nonlocal leader
+        leader = True
+        return _run()
+
+    result = await request_flight.do(key, _start)
+    return result, leader
@@ -0,0 +1,360 @@
+# app/rate_limit.py
+
+"""
+Limite de uso por provider: requisições por minuto (RPM), tokens por minuto
+(TPM) e chamadas simultâneas.
+
+Cada provider tem dois token buckets (um de requisições, outro de tokens
+estimados) e um semáforo de concorrência. Quem passa do limite entra numa
+fila (FIFO) e espera a vez — até RATE_LIMIT_MAX_WAIT_SECONDS ou o fim do
+deadline da requisição, o que vier primeiro. Só então a chamada falha com
+RateLimitExceeded, sem gastar a cota do provider com um 429.
+
+Configuração (0 = sem limite, que é o padrão):
+  <PROVIDER>_RPM, <PROVIDER>_TPM, <PROVIDER>_MAX_CONCURRENCY
+  RATE_LIMIT_MAX_WAIT_SECONDS, RATE_LIMIT_MAX_QUEUE, RATE_LIMIT_OUTPUT_TOKENS
+
+Com SHARED_STATE_BACKEND configurado (app/shared_state.py), os baldes de
+RPM/TPM ficam no estado compartilhado e valem para todos os workers juntos
+(consultados na thread do estado compartilhado, fora do event loop); o
+limite de concorrência continua sendo por worker.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from app.config import env_float, env_int
+from app.deadline import get_deadline
+from app.shared_state import SharedState, get_shared_state
+
+logger = logging.getLogger("iscoolgpt.rate_limit")
+
+
+class RateLimitExceeded(RuntimeError):
+    def __init__(self, provider: str, reason: str) -> None:
+        super().__init__(f"Limite de uso do provider '{provider}' atingido: {reason}")
+        self.provider = provider
+
+
+def estimate_tokens(text: str) -> int:
+    """Aproximação de ~4 caracteres por token (suficiente para o orçamento de TPM)."""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """Balde com `per_minute` fichas por minuto e rajada de até um minuto de cota."""
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Segundos até haver `amount` fichas (0 = já há)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def take(self, amount: float) -> float:
+        """Consome se houver fichas (devolve 0); senão devolve a espera, sem consumir."""
+        wait = self.time_until(amount)
+        if wait == 0.0:
+            self.consume(amount)
+        return wait
+
+    def refund(self, amount: float) -> None:
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + min(amount, self.capacity))
+
+
+class SharedTokenBucket:
+    """Mesmo contrato do TokenBucket (take/refund), com as fichas no estado compartilhado."""
+
+    def __init__(self, state: SharedState, key: str, per_minute: float) -> None:
+        self.state = state
+        self.key = key
+        self.capacity = float(per_minute)
+
+    def take(self, amount: float) -> float:
+        return self.state.take(self.key, amount, self.capacity)
+
+    def refund(self, amount: float) -> None:
+        self.state.refund(self.key, amount, self.capacity)
+
+
+class ProviderLimiter:
+    def __init__(
+        self,
+        name: str,
+        rpm: int = 0,
+        tpm: int = 0,
+        max_concurrency: int = 0,
+        max_wait: float = 10.0,
+        max_queue: int = 100,
+        shared: Optional[SharedState] = None,
+    ) -> None:
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+
+        self.shared = shared is not None
+        self._state = shared
+        self._requests = self._bucket("rpm", rpm, shared) if rpm > 0 else None
+        self._tokens = self._bucket("tpm", tpm, shared) if tpm > 0 else None
+        self._semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        # asyncio.Lock atende em ordem de chegada: a fila dos buckets é FIFO
+        self._turn = asyncio.Lock()
+
+        self.active = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.admitted = 0
+        self.delayed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _bucket(self, kind: str, per_minute: int, shared: Optional[SharedState]):
+        if shared is None:
+            return TokenBucket(per_minute)
+        return SharedTokenBucket(shared, f"ratelimit:{self.name}:{kind}", per_minute)
+
+    @property
+    def limited(self) -> bool:
+        return bool(self._requests or self._tokens or self._semaphore)
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 1) -> AsyncIterator[None]:
+        """Reserva cota para uma chamada de ~`tokens` tokens e a mantém até o fim do bloco."""
+        if not self.limited or await self._try_admit(tokens):
+            self._record_wait(0.0)
+            async with self._held():
+                yield
+            return
+
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise RateLimitExceeded(self.name, f"fila cheia ({self.queued} chamadas aguardando)")
+
+        started = time.monotonic()
+        budget = self._wait_budget()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self._wait_for_buckets(tokens, started, budget)
+            if self._semaphore is not None:
+                remaining = budget - (time.monotonic() - started)
+                try:
+                    await asyncio.wait_for(self._semaphore.acquire(), timeout=max(0.0, remaining))
+                except BaseException as e:
+                    # Cota já consumida, mas a chamada não vai acontecer: devolve
+                    self._refund_buckets(tokens)
+                    if not isinstance(e, asyncio.TimeoutError):
+                        raise
+                    self.rejected += 1
+                    raise RateLimitExceeded(
+                        self.name, f"{self.max_concurrency} chamadas simultâneas em andamento"
+                    ) from None
+        finally:
+            self.queued -= 1
+
+        self._record_wait(time.monotonic() - started)
+        async with self._held():
+            yield
+
+    async def _try_admit(self, tokens: int) -> bool:
+        """
+        Caminho rápido: há cota e vaga agora, e ninguém na fila à frente.
+        Se sim, a vaga do semáforo e a cota já ficam reservadas.
+        """
+        if self.queued or self._turn.locked():
+            return False
+        if self._semaphore is not None:
+            if self._semaphore.locked():
+                return False
+            # Não suspende: acabou de conferir que há vaga (e a reserva antes
+            # da consulta aos baldes compartilhados, que suspende)
+            await self._semaphore.acquire()
+        admitted = False
+        try:
+            admitted = await self._take_buckets(tokens) == 0.0
+        finally:
+            if not admitted and self._semaphore is not None:
+                self._semaphore.release()
+        return admitted
+
+    async def _take_buckets(self, tokens: int) -> float:
+        """_take_buckets_now; com baldes compartilhados, fora do event loop."""
+        if self._state is None or (self._requests is None and self._tokens is None):
+            return self._take_buckets_now(tokens)
+
+        take = asyncio.ensure_future(self._state.run(lambda: self._take_buckets_now(tokens)))
+        try:
+            return await asyncio.shield(take)
+        except asyncio.CancelledError:
+            # A consulta ao backend vai até o fim: se consumiu, devolve
+            take.add_done_callback(lambda done: self._refund_if_taken(done, tokens))
+            raise
+
+    def _refund_if_taken(self, take: "asyncio.Future[float]", tokens: int) -> None:
+        if not take.cancelled() and take.exception() is None and take.result() == 0.0:
+            self._refund_buckets(tokens)
+
+    def _take_buckets_now(self, tokens: int) -> float:
+        """
+        Consome 1 requisição e `tokens` tokens, ou nada: devolve 0 ou a espera
+        até a próxima tentativa. Com baldes compartilhados não dá para olhar
+        antes de consumir (outro worker pode levar as fichas entre as duas
+        operações), então a requisição já consumida é devolvida se faltar TPM.
+        """
+        if self._requests is not None:
+            wait = self._requests.take(1)
+            if wait > 0:
+                return wait
+        if self._tokens is not None:
+            wait = self._tokens.take(tokens)
+            if wait > 0:
+                if self._requests is not None:
+                    self._requests.refund(1)
+                return wait
+        return 0.0
+
+    @asynccontextmanager
+    async def _held(self) -> AsyncIterator[None]:
+        """Vaga já reservada (buckets e semáforo): mantém até o fim do bloco."""
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            if self._semaphore is not None:
+                self._semaphore.release()
+
+    def _wait_budget(self) -> float:
+        deadline = get_deadline()
+        if deadline is None:
+            return self.max_wait
+        return min(self.max_wait, deadline.remaining())
+
+    def _refund_buckets(self, tokens: int) -> None:
+        if self._state is not None:
+            self._state.run_soon(lambda: self._refund_buckets_now(tokens))
+        else:
+            self._refund_buckets_now(tokens)
+
+    def _refund_buckets_now(self, tokens: int) -> None:
+        if self._requests is not None:
+            self._requests.refund(1)
+        if self._tokens is not None:
+            self._tokens.refund(tokens)
+
+    async def _wait_for_buckets(self, tokens: int, started: float, budget: float) -> None:
+        if self._requests is None and self._tokens is None:
+            return
+
+        # A espera pela vez na fila também conta no orçamento de quem chega
+        remaining = budget - (time.monotonic() - started)
+        try:
+            await asyncio.wait_for(self._turn.acquire(), timeout=max(0.0, remaining))
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise RateLimitExceeded(
+                self.name, f"fila de espera pela cota (mais de {budget:.1f}s)"
+            ) from None
+
+        try:
+            while True:
+                wait = await self._take_buckets(tokens)
+                if wait <= 0:
+                    break
+                if time.monotonic() - started + wait > budget:
+                    self.rejected += 1
+                    raise RateLimitExceeded(
+                        self.name, f"cota esgotada (próxima vaga em {wait:.1f}s)"
+                    )
+                await asyncio.sleep(wait)
+        finally:
+            self._turn.release()
+
+    def _record_wait(self, waited: float) -> None:
+        self.admitted += 1
+        if waited > 0.001:
+            self.delayed += 1
+            logger.info(f"[RateLimit] {self.name}: chamada aguardou {waited:.2f}s na fila")
+        self.wait_seconds_total += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "limits": {
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "max_concurrency": self.max_concurrency,
+                "max_wait_seconds": self.max_wait,
+                "shared": self.shared,
+            },
+            "active": self.active,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "delayed": self.delayed,
+            "rejected": self.rejected,
+            "avg_wait_seconds": (
+                round(self.wait_seconds_total / self.admitted, 3) if self.admitted else 0.0
+            ),
+            "max_wait_seconds": round(self.max_wait_seconds, 3),
+        }
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        prefix = provider.upper()
+        limiter = ProviderLimiter(
+            provider,
+            rpm=env_int(f"{prefix}_RPM", 0),
+            tpm=env_int(f"{prefix}_TPM", 0),
+            max_concurrency=env_int(f"{prefix}_MAX_CONCURRENCY", 0),
+            max_wait=env_float("RATE_LIMIT_MAX_WAIT_SECONDS", 10.0),
+            max_queue=env_int("RATE_LIMIT_MAX_QUEUE", 100),
+            shared=get_shared_state(),
+        )
+        _limiters[provider] = limiter
+    return limiter
+
+
+def call_tokens(prompt: str) -> int:
+    """Tokens estimados de uma chamada: o prompt mais a resposta esperada."""
+    return estimate_tokens(prompt) + env_int("RATE_LIMIT_OUTPUT_TOKENS", 512)
+
+
+def limiter_stats() -> Dict[str, Dict[str, object]]:
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
+
+
+def reset_limiters(provider: Optional[str] = None) -> None:
+    if provider is None:
+        _limiters.clear()
+    else:
+        _limiters.pop(provider, None)
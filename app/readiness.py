@@ -0,0 +1,115 @@
+# app/readiness.py
+
+"""
+Warm-up do processo e estado do GET /ready.
+
+O /health responde assim que o processo sobe (liveness); o /ready só fica
+verdadeiro depois do warm-up, para o load balancer mandar tráfego apenas
+para tasks aquecidas. O warm-up roda em segundo plano no startup:
+  1. constrói os providers de WARMUP_PROVIDERS (padrão: todos; lista
+     separada por vírgulas). Como os módulos dos providers são importados
+     sob demanda, um deploy só com HF usa WARMUP_PROVIDERS=huggingface e
+     nunca importa o SDK do Gemini;
+  2. com WARMUP_PROBE=true, faz uma pergunta curta a cada provider (até
+     WARMUP_PROBE_TIMEOUT segundos), o que já abre as conexões TLS do pool.
+     Gasta cota, por isso vem desligado.
+Falhas de um provider ficam registradas no relatório, mas não seguram o
+/ready: um provider fora do ar não deve tirar todas as tasks do balanceador
+(o circuit breaker cuida dele depois).
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from app.config import env_bool, env_float, env_str
+from app.registry import ProviderRegistry
+
+logger = logging.getLogger("iscoolgpt.readiness")
+
+PROBE_PROMPT = "Responda apenas: ok"
+
+_state: Dict[str, Any] = {}
+
+
+def reset_readiness() -> None:
+    _state.clear()
+    _state.update({
+        "ready": False,
+        "started_at": None,
+        "duration_ms": None,
+        "providers": {},
+        "probes": {},
+    })
+
+
+reset_readiness()
+
+_app_import_seconds: Optional[float] = None
+
+
+def record_app_import(seconds: float) -> None:
+    global _app_import_seconds
+    _app_import_seconds = seconds
+
+
+def is_ready() -> bool:
+    return bool(_state["ready"])
+
+
+def warm_up_names(registry: ProviderRegistry) -> List[str]:
+    configured = env_str("WARMUP_PROVIDERS")
+    if configured is None:
+        return registry.names()
+
+    names = []
+    for name in (item.strip() for item in configured.split(",")):
+        if not name:
+            continue
+        if registry.factory_for(name) is None:
+            logger.warning(f"[Warm-up] Provider desconhecido em WARMUP_PROVIDERS: '{name}'")
+            continue
+        names.append(name)
+    return names
+
+
+async def run_warm_up(registry: ProviderRegistry) -> None:
+    """Aquece o processo e marca o /ready. Deve rodar depois de abrir o pool HTTP."""
+    started = time.perf_counter()
+    _state["started_at"] = time.time()
+    names = warm_up_names(registry)
+
+    # Construir um provider pode importar um SDK pesado: fora do event loop
+    _state["providers"] = await asyncio.to_thread(registry.warm_up, names)
+
+    if env_bool("WARMUP_PROBE", False):
+        timeout = env_float("WARMUP_PROBE_TIMEOUT", 15.0)
+        built = [name for name in names if _state["providers"].get(name) == "ok"]
+        results = await asyncio.gather(
+            *(_probe(registry, name, timeout) for name in built)
+        )
+        _state["probes"] = dict(zip(built, results))
+
+    _state["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    _state["ready"] = True
+    logger.info(f"[Warm-up] Pronto em {_state['duration_ms']:.0f}ms: {_state['providers']}")
+
+
+async def _probe(registry: ProviderRegistry, name: str, timeout: float) -> str:
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(registry.get(name).ask(PROBE_PROMPT), timeout=timeout)
+    except Exception as e:
+        logger.warning(f"[Warm-up] Probe de '{name}' falhou: {type(e).__name__}: {e}")
+        return f"{type(e).__name__}: {e}"
+    return f"ok ({(time.perf_counter() - started) * 1000:.0f}ms)"
+
+
+def readiness_report(registry: ProviderRegistry) -> Dict[str, Any]:
+    report = dict(_state)
+    report["imports"] = {
+        "app_ms": round(_app_import_seconds * 1000, 1) if _app_import_seconds is not None else None,
+        "providers": registry.import_report(),
+    }
+    return report
@@ -0,0 +1,182 @@
+# app/registry.py
+
+"""
+Registro de providers de longa duração.
+
+Cada provider é construído uma única vez (no startup ou no primeiro uso) e
+reaproveitado entre requisições. Construir um cliente relê variáveis de
+ambiente, chama genai.configure e monta o GenerativeModel — trabalho que não
+precisa acontecer a cada pergunta.
+
+Hot reload: cada classe de LLM declara em ENV_VARS as variáveis que usa
+(chaves e nomes de modelo). Se alguma delas mudar, a instância é reconstruída
+automaticamente no próximo get(). reload() força a reconstrução.
+
+Imports sob demanda: LazyFactory("app.llms.gemini_llm", "GeminiLLM") só
+importa o módulo do provider (e o SDK que ele puxar) na primeira construção.
+Um deploy que só usa o HF não paga o import do Gemini no cold start.
+import_report() diz o que já foi importado e quanto tempo levou.
+
+Test doubles: override(name, instance) substitui um provider enquanto o
+bloco `with` estiver ativo. Patches na classe (patch("...GeminiLLM.ask"))
+continuam funcionando, porque a instância cacheada resolve métodos pela classe.
+"""
+
+import importlib
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from app.llm_base import LLMClient
+
+logger = logging.getLogger("iscoolgpt.registry")
+
+Factory = Callable[[], LLMClient]
+
+
+class LazyFactory:
+    """Factory que importa `module` e resolve `attribute` só quando usada."""
+
+    def __init__(self, module: str, attribute: str) -> None:
+        self.module = module
+        self.attribute = attribute
+        self.import_seconds: Optional[float] = None
+        self._target: Optional[Factory] = None
+
+    def load(self) -> Factory:
+        if self._target is None:
+            started = time.perf_counter()
+            target = getattr(importlib.import_module(self.module), self.attribute)
+            self.import_seconds = time.perf_counter() - started
+            self._target = target
+            logger.info(
+                f"[Registry] {self.module} importado em {self.import_seconds * 1000:.0f}ms"
+            )
+        return self._target
+
+    @property
+    def loaded(self) -> bool:
+        return self._target is not None
+
+    @property
+    def ENV_VARS(self) -> Tuple[str, ...]:
+        return tuple(getattr(self.load(), "ENV_VARS", ()))
+
+    def __call__(self) -> LLMClient:
+        return self.load()()
+
+
+class ProviderRegistry:
+    def __init__(self, *factory_maps: Mapping[str, Factory]) -> None:
+        # Guardamos referências (e não cópias) dos dicionários de factories,
+        # para que patch.dict(...) nos testes tenha efeito imediato.
+        self._factory_maps = factory_maps
+        self._instances: Dict[str, Tuple[Factory, Tuple, LLMClient]] = {}
+        self._overrides: Dict[str, LLMClient] = {}
+
+    # ------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------
+    def factory_for(self, name: str) -> Optional[Factory]:
+        for factories in self._factory_maps:
+            factory = factories.get(name)
+            if factory is not None:
+                return factory
+        return None
+
+    def names(self) -> List[str]:
+        seen: List[str] = []
+        for factories in self._factory_maps:
+            for name in factories:
+                if name not in seen:
+                    seen.append(name)
+        return seen
+
+    def get(self, name: str) -> LLMClient:
+        """
+        Retorna a instância do provider, construindo-a se necessário.
+        Lança KeyError se o provider não existir; erros do construtor
+        (ex.: chave de API ausente) são propagados e nada é cacheado.
+        """
+        override = self._overrides.get(name)
+        if override is not None:
+            return override
+
+        factory = self.factory_for(name)
+        if factory is None:
+            raise KeyError(name)
+
+        fingerprint = _env_fingerprint(factory)
+        cached = self._instances.get(name)
+        if cached is not None:
+            cached_factory, cached_fingerprint, instance = cached
+            if cached_factory is factory and cached_fingerprint == fingerprint:
+                return instance
+            logger.info(f"[Registry] Configuração de '{name}' mudou; reconstruindo provider.")
+
+        instance = factory()
+        self._instances[name] = (factory, fingerprint, instance)
+        return instance
+
+    # ------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------
+    def warm_up(self, names: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """
+        Constrói os providers informados (ou todos). Falhas são registradas
+        no log e não interrompem o startup — o provider tenta de novo no
+        primeiro uso.
+        """
+        status: Dict[str, str] = {}
+        for name in names or self.names():
+            try:
+                self.get(name)
+                status[name] = "ok"
+            except Exception as e:
+                logger.warning(f"[Registry] Não foi possível construir '{name}': {e}")
+                status[name] = f"{type(e).__name__}: {e}"
+        return status
+
+    def reload(self, name: Optional[str] = None) -> None:
+        """Descarta as instâncias cacheadas (todas ou só a informada)."""
+        if name is None:
+            self._instances.clear()
+        else:
+            self._instances.pop(name, None)
+
+    def import_report(self) -> Dict[str, Dict[str, Any]]:
+        """Módulo de cada provider, se já foi importado e em quanto tempo."""
+        report: Dict[str, Dict[str, Any]] = {}
+        for name in self.names():
+            factory = self.factory_for(name)
+            if not isinstance(factory, LazyFactory):
+                report[name] = {"module": getattr(factory, "__module__", None), "loaded": True}
+                continue
+            report[name] = {
+                "module": factory.module,
+                "loaded": factory.loaded,
+                "import_ms": (
+                    round(factory.import_seconds * 1000, 1)
+                    if factory.import_seconds is not None else None
+                ),
+            }
+        return report
+
+    @contextmanager
+    def override(self, name: str, instance: LLMClient) -> Iterator[LLMClient]:
+        previous = self._overrides.get(name)
+        self._overrides[name] = instance
+        try:
+            yield instance
+        finally:
+            if previous is None:
+                self._overrides.pop(name, None)
+            else:
+                self._overrides[name] = previous
+
+
+def _env_fingerprint(factory: Factory) -> Tuple:
+    env_vars = getattr(factory, "ENV_VARS", ())
+    return tuple(os.getenv(var) for var in env_vars)
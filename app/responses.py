@@ -0,0 +1,227 @@
+# app/responses.py
+
+"""
+Caminho rápido (opcional) para serializar e comprimir as respostas.
+
+  - FAST_JSON=true: JSON gerado pelo orjson (pip install orjson) em vez do
+    json da stdlib. Vale para as rotas que devolvem dict (default_response_class
+    do app) e para as que devolvem um modelo pydantic já validado
+    (model_response): o modelo é serializado direto, sem o FastAPI validar
+    de novo pelo response_model. Sem o orjson instalado, cai no
+    model_dump_json do pydantic, com um aviso no log;
+  - RESPONSE_COMPRESSION=true: gzip ou brotli (pip install brotli),
+    negociado pelo Accept-Encoding, para respostas acima de
+    COMPRESSION_MIN_BYTES (1024). Respostas em streaming (SSE, NDJSON)
+    nunca são comprimidas, para não segurar os pedaços no buffer.
+    GZIP_LEVEL (1, como o nginx) e BROTLI_QUALITY (4) privilegiam CPU
+    baixa: num fusion de ~25 KB o nível 1 já economiza ~68% dos bytes com
+    um terço do CPU do nível 5.
+
+scripts/bench_serialization.py mede o CPU e os bytes de cada combinação.
+"""
+
+import gzip
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from app.config import env_bool, env_int
+
+logger = logging.getLogger("iscoolgpt.responses")
+
+try:
+    import orjson
+except ImportError:  # dependência opcional
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # dependência opcional
+    brotli = None
+
+_warned_missing_orjson = False
+
+
+def fast_json_enabled() -> bool:
+    global _warned_missing_orjson
+    if not env_bool("FAST_JSON", False):
+        return False
+    if orjson is None:
+        if not _warned_missing_orjson:
+            logger.warning("[Responses] FAST_JSON=true, mas o orjson não está instalado; usando o pydantic.")
+            _warned_missing_orjson = True
+        return False
+    return True
+
+
+def dumps(content: Any) -> bytes:
+    """JSON compacto em UTF-8 (mesma saída do JSONResponse do Starlette)."""
+    if fast_json_enabled():
+        return orjson.dumps(content)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def model_json(model: BaseModel, **kwargs: Any) -> bytes:
+    """
+    Serializa um modelo já validado. kwargs vão para o model_dump
+    (ex.: exclude={"timings"}).
+    """
+    if fast_json_enabled():
+        # model_dump + orjson sai mais barato que o model_dump_json para
+        # respostas com textos longos (ver scripts/bench_serialization.py)
+        return orjson.dumps(model.model_dump(**kwargs))
+    return model.model_dump_json(**kwargs).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que usa o orjson quando FAST_JSON=true."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_response(
+    model: BaseModel,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+    **kwargs: Any,
+) -> Response:
+    """Resposta JSON de um modelo pronto, sem a segunda validação do response_model."""
+    return Response(
+        model_json(model, **kwargs),
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+# ------------------------------------------------------
+# Compressão
+# ------------------------------------------------------
+def compression_enabled() -> bool:
+    return env_bool("RESPONSE_COMPRESSION", False)
+
+
+def available_encodings() -> List[str]:
+    """Em ordem de preferência."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Escolhe a codificação a partir do Accept-Encoding ("gzip, br;q=0.8",
+    "*"...), respeitando q=0. Com pesos iguais, prefere brotli.
+    """
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name] = quality
+
+    best: Optional[Tuple[float, int, str]] = None
+    for rank, encoding in enumerate(available_encodings()):
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality <= 0:
+            continue
+        candidate = (quality, -rank, encoding)
+        if best is None or candidate > best:
+            best = candidate
+    return best[2] if best else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=env_int("BROTLI_QUALITY", 4))
+    return gzip.compress(body, compresslevel=env_int("GZIP_LEVEL", 1), mtime=0)
+
+
+# Tipos que já chegam comprimidos ou são streams
+_SKIP_CONTENT_TYPES = ("text/event-stream", "application/x-ndjson", "image/", "audio/", "video/")
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI (sem BaseHTTPMiddleware, como o de métricas). Segura só o
+    início da resposta: se o corpo vier inteiro numa mensagem e passar do
+    limite, comprime; se vier em pedaços (streaming), repassa como está.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Dict[str, Any]] = None
+        passthrough = False
+
+        async def _send(message) -> None:
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = {name.lower(): value for name, value in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in headers or content_type.startswith(_SKIP_CONTENT_TYPES):
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < env_int("COMPRESSION_MIN_BYTES", 1024):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            vary = [b"Accept-Encoding"]
+            headers = []
+            for name, value in start_message.get("headers", []):
+                if name.lower() == b"vary":
+                    vary.insert(0, value)  # ex.: "Origin" do CORS
+                elif name.lower() != b"content-length":
+                    headers.append((name, value))
+            headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+                (b"vary", b", ".join(vary)),
+            ]
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, _send)
@@ -0,0 +1,259 @@
+# app/retry.py
+
+"""
+Política de retry compartilhada pelos providers.
+
+Só falhas em que repetir é seguro e pode dar certo são repetidas:
+  - HTTP 408, 429, 500, 502, 503 e 504 (a requisição foi recusada ou não
+    processada);
+  - erros de conexão (conexão recusada/resetada, pool esgotado);
+  - exceções de SDK com status HTTP equivalente (atributo status_code/code).
+Read timeouts NÃO são repetidos: o provider pode estar gerando a resposta
+e outra tentativa só dobraria o custo e estouraria o deadline.
+
+Espera entre tentativas: backoff exponencial com "full jitter"
+(uniforme entre 0 e min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2^n)) ou o
+Retry-After do provider, quando enviado. Não há retry se a espera passar de
+RETRY_MAX_DELAY (um Retry-After de minutos não prende a requisição) ou não
+couber no deadline da requisição, nem quando o orçamento global de retries acabar:
+no máximo RETRY_BUDGET_RATIO das chamadas dos últimos RETRY_BUDGET_WINDOW
+segundos (mais RETRY_BUDGET_MIN), para que retries não multipliquem a carga
+num provider que já está fora do ar.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+import httpx
+
+from app.config import env_float, env_int
+from app.deadline import get_deadline
+from app.metrics import PROVIDER_ATTEMPTS
+
+logger = logging.getLogger("iscoolgpt.retry")
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+RETRYABLE_EXCEPTIONS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.PoolTimeout,
+    httpx.ReadError,
+    httpx.WriteError,
+    httpx.RemoteProtocolError,
+)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After em segundos ("120") ou data HTTP; None se ausente/inválido."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify(outcome: Any) -> Tuple[bool, Optional[float]]:
+    """(vale repetir?, Retry-After em segundos) para um resultado ou exceção."""
+    if isinstance(outcome, httpx.Response):
+        if outcome.status_code in RETRYABLE_STATUS:
+            return True, parse_retry_after(outcome.headers.get("Retry-After"))
+        return False, None
+
+    if isinstance(outcome, RETRYABLE_EXCEPTIONS):
+        return True, None
+
+    if isinstance(outcome, Exception):
+        status = getattr(outcome, "status_code", None) or getattr(outcome, "code", None)
+        if isinstance(status, int) and status in RETRYABLE_STATUS:
+            return True, None
+
+    return False, None
+
+
+class RetryBudget:
+    """Retries permitidos: uma fração das chamadas da janela, mais um mínimo fixo."""
+
+    def __init__(self, ratio: float, minimum: int, window: float) -> None:
+        self.ratio = ratio
+        self.minimum = minimum
+        self.window = window
+        self._calls: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+        self.exhausted = 0
+
+    def _trim(self, now: float) -> None:
+        for events in (self._calls, self._retries):
+            while events and now - events[0] > self.window:
+                events.popleft()
+
+    def record_call(self) -> None:
+        self._calls.append(time.monotonic())
+
+    def try_spend(self) -> bool:
+        now = time.monotonic()
+        self._trim(now)
+        if len(self._retries) >= self.minimum + self.ratio * len(self._calls):
+            self.exhausted += 1
+            return False
+        self._retries.append(now)
+        return True
+
+    def stats(self) -> Dict[str, object]:
+        self._trim(time.monotonic())
+        return {
+            "calls_in_window": len(self._calls),
+            "retries_in_window": len(self._retries),
+            "exhausted": self.exhausted,
+        }
+
+
+_budget: Optional[RetryBudget] = None
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _get_budget() -> RetryBudget:
+    global _budget
+    if _budget is None:
+        _budget = RetryBudget(
+            ratio=env_float("RETRY_BUDGET_RATIO", 0.2),
+            minimum=env_int("RETRY_BUDGET_MIN", 10),
+            window=env_float("RETRY_BUDGET_WINDOW", 10.0),
+        )
+    return _budget
+
+
+def _provider_stats(provider: str) -> Dict[str, int]:
+    stats = _stats.get(provider)
+    if stats is None:
+        stats = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "recovered": 0,
+            "gave_up": 0,
+        }
+        _stats[provider] = stats
+    return stats
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full jitter: uniforme entre 0 e o teto exponencial da tentativa `attempt` (1, 2, ...)."""
+    base = env_float("RETRY_BASE_DELAY", 0.5)
+    cap = env_float("RETRY_MAX_DELAY", 8.0)
+    return random.uniform(0.0, min(cap, base * (2 ** (attempt - 1))))
+
+
+async def with_retries(provider: str, attempt: Callable[[], Awaitable[T]]) -> T:
+    """
+    Executa `attempt` (uma chamada completa ao provider) com a política de
+    retry. Respostas HTTP repetíveis que esgotarem as tentativas são
+    devolvidas como vieram, para o cliente tratar como sempre tratou;
+    exceções repetíveis são relançadas.
+    """
+    max_attempts = max(1, env_int("RETRY_MAX_ATTEMPTS", 3))
+    budget = _get_budget()
+    stats = _provider_stats(provider)
+    stats["calls"] += 1
+    budget.record_call()
+
+    number = 0
+    while True:
+        number += 1
+        stats["attempts"] += 1
+
+        try:
+            outcome: Any = await attempt()
+        except Exception as e:
+            outcome = e
+
+        PROVIDER_ATTEMPTS.labels(provider, _status_label(outcome)).inc()
+        retryable, retry_after = classify(outcome)
+        if not retryable:
+            if number > 1 and not isinstance(outcome, Exception):
+                stats["recovered"] += 1
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        delay = retry_after if retry_after is not None else backoff_delay(number)
+        reason = _describe(outcome)
+
+        if not _can_retry(provider, number, max_attempts, delay, budget):
+            if number > 1:
+                stats["gave_up"] += 1
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        stats["retries"] += 1
+        logger.warning(
+            f"[Retry] {provider}: {reason}; tentativa {number + 1}/{max_attempts} "
+            f"em {delay:.2f}s"
+        )
+        await asyncio.sleep(delay)
+
+
+def _can_retry(
+    provider: str, number: int, max_attempts: int, delay: float, budget: RetryBudget
+) -> bool:
+    if number >= max_attempts:
+        return False
+
+    # O backoff nunca passa do teto; só um Retry-After longo cai aqui
+    max_delay = env_float("RETRY_MAX_DELAY", 8.0)
+    if delay > max_delay:
+        logger.info(
+            f"[Retry] {provider}: Retry-After de {delay:.1f}s acima de RETRY_MAX_DELAY ({max_delay:.1f}s)."
+        )
+        return False
+
+    deadline = get_deadline()
+    if deadline is not None and delay >= deadline.remaining():
+        logger.info(f"[Retry] {provider}: espera de {delay:.1f}s não cabe no deadline.")
+        return False
+
+    if not budget.try_spend():
+        logger.warning(f"[Retry] {provider}: orçamento global de retries esgotado.")
+        return False
+
+    return True
+
+
+def _status_label(outcome: Any) -> str:
+    if isinstance(outcome, httpx.Response):
+        return str(outcome.status_code)
+    if isinstance(outcome, Exception):
+        return type(outcome).__name__
+    return "ok"
+
+
+def _describe(outcome: Any) -> str:
+    if isinstance(outcome, httpx.Response):
+        return f"HTTP {outcome.status_code}"
+    return f"{type(outcome).__name__}: {outcome}"
+
+
+def retry_stats() -> Dict[str, object]:
+    return {
+        "providers": {name: dict(stats) for name, stats in _stats.items()},
+        "budget": _get_budget().stats(),
+    }
+
+
+def reset_retry_state() -> None:
+    global _budget
+    _budget = None
+    _stats.clear()
@@ -0,0 +1,142 @@
+# app/router.py
+
+"""
+Modo providers=["auto"]: decide, sem nenhuma chamada de rede, se a pergunta
+vai para um provider rápido (ROUTER_FAST_PROVIDER, padrão huggingface) ou
+para o fusion completo (N providers + síntese).
+
+A decisão é uma pontuação simples:
+  +1  pergunta longa (mais de ROUTER_LONG_QUESTION_WORDS palavras, padrão 25);
+  +1  por palavra-chave de pergunta "difícil" (comparação, arquitetura,
+      troubleshooting, código...), no máximo +2;
+  -1  pergunta de definição ("o que é", "defina", "para que serve"...);
+  +1  pergunta popular: já teve ROUTER_POPULAR_HITS (3) acertos de cache —
+      o custo do fusion se paga, porque a resposta melhor vai ser servida
+      do cache muitas vezes.
+Com pontuação >= ROUTER_FUSION_THRESHOLD (padrão 1), vai para o fusion.
+
+router_stats() mostra quantas vezes cada rota foi escolhida e quantas
+chamadas a LLMs isso economizou em relação a mandar tudo para o fusion.
+Só contam as chamadas que de fato foram aos providers (record_llm_calls):
+respostas do cache ou de uma pergunta idêntica em andamento não gastam nada.
+"""
+
+import logging
+import re
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from app.cache import normalize_question
+from app.config import env_int, env_str
+from app.fusion import fusion_providers
+from app.metrics import ROUTER_DECISIONS
+
+logger = logging.getLogger("iscoolgpt.router")
+
+AUTO = "auto"
+
+COMPLEX_KEYWORDS = (
+    "diferença", "compar", " vs ", "versus", "quando usar", "melhor opção",
+    "prós e contras", "trade-off", "tradeoff", "vantagens", "desvantagens",
+    "arquitetura", "projetar", "desenhar", "migrar", "migração", "estratégia",
+    "alta disponibilidade", "disaster recovery", "multi-região", "por que",
+    "otimizar", "custo", "erro", "não funciona", "troubleshoot", "passo a passo",
+    "terraform", "yaml", "código", "script",
+)
+
+_DEFINITION = re.compile(
+    r"^(o que (é|são|significa)|defina|definição de|qual (é )?o significado|"
+    r"o que quer dizer|para que serve|o que faz)\b"
+)
+
+# Histórico de acertos de cache por pergunta (LRU limitado)
+_HISTORY_MAX_ENTRIES = 10_000
+_cache_hits: "OrderedDict[str, int]" = OrderedDict()
+
+_stats: Dict[str, int] = {}
+
+
+def reset_router() -> None:
+    _cache_hits.clear()
+    _stats.clear()
+    _stats.update({"single": 0, "fusion": 0, "llm_calls": 0, "llm_calls_saved": 0})
+
+
+reset_router()
+
+
+def record_cache_hit(question: str) -> None:
+    """Chamado pelo pipeline a cada acerto de cache (exato ou semântico)."""
+    key = normalize_question(question)
+    _cache_hits[key] = _cache_hits.pop(key, 0) + 1
+    while len(_cache_hits) > _HISTORY_MAX_ENTRIES:
+        _cache_hits.popitem(last=False)
+
+
+def score_question(question: str) -> Tuple[int, List[str]]:
+    """Pontuação e motivos (para log e testes)."""
+    text = normalize_question(question)
+    score = 0
+    reasons: List[str] = []
+
+    if len(text.split()) > env_int("ROUTER_LONG_QUESTION_WORDS", 25):
+        score += 1
+        reasons.append("longa")
+
+    keywords = [keyword.strip() for keyword in COMPLEX_KEYWORDS if keyword in f" {text} "]
+    if keywords:
+        score += min(2, len(keywords))
+        reasons.append("palavras-chave: " + ", ".join(keywords))
+
+    if _DEFINITION.match(text):
+        score -= 1
+        reasons.append("definição")
+
+    if _cache_hits.get(text, 0) >= env_int("ROUTER_POPULAR_HITS", 3):
+        score += 1
+        reasons.append("popular")
+
+    return score, reasons
+
+
+def resolve_providers(question: str, providers: List[str]) -> List[str]:
+    """Troca ["auto"] pela rota escolhida; outros valores passam direto."""
+    if AUTO not in providers:
+        return providers
+
+    score, reasons = score_question(question)
+
+    if score >= env_int("ROUTER_FUSION_THRESHOLD", 1):
+        route, resolved = "fusion", ["fusion"]
+    else:
+        route, resolved = "single", [env_str("ROUTER_FAST_PROVIDER", "huggingface")]
+
+    _stats[route] += 1
+    ROUTER_DECISIONS.labels(route).inc()
+    logger.info(f"[Router] {route} (pontuação {score}: {', '.join(reasons) or 'nenhum sinal'})")
+    return resolved
+
+
+def record_llm_calls(providers: List[str]) -> None:
+    """
+    Chamado quando uma pergunta roteada vai de fato aos providers, com a
+    rota que executou (a escolhida pelo router ou a degradada pela admissão).
+    """
+    fusion_calls = len(fusion_providers()) + 1  # providers + síntese
+    calls = fusion_calls if "fusion" in providers else 1
+    _stats["llm_calls"] += calls
+    _stats["llm_calls_saved"] += fusion_calls - calls
+
+
+def router_stats() -> Dict[str, object]:
+    decisions = _stats["single"] + _stats["fusion"]
+    baseline = _stats["llm_calls"] + _stats["llm_calls_saved"]
+    return {
+        "routes": {"single": _stats["single"], "fusion": _stats["fusion"]},
+        "fusion_ratio": round(_stats["fusion"] / decisions, 3) if decisions else 0.0,
+        "llm_calls": _stats["llm_calls"],
+        "llm_calls_saved": _stats["llm_calls_saved"],
+        # Fração das chamadas economizadas em relação a "tudo no fusion"
+        "savings_ratio": round(_stats["llm_calls_saved"] / baseline, 3) if baseline else 0.0,
+        "tracked_questions": len(_cache_hits),
+    }
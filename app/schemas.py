@@ -1,13 +1,15 @@
 # app/schemas.py
 
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List, Optional
 
 
 class QuestionRequest(BaseModel):
 
     question: str
     providers: List[str]
+    # Conversa multi-turno: o histórico fica no servidor (app/sessions.py)
+    session_id: Optional[str] = None
 
 
 # Alias para compatibilidade com o nome AskRequest
@@ -24,3 +26,49 @@ class ProviderAnswer(BaseModel):
 class AggregatedResponse(BaseModel):
     final_answer: str
     answers: List[ProviderAnswer]
+    # Providers (ou o reasoner) que não responderam dentro do deadline
+    dropped_providers: List[str] = []
+    # Modo pedido, quando a admissão o trocou por um provider só (sobrecarga)
+    degraded_from: Optional[str] = None
+    # Duração (ms) de cada etapa; só vem com o header X-Debug-Timings: 1
+    timings: Optional[Dict[str, float]] = None
+
+
+class BatchQuestion(BaseModel):
+    # Identificador opcional devolvido no resultado (ex.: número da questão)
+    id: Optional[str] = None
+    question: str
+    # Se omitido, usa os providers do lote
+    providers: Optional[List[str]] = None
+    # Lotes não têm sessão: só existe para o /ask/batch recusar (422)
+    session_id: Optional[str] = None
+
+
+class BatchRequest(BaseModel):
+    questions: List[BatchQuestion]
+    providers: List[str] = ["fusion"]
+    session_id: Optional[str] = None
+
+
+class BatchResult(BaseModel):
+    id: str
+    index: int
+    question: str
+    cache: Optional[str] = None
+    elapsed_ms: float
+    response: Optional[AggregatedResponse] = None
+    error: Optional[str] = None
+
+
+class JobStatus(BaseModel):
+    id: str
+    # queued | running | done | error
+    status: str
+    question: str
+    providers: List[str]
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cache: Optional[str] = None
+    response: Optional[AggregatedResponse] = None
+    error: Optional[str] = None
@@ -0,0 +1,342 @@
+# app/semantic_cache.py
+
+"""
+Cache semântico: encontra perguntas "quase iguais" às já respondidas
+("o que é uma VPC" x "o que significa VPC?") sem nenhuma chamada de rede.
+
+- Embedding local: n-gramas de caracteres + palavras, com hashing assinado
+  num vetor de dimensão fixa (NumPy), normalizado (cosseno = produto escalar).
+- Negações ("não", "nunca", "sem"...) não são só mais uma palavra: "quando
+  não usar Lambda" tem similaridade ~0.92 com "quando usar Lambda". Elas
+  entram no namespace do índice (semantic_scope), então perguntas com
+  negações diferentes nunca se encontram.
+- Índice: LSH por hiperplanos aleatórios (várias tabelas), então cada busca
+  compara a pergunta só com uma pequena lista de candidatos, e não com o
+  índice inteiro. Com 100 mil entradas (scripts/bench_semantic_cache.py),
+  p99 de ~0.3 ms para perguntas já indexadas e ~0.5 ms para perguntas novas.
+- Tamanho limitado: ao encher, a entrada usada há mais tempo é removida.
+- save()/load() persistem o índice num arquivo .npz.
+
+O índice não guarda respostas: cada entrada aponta para a chave do cache
+exato (app/cache.py), onde a resposta de fato está.
+"""
+
+import logging
+import os
+import re
+import time
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.cache import normalize_question
+from app.config import env_bool, env_float, env_int, env_list, env_str
+
+logger = logging.getLogger("iscoolgpt.semantic_cache")
+
+DEFAULT_DIM = 256
+NGRAM_SIZES = (3, 4, 5)
+
+# Palavras que aparecem em quase toda pergunta e não dizem nada sobre o
+# assunto — sem isso, "o que é VPC" e "o que é EC2" ficariam parecidas demais.
+STOPWORDS = {
+    "a", "as", "o", "os", "um", "uma", "uns", "umas", "de", "da", "do", "das",
+    "dos", "e", "em", "na", "no", "nas", "nos", "para", "pra", "por", "com",
+    "que", "é", "eh", "me", "se", "sobre", "qual", "quais", "como",
+    "defina", "definição", "significa", "conceito",
+    "funciona", "serve", "ao", "aos", "à", "às", "isso", "isto",
+}
+
+# Forma canônica de cada negação (mudam o sentido; ver semantic_scope)
+NEGATIONS = {"não": "não", "nao": "não", "nem": "não", "nunca": "nunca", "jamais": "nunca", "sem": "sem"}
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _ignored_words() -> Set[str]:
+    """
+    SEMANTIC_CACHE_IGNORE_WORDS: palavras do contexto de uma implantação
+    (ex.: "aws,amazon" num tutor só de AWS, para "VPC" e "VPC na AWS" serem a
+    mesma pergunta), ignoradas como as stopwords. Vazio por padrão.
+    """
+    return {word.casefold() for word in env_list("SEMANTIC_CACHE_IGNORE_WORDS")}
+
+
+def _features(text: str) -> List[str]:
+    ignored = STOPWORDS | _ignored_words()
+    words = [w for w in _TOKEN.findall(normalize_question(text)) if w not in ignored]
+    features = [f"w:{word}" for word in words]
+    for word in words:
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return features
+
+
+def embed(text: str, dim: int = DEFAULT_DIM) -> np.ndarray:
+    """Vetor float32 normalizado (L2) da pergunta."""
+    features = _features(text)
+    if not features:
+        return np.zeros(dim, dtype=np.float32)
+
+    hashes = np.fromiter(
+        (zlib.crc32(feature.encode("utf-8")) for feature in features),
+        dtype=np.uint32,
+        count=len(features),
+    )
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+    vector = np.bincount(hashes % dim, weights=signs, minlength=dim).astype(np.float32)
+
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+def semantic_scope(namespace: str, question: str) -> str:
+    """
+    Namespace do índice para a pergunta: o namespace do cache mais as
+    negações presentes. "Quando não usar Lambda" e "quando usar Lambda"
+    ficam em namespaces diferentes, por mais parecidos que sejam os vetores.
+    """
+    words = _TOKEN.findall(normalize_question(question))
+    negations = sorted({NEGATIONS[word] for word in words if word in NEGATIONS})
+    return f"{namespace}|{'+'.join(negations)}" if negations else namespace
+
+
+class SemanticIndex:
+    def __init__(
+        self,
+        dim: int = DEFAULT_DIM,
+        capacity: int = 10_000,
+        threshold: float = 0.85,
+        tables: int = 8,
+        bits: int = 18,
+        probes: int = 4,
+        seed: int = 7,
+    ) -> None:
+        self.dim = dim
+        self.capacity = capacity
+        self.threshold = threshold
+        self.tables = tables
+        self.bits = bits
+        self.probes = probes
+
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((tables * bits, dim)).astype(np.float32)
+        self._powers = (1 << np.arange(bits, dtype=np.int64))
+
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._last_used = np.full(capacity, -np.inf)
+        self._keys: List[Optional[str]] = [None] * capacity
+        self._namespaces: List[Optional[str]] = [None] * capacity
+        self._signatures = np.zeros((capacity, tables), dtype=np.int64)
+        # Buckets por (namespace, código LSH) de cada tabela
+        self._buckets: List[Dict[Tuple[str, int], Set[int]]] = [{} for _ in range(tables)]
+        self._slot_by_key: Dict[Tuple[str, str], int] = {}
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return self.capacity - len(self._free)
+
+    # ------------------------------------------------------
+    # LSH
+    # ------------------------------------------------------
+    def _project(self, vector: np.ndarray) -> np.ndarray:
+        return (self._planes @ vector).reshape(self.tables, self.bits)
+
+    def _signature(self, projection: np.ndarray) -> np.ndarray:
+        return (projection > 0) @ self._powers
+
+    def _exact_candidates(self, namespace: str, signature: List[int]) -> Set[int]:
+        candidates: Set[int] = set()
+        for table, code in enumerate(signature):
+            bucket = self._buckets[table].get((namespace, code))
+            if bucket:
+                candidates.update(bucket)
+        return candidates
+
+    def _probe_candidates(
+        self, namespace: str, projection: np.ndarray, signature: List[int]
+    ) -> Set[int]:
+        """
+        Multi-probe: os buckets vizinhos de cada tabela, obtidos invertendo
+        os `probes` bits menos confiáveis (os de projeção mais próxima de
+        zero). Aumenta o recall sem precisar de mais tabelas.
+        """
+        weakest = np.argpartition(np.abs(projection), self.probes, axis=1)[:, : self.probes].tolist()
+
+        candidates: Set[int] = set()
+        for table, code in enumerate(signature):
+            buckets = self._buckets[table]
+            for bit in weakest[table]:
+                bucket = buckets.get((namespace, code ^ (1 << bit)))
+                if bucket:
+                    candidates.update(bucket)
+        return candidates
+
+    def _best(self, slots: Set[int], vector: np.ndarray) -> Optional[Tuple[int, float]]:
+        if not slots:
+            return None
+        index = np.fromiter(slots, dtype=np.int64, count=len(slots))
+        scores = self._vectors[index] @ vector
+        best = int(np.argmax(scores))
+        return int(index[best]), float(scores[best])
+
+    # ------------------------------------------------------
+    # API
+    # ------------------------------------------------------
+    def search(self, vector: np.ndarray, namespace: str) -> Optional[Tuple[str, float]]:
+        """
+        Retorna (chave, similaridade) do vizinho mais próximo no mesmo
+        namespace, se a similaridade for >= threshold.
+
+        Primeiro compara só com os buckets exatos de cada tabela (onde uma
+        paráfrase quase sempre está); os buckets vizinhos (multi-probe), que
+        trazem várias vezes mais candidatos, só são visitados se ali não
+        houver nada acima do threshold.
+        """
+        projection = self._project(vector)
+        signature = self._signature(projection).tolist()
+
+        exact = self._exact_candidates(namespace, signature)
+        match = self._best(exact, vector)
+        if match is None or match[1] < self.threshold:
+            probed = self._probe_candidates(namespace, projection, signature) - exact
+            other = self._best(probed, vector)
+            if other is not None and (match is None or other[1] > match[1]):
+                match = other
+
+        if match is not None and match[1] >= self.threshold:
+            slot, score = match
+            self._last_used[slot] = time.monotonic()
+            self.hits += 1
+            return self._keys[slot], score
+
+        self.misses += 1
+        return None
+
+    def add(self, vector: np.ndarray, namespace: str, key: str) -> None:
+        existing = self._slot_by_key.get((namespace, key))
+        if existing is not None:
+            self._remove_slot(existing)
+
+        if not self._free:
+            self._evict_oldest()
+
+        slot = self._free.pop()
+        signature = self._signature(self._project(vector))
+
+        self._vectors[slot] = vector
+        self._signatures[slot] = signature
+        self._keys[slot] = key
+        self._namespaces[slot] = namespace
+        self._last_used[slot] = time.monotonic()
+        self._slot_by_key[(namespace, key)] = slot
+
+        for table, code in enumerate(signature.tolist()):
+            self._buckets[table].setdefault((namespace, code), set()).add(slot)
+
+    def remove(self, namespace: str, key: str) -> None:
+        slot = self._slot_by_key.get((namespace, key))
+        if slot is not None:
+            self._remove_slot(slot)
+
+    def _evict_oldest(self) -> None:
+        self._remove_slot(int(np.argmin(self._last_used)))
+        self.evictions += 1
+
+    def _remove_slot(self, slot: int) -> None:
+        namespace = self._namespaces[slot]
+        for table, code in enumerate(self._signatures[slot].tolist()):
+            bucket = self._buckets[table].get((namespace, code))
+            if bucket is not None:
+                bucket.discard(slot)
+                if not bucket:
+                    del self._buckets[table][(namespace, code)]
+
+        self._slot_by_key.pop((self._namespaces[slot], self._keys[slot]), None)
+        self._keys[slot] = None
+        self._namespaces[slot] = None
+        self._last_used[slot] = -np.inf
+        self._free.append(slot)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "capacity": self.capacity,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    # ------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------
+    def save(self, path: str) -> None:
+        used = [slot for slot in range(self.capacity) if self._keys[slot] is not None]
+        used.sort(key=lambda slot: self._last_used[slot])
+
+        np.savez_compressed(
+            path,
+            planes=self._planes,
+            vectors=self._vectors[used],
+            keys=np.array([self._keys[slot] for slot in used], dtype=str),
+            namespaces=np.array([self._namespaces[slot] for slot in used], dtype=str),
+            params=np.array([self.dim, self.tables, self.bits]),
+        )
+
+    @classmethod
+    def load(cls, path: str, capacity: int, threshold: float) -> "SemanticIndex":
+        with np.load(path, allow_pickle=False) as data:
+            dim, tables, bits = (int(value) for value in data["params"])
+            index = cls(dim=dim, capacity=capacity, threshold=threshold, tables=tables, bits=bits)
+            index._planes = data["planes"]
+
+            # Entradas salvas da mais antiga para a mais recente:
+            # se a capacidade diminuiu, as mais antigas são descartadas.
+            for vector, key, namespace in zip(data["vectors"], data["keys"], data["namespaces"]):
+                index.add(vector, str(namespace), str(key))
+
+        return index
+
+
+def build_semantic_index() -> Optional[SemanticIndex]:
+    """
+    Cria o índice a partir das variáveis de ambiente (None se desligado).
+    Se SEMANTIC_CACHE_PATH apontar para um arquivo existente, ele é recarregado.
+    """
+    if not env_bool("SEMANTIC_CACHE_ENABLED", True):
+        return None
+
+    capacity = env_int("SEMANTIC_CACHE_MAX_ENTRIES", 10_000)
+    threshold = env_float("SEMANTIC_CACHE_THRESHOLD", 0.85)
+    path = env_str("SEMANTIC_CACHE_PATH")
+
+    if path and os.path.exists(path):
+        try:
+            index = SemanticIndex.load(path, capacity=capacity, threshold=threshold)
+            logger.info(f"[SemanticCache] {len(index)} entradas carregadas de {path}")
+            return index
+        except Exception as e:
+            logger.warning(f"[SemanticCache] Não foi possível carregar {path}: {e}")
+
+    return SemanticIndex(capacity=capacity, threshold=threshold)
+
+
+def save_semantic_index(index: Optional[SemanticIndex]) -> None:
+    path = env_str("SEMANTIC_CACHE_PATH")
+    if index is None or not path:
+        return
+
+    try:
+        index.save(path)
+        logger.info(f"[SemanticCache] {len(index)} entradas salvas em {path}")
+    except Exception as e:
+        logger.warning(f"[SemanticCache] Não foi possível salvar {path}: {e}")
@@ -0,0 +1,84 @@
+# app/serve.py
+
+"""
+Ponto de entrada de produção: python -m app.serve
+
+Sobe o uvicorn com WEB_CONCURRENCY workers (processos). "auto" usa os
+núcleos disponíveis para o container — a cota do cgroup (cpu.max), não os
+núcleos da máquina, que numa task do ECS costumam ser bem mais que os vCPUs
+reservados.
+
+Com mais de um worker, cache, limites de RPM/TPM e circuit breaker precisam
+de estado compartilhado (app/shared_state.py); se SHARED_STATE_BACKEND não
+estiver definido, usa "sqlite" (arquivo local, mesma máquina). Métricas do
+/metrics e o índice do cache semântico continuam por worker.
+
+  WEB_CONCURRENCY=auto python -m app.serve
+  HOST (0.0.0.0), PORT (8000)
+"""
+
+import logging
+import math
+import os
+from typing import Optional
+
+from app.config import env_int, env_str
+
+logger = logging.getLogger("iscoolgpt.serve")
+
+
+def cgroup_cpu_limit(path: str = "/sys/fs/cgroup/cpu.max") -> Optional[float]:
+    """Cota de CPU do cgroup v2 ("200000 100000" = 2 CPUs); None se não houver."""
+    try:
+        with open(path) as f:
+            quota, period = f.read().split()[:2]
+    except (OSError, ValueError):
+        return None
+    if quota == "max":
+        return None
+    return int(quota) / int(period)
+
+
+def available_cpus() -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+
+def worker_count() -> int:
+    value = (env_str("WEB_CONCURRENCY", "1") or "1").strip().lower()
+    if value == "auto":
+        return available_cpus()
+    try:
+        return max(1, int(value))
+    except ValueError:
+        logger.warning(f"[Serve] WEB_CONCURRENCY inválido: '{value}'; usando 1 worker.")
+        return 1
+
+
+def main() -> None:
+    import uvicorn
+
+    logging.basicConfig(level=logging.INFO)
+    workers = worker_count()
+    if workers > 1 and not env_str("SHARED_STATE_BACKEND"):
+        # Herdado pelos workers: todos abrem o mesmo arquivo
+        os.environ["SHARED_STATE_BACKEND"] = "sqlite"
+        logger.info("[Serve] Vários workers sem SHARED_STATE_BACKEND: usando sqlite.")
+
+    logger.info(f"[Serve] Subindo {workers} worker(s)")
+    uvicorn.run(
+        "app.main:app",
+        host=env_str("HOST", "0.0.0.0"),
+        port=env_int("PORT", 8000),
+        workers=workers,
+    )
+
+
+if __name__ == "__main__":
+    main()
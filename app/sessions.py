@@ -0,0 +1,303 @@
+# app/sessions.py
+
+"""
+Sessões multi-turno: o cliente manda `session_id` no /ask (ou /ask/stream)
+e o histórico fica no servidor, em vez de o front colar a conversa inteira
+no prompt a cada turno.
+
+O tamanho do contexto por chamada é constante, por mais longa que seja a
+conversa:
+  - cada turno é guardado já compactado: respostas acima de
+    SESSION_TURN_MAX_TOKENS (300) são cortadas;
+  - quando os turnos guardados passam de SESSION_CONTEXT_TOKENS (1024)
+    menos o espaço do resumo, os mais antigos são dobrados num resumo
+    contínuo (rolling summary) de até SESSION_SUMMARY_TOKENS (256). O
+    resumo é feito em segundo plano, depois da resposta, pelo provider
+    SESSION_SUMMARY_PROVIDER (padrão huggingface; "local" = resumo extrativo,
+    sem chamada de rede — também usado se o provider falhar);
+  - ao montar o contexto, entram o resumo e os turnos mais recentes que
+    cabem no orçamento (o corte vale mesmo com um resumo ainda em andamento).
+
+Sessões inativas por SESSION_TTL_SECONDS (1h) expiram; acima de
+SESSION_MAX_SESSIONS (10 mil), a usada há mais tempo sai (LRU).
+Tokens são estimados como em app/rate_limit.py (~4 caracteres por token).
+
+Com SHARED_STATE_BACKEND (app/shared_state.py), cada sessão também é gravada
+no estado compartilhado depois de cada turno (e de cada resumo), e é relida
+de lá a cada requisição: o turno seguinte pode cair em outro worker. Leituras
+e gravações rodam na thread do estado compartilhado, fora do event loop.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.config import env_float, env_int, env_str
+from app.conversation import Conversation, conversation_scope
+from app.llm_base import is_error_answer
+from app.rate_limit import estimate_tokens
+from app.shared_state import get_shared_state
+
+logger = logging.getLogger("iscoolgpt.sessions")
+
+SUMMARY_PROMPT = """Resuma a conversa abaixo entre um aluno e um assistente de Cloud Computing
+para servir de contexto às próximas perguntas. Mantenha os serviços, nomes,
+números e decisões citados; descarte cumprimentos e explicações longas.
+Responda apenas com o resumo, em português, com no máximo {words} palavras.
+
+{conversation}"""
+
+
+def _clip(text: str, max_tokens: int) -> str:
+    """Corta o texto em ~max_tokens tokens, sem quebrar palavra."""
+    limit = max_tokens * 4
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + " [...]"
+
+
+def _turns_tokens(turns: List[Tuple[str, str]]) -> int:
+    return sum(estimate_tokens(text) for _, text in turns)
+
+
+class Session:
+    def __init__(self, session_id: str) -> None:
+        self.id = session_id
+        self.summary = ""
+        self.turns: List[Tuple[str, str]] = []
+        self.total_turns = 0
+        self.summarized_turns = 0
+        self.created_at = time.time()
+        self.touched = time.monotonic()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.id,
+            "summary": self.summary,
+            "turns": [{"role": role, "content": text} for role, text in self.turns],
+            "total_turns": self.total_turns,
+            "summarized_turns": self.summarized_turns,
+            "context_tokens": estimate_tokens(self.summary) + _turns_tokens(self.turns),
+            "created_at": self.created_at,
+        }
+
+
+class SessionStore:
+    def __init__(self, max_sessions: int, ttl: float) -> None:
+        self.max_sessions = max(1, max_sessions)
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        # Sessões com um resumo em andamento (um por vez por sessão)
+        self._summarizing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats = {"created": 0, "expired": 0, "evicted": 0, "summaries": 0, "summary_fallbacks": 0}
+
+    # ---------------- sessões ----------------
+    async def get(self, session_id: str) -> Optional[Session]:
+        session = await self._load_shared(session_id)
+        if session is None:
+            return None
+        if time.monotonic() - session.touched > self.ttl:
+            del self._sessions[session_id]
+            self._stats["expired"] += 1
+            return None
+        return session
+
+    async def get_or_create(self, session_id: str) -> Session:
+        session = await self.get(session_id)
+        if session is None:
+            self._evict(room_for=1)
+            session = Session(session_id)
+            self._sessions[session_id] = session
+            self._stats["created"] += 1
+        session.touched = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    async def delete(self, session_id: str) -> bool:
+        state = get_shared_state()
+        if state is None:
+            return self._sessions.pop(session_id, None) is not None
+        found = await self.get(session_id) is not None
+        self._sessions.pop(session_id, None)
+        await state.run(lambda: state.delete(f"session:{session_id}"))
+        return found
+
+    # ---------------- estado compartilhado ----------------
+    async def _load_shared(self, session_id: str) -> Optional[Session]:
+        """A cópia local, atualizada com a do estado compartilhado (se houver)."""
+        state = get_shared_state()
+        if state is None:
+            return self._sessions.get(session_id)
+
+        raw = await state.run(lambda: state.get(f"session:{session_id}"))
+        # Depois da espera: a cópia local pode ter mudado nesse meio-tempo
+        session = self._sessions.get(session_id)
+        if raw is None:
+            # Sem a cópia compartilhada (expirou ou o backend falhou): fica a local
+            return session
+        data = json.loads(raw)
+        if session is None:
+            self._evict(room_for=1)
+            session = Session(session_id)
+            self._sessions[session_id] = session
+        session.summary = data["summary"]
+        session.turns = [(turn["role"], turn["content"]) for turn in data["turns"]]
+        session.total_turns = data["total_turns"]
+        session.summarized_turns = data["summarized_turns"]
+        session.created_at = data["created_at"]
+        # O TTL compartilhado já conta a inatividade em todos os workers
+        session.touched = time.monotonic()
+        return session
+
+    def _save_shared(self, session: Session) -> None:
+        state = get_shared_state()
+        if state is not None:
+            # Serializa agora (o próximo turno pode mudar a sessão); grava na thread
+            key, raw = f"session:{session.id}", json.dumps(session.to_dict(), ensure_ascii=False)
+            state.run_soon(lambda: state.set(key, raw, self.ttl))
+
+    def _evict(self, room_for: int = 0) -> None:
+        # Primeiro as expiradas (as mais antigas ficam no começo)...
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if time.monotonic() - oldest.touched <= self.ttl:
+                break
+            self._sessions.popitem(last=False)
+            self._stats["expired"] += 1
+        # ...depois, acima do limite, a usada há mais tempo
+        while self._sessions and len(self._sessions) + room_for > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self._stats["evicted"] += 1
+
+    def clear(self) -> None:
+        self._sessions.clear()
+
+    # ---------------- contexto ----------------
+    def context(self, session: Session) -> Conversation:
+        """Resumo + turnos mais recentes que cabem em SESSION_CONTEXT_TOKENS."""
+        budget = env_int("SESSION_CONTEXT_TOKENS", 1024) - estimate_tokens(session.summary)
+        selected: List[Tuple[str, str]] = []
+        for role, text in reversed(session.turns):
+            budget -= estimate_tokens(text)
+            if budget < 0:
+                break
+            selected.append((role, text))
+        selected.reverse()
+        # Começa sempre numa pergunta do aluno (turnos alternados)
+        while selected and selected[0][0] != "user":
+            selected.pop(0)
+        return Conversation(session.summary, tuple(selected))
+
+    def record_turn(self, session: Session, question: str, answer: str) -> None:
+        """Guarda o turno (compactado) e, se passou do orçamento, agenda o resumo."""
+        max_tokens = env_int("SESSION_TURN_MAX_TOKENS", 300)
+        session.turns.append(("user", _clip(question, max_tokens)))
+        session.turns.append(("assistant", _clip(answer, max_tokens)))
+        session.total_turns += 1
+        session.touched = time.monotonic()
+        self._save_shared(session)
+
+        if _turns_tokens(session.turns) > self._turns_budget() and session.id not in self._summarizing:
+            self._summarizing.add(session.id)
+            # Sem o contexto da requisição: o resumo é uma chamada de um turno só
+            with conversation_scope(None):
+                task = asyncio.create_task(self._compact(session))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _turns_budget(self) -> int:
+        return env_int("SESSION_CONTEXT_TOKENS", 1024) - env_int("SESSION_SUMMARY_TOKENS", 256)
+
+    async def _compact(self, session: Session) -> None:
+        """Dobra os turnos mais antigos no resumo até os demais caberem no orçamento."""
+        try:
+            folded: List[Tuple[str, str]] = []
+            remaining = list(session.turns)
+            # Dobra até sobrar metade do orçamento (folga para os próximos
+            # turnos), mas a última troca fica sempre inteira
+            while len(remaining) > 2 and _turns_tokens(remaining) > self._turns_budget() // 2:
+                folded.extend(remaining[:2])
+                remaining = remaining[2:]
+            if not folded:
+                return
+
+            summary = await self._summarize(session.summary, folded)
+            # Turnos podem ter chegado durante o resumo: só tira os dobrados
+            session.turns = session.turns[len(folded):]
+            session.summary = summary
+            session.summarized_turns += len(folded) // 2
+            self._stats["summaries"] += 1
+            self._save_shared(session)
+        except Exception as e:
+            logger.warning(f"[Sessions] Falha ao resumir a sessão {session.id}: {e}")
+        finally:
+            self._summarizing.discard(session.id)
+
+    async def _summarize(self, summary: str, turns: List[Tuple[str, str]]) -> str:
+        max_tokens = env_int("SESSION_SUMMARY_TOKENS", 256)
+        provider = env_str("SESSION_SUMMARY_PROVIDER", "huggingface")
+        if provider != "local":
+            # Import tardio: o aggregator puxa o registry dos providers
+            from app.aggregator import registry
+
+            lines = [f"Resumo anterior: {summary}"] if summary else []
+            lines.extend(f"{'Aluno' if role == 'user' else 'Assistente'}: {text}" for role, text in turns)
+            prompt = SUMMARY_PROMPT.format(words=int(max_tokens * 0.6), conversation="\n".join(lines))
+            try:
+                text = await asyncio.wait_for(
+                    registry.get(provider).ask(prompt),
+                    timeout=env_float("SESSION_SUMMARY_TIMEOUT", 10.0),
+                )
+                if text and not is_error_answer(text):
+                    return _clip(text.strip(), max_tokens)
+                logger.warning(f"[Sessions] Resumo com erro de '{provider}': {text[:120]}")
+            except Exception as e:
+                logger.warning(f"[Sessions] Resumo por '{provider}' falhou: {type(e).__name__}: {e}")
+
+        self._stats["summary_fallbacks"] += 1
+        return extractive_summary(summary, turns, max_tokens)
+
+    async def drain(self) -> None:
+        """Espera os resumos em andamento (testes e shutdown)."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "active": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "summarizing": len(self._summarizing),
+        }
+
+
+def extractive_summary(summary: str, turns: List[Tuple[str, str]], max_tokens: int) -> str:
+    """
+    Resumo local (sem LLM): as perguntas do aluno e a primeira frase de cada
+    resposta. Se passar do limite, as linhas mais antigas saem primeiro.
+    """
+    lines = summary.splitlines() if summary else []
+    for role, text in turns:
+        if role == "user":
+            lines.append(f"- Aluno perguntou: {_clip(text, 50)}")
+        else:
+            first_sentence = text.strip().split(". ", 1)[0]
+            lines.append(f"  Resposta: {_clip(first_sentence, 40)}")
+
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return _clip("\n".join(lines), max_tokens)
+
+
+def build_session_store() -> SessionStore:
+    return SessionStore(
+        max_sessions=env_int("SESSION_MAX_SESSIONS", 10_000),
+        ttl=env_float("SESSION_TTL_SECONDS", 3600.0),
+    )
+
+
+session_store = build_session_store()
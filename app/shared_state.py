@@ -0,0 +1,447 @@
+# app/shared_state.py
+
+"""
+Estado compartilhado entre workers (uvicorn --workers N, ver app/serve.py).
+
+Com vários processos, cada um teria o próprio cache, os próprios baldes de
+RPM/TPM (o limite real viraria N vezes o configurado) e o próprio circuit
+breaker. SHARED_STATE_BACKEND escolhe onde esse estado fica:
+
+  - "" (padrão): nada compartilhado, tudo em memória do processo;
+  - "sqlite": um arquivo SQLite local (SHARED_STATE_PATH), para os workers
+    de uma mesma máquina/task. Baldes exatos, numa transação por chamada;
+  - "redis": qualquer servidor que fale o protocolo do Redis (RESP) em
+    SHARED_STATE_URL (redis://[:senha@]host:porta/db), para várias tasks.
+    Os baldes usam janela deslizante com INCRBY (sem Lua), então um
+    servidor simples como scripts/resp_server.py também serve.
+
+O que passa a ser compartilhado: o cache de respostas (uma camada depois da
+memória), os baldes de RPM/TPM por provider, o circuito aberto do breaker,
+as sessões de conversa e o estado dos jobs. MAX_CONCURRENCY continua
+valendo por worker.
+
+Se o backend falhar, a operação segue como se ele não existisse (cache
+miss, chamada liberada) e o erro é contado em /health?details=true: o
+estado compartilhado nunca derruba uma requisição.
+
+Os backends são síncronos (sqlite3, socket): no event loop, as operações
+rodam numa thread dedicada (SharedState.run, ou run_soon para gravações que
+ninguém espera), nunca no loop — um BEGIN IMMEDIATE esperando o lock do
+arquivo, ou um Redis lento, travaria todas as requisições do worker. Uma
+thread só: as operações saem na ordem em que foram pedidas (a gravação do
+estado de um job não passa na frente da anterior) e os dois backends já se
+serializam num lock de qualquer forma.
+"""
+
+import asyncio
+import logging
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+from urllib.parse import urlparse
+
+from app.config import env_float, env_str
+from app.executors import ProviderExecutor, get_executor
+
+logger = logging.getLogger("iscoolgpt.shared_state")
+
+T = TypeVar("T")
+
+DEFAULT_SQLITE_PATH = "/tmp/iscoolgpt-state.db"
+DEFAULT_PREFIX = "iscoolgpt:"
+WINDOW_SECONDS = 60.0
+
+
+class SharedStateError(RuntimeError):
+    pass
+
+
+# ------------------------------------------------------
+# SQLite (workers da mesma máquina)
+# ------------------------------------------------------
+class SQLiteStateBackend:
+    name = "sqlite"
+
+    # A cada N gravações, apaga as chaves expiradas
+    _PURGE_EVERY = 500
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        # isolation_level=None: as transações são abertas à mão (BEGIN IMMEDIATE)
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM kv WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+            self._writes += 1
+            if self._writes % self._PURGE_EVERY == 0:
+                self._conn.execute("DELETE FROM kv WHERE expires_at < ?", (time.time(),))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def take(self, key: str, amount: float, per_minute: float) -> float:
+        """Balde exato: consome `amount` e devolve 0, ou devolve a espera sem consumir."""
+        rate = per_minute / WINDOW_SECONDS
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._conn.execute(
+                    "SELECT tokens, updated FROM buckets WHERE key = ?", (key,)
+                ).fetchone()
+                tokens = per_minute if row is None else min(per_minute, row[0] + (now - row[1]) * rate)
+                wait = 0.0 if tokens >= amount else (amount - tokens) / rate
+                if wait == 0.0:
+                    tokens -= amount
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                    (key, tokens, now),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def refund(self, key: str, amount: float, per_minute: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE buckets SET tokens = MIN(?, tokens + ?) WHERE key = ?",
+                (per_minute, amount, key),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM kv")
+            self._conn.execute("DELETE FROM buckets")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# ------------------------------------------------------
+# Protocolo Redis (RESP)
+# ------------------------------------------------------
+def encode_command(*args: Any) -> bytes:
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+class RESPStateBackend:
+    """
+    Cliente RESP mínimo e síncrono (uma conexão por processo, protegida por
+    lock; os comandos de uma operação vão num pipeline só). Os timeouts são
+    curtos (SHARED_STATE_TIMEOUT, 0.25s): numa rede lenta o estado
+    compartilhado falha e a requisição segue sem ele.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, timeout: float = 0.25) -> None:
+        parsed = urlparse(url)
+        if parsed.scheme not in ("redis", "resp"):
+            raise SharedStateError(f"SHARED_STATE_URL inválida: {url!r} (use redis://host:porta/db)")
+        self.url = url
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._buffer = b""
+
+    # ---------------- conexão ----------------
+    def _connect(self) -> None:
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._buffer = b""
+        if self.password:
+            self._roundtrip([("AUTH", self.password)])
+        if self.db:
+            self._roundtrip([("SELECT", self.db)])
+
+    def _close_socket(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+
+    def execute(self, *commands: Sequence[Any]) -> List[Any]:
+        """Envia os comandos num pipeline e devolve as respostas (reconecta uma vez)."""
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._roundtrip(commands)
+                except (OSError, SharedStateError):
+                    self._close_socket()
+                    if attempt == 2:
+                        raise
+        return []  # inalcançável
+
+    def _roundtrip(self, commands: Sequence[Sequence[Any]]) -> List[Any]:
+        self._sock.sendall(b"".join(encode_command(*command) for command in commands))
+        replies = [self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, SharedStateError):
+                raise reply
+        return replies
+
+    def _read_line(self) -> bytes:
+        while b"\r\n" not in self._buffer:
+            chunk = self._sock.recv(65536)
+            if not chunk:
+                raise SharedStateError("conexão fechada pelo servidor")
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\r\n", 1)
+        return line
+
+    def _read_exact(self, size: int) -> bytes:
+        while len(self._buffer) < size + 2:
+            chunk = self._sock.recv(65536)
+            if not chunk:
+                raise SharedStateError("conexão fechada pelo servidor")
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size + 2:]
+        return data
+
+    def _read_reply(self) -> Any:
+        line = self._read_line()
+        kind, rest = line[:1], line[1:]
+        if kind == b"+":
+            return rest.decode("utf-8")
+        if kind == b"-":
+            return SharedStateError(rest.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            return None if size < 0 else self._read_exact(size).decode("utf-8")
+        if kind == b"*":
+            size = int(rest)
+            return None if size < 0 else [self._read_reply() for _ in range(size)]
+        raise SharedStateError(f"resposta RESP inesperada: {line[:50]!r}")
+
+    # ---------------- operações ----------------
+    def get(self, key: str) -> Optional[str]:
+        return self.execute(("GET", key))[0]
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self.execute(("SET", key, value, "PX", max(1, int(ttl * 1000))))
+
+    def delete(self, key: str) -> None:
+        self.execute(("DEL", key))
+
+    def take(self, key: str, amount: float, per_minute: float) -> float:
+        """
+        Janela deslizante: contagem da janela atual + a da anterior, pesada
+        pelo quanto dela ainda cai nos últimos 60s. Consome com INCRBY e
+        devolve (DECRBY) se passou do limite.
+        """
+        now = time.time()
+        window = int(now // WINDOW_SECONDS)
+        elapsed = (now % WINDOW_SECONDS) / WINDOW_SECONDS
+        amount = int(max(1, round(amount)))
+        current, previous = f"{key}:{window}", f"{key}:{window - 1}"
+        ttl_ms = int(WINDOW_SECONDS * 2 * 1000)
+
+        total, _, before = self.execute(
+            ("INCRBY", current, amount), ("PEXPIRE", current, ttl_ms), ("GET", previous)
+        )
+        carried = int(before or 0) * (1.0 - elapsed)
+        if carried + total <= per_minute:
+            return 0.0
+
+        self.execute(("DECRBY", current, amount))
+        spare = per_minute - total  # quanto da janela anterior ainda pode pesar
+        if before and spare >= 0:
+            # Quando a janela anterior pesar pouco o bastante, a chamada cabe
+            needed = 1.0 - spare / int(before)
+            return max(0.01, (needed - elapsed) * WINDOW_SECONDS)
+        return max(0.01, (1.0 - elapsed) * WINDOW_SECONDS)
+
+    def refund(self, key: str, amount: float, per_minute: float) -> None:
+        window = int(time.time() // WINDOW_SECONDS)
+        self.execute(("DECRBY", f"{key}:{window}", int(max(1, round(amount)))))
+
+    def ping(self) -> bool:
+        return self.execute(("PING",))[0] == "PONG"
+
+    def clear(self) -> None:
+        self.execute(("FLUSHDB",))
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_socket()
+
+
+# ------------------------------------------------------
+# Fachada: prefixo das chaves e falhas sem derrubar a requisição
+# ------------------------------------------------------
+class SharedState:
+    def __init__(self, backend: Any, prefix: str = DEFAULT_PREFIX) -> None:
+        self.backend = backend
+        self.prefix = prefix
+        self.errors = 0
+        self._last_error_log = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.backend.name
+
+    def _failed(self, operation: str, error: Exception) -> None:
+        self.errors += 1
+        # No máximo um aviso a cada 10s: com o backend fora, toda chamada falharia
+        if time.monotonic() - self._last_error_log > 10:
+            self._last_error_log = time.monotonic()
+            logger.warning(f"[SharedState] {self.name}.{operation} falhou: {type(error).__name__}: {error}")
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            return self.backend.get(self.prefix + key)
+        except Exception as e:
+            self._failed("get", e)
+            return None
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        try:
+            self.backend.set(self.prefix + key, value, ttl)
+        except Exception as e:
+            self._failed("set", e)
+
+    def delete(self, key: str) -> None:
+        try:
+            self.backend.delete(self.prefix + key)
+        except Exception as e:
+            self._failed("delete", e)
+
+    def take(self, key: str, amount: float, per_minute: float) -> float:
+        try:
+            return self.backend.take(self.prefix + key, min(amount, per_minute), per_minute)
+        except Exception as e:
+            self._failed("take", e)
+            return 0.0
+
+    def refund(self, key: str, amount: float, per_minute: float) -> None:
+        try:
+            self.backend.refund(self.prefix + key, min(amount, per_minute), per_minute)
+        except Exception as e:
+            self._failed("refund", e)
+
+    # ---------------- fora do event loop ----------------
+    def _executor(self) -> ProviderExecutor:
+        return get_executor("shared_state", size=1)
+
+    async def run(self, fn: Callable[[], T]) -> T:
+        """Executa `fn` (que usa as operações acima) na thread do estado compartilhado."""
+        return await self._executor().submit(fn)
+
+    def run_soon(self, fn: Callable[[], Any]) -> None:
+        """Como run(), sem esperar o resultado; fora de um event loop, roda na hora."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            fn()
+            return
+        self._executor().submit(fn).add_done_callback(self._background_done)
+
+    def _background_done(self, future: "asyncio.Future[Any]") -> None:
+        if not future.cancelled() and future.exception() is not None:
+            self._failed("run_soon", future.exception())
+
+    def stats(self) -> Dict[str, Any]:
+        location = getattr(self.backend, "path", None) or getattr(self.backend, "url", None)
+        return {"backend": self.name, "location": location, "errors": self.errors}
+
+
+_shared_state: Optional[SharedState] = None
+_configured = False
+
+
+def get_shared_state() -> Optional[SharedState]:
+    """O backend de SHARED_STATE_BACKEND (None se não configurado), criado no primeiro uso."""
+    global _shared_state, _configured
+    if _configured:
+        return _shared_state
+    _configured = True
+
+    kind = (env_str("SHARED_STATE_BACKEND", "") or "").lower()
+    prefix = env_str("SHARED_STATE_PREFIX", DEFAULT_PREFIX)
+    try:
+        if kind == "sqlite":
+            backend = SQLiteStateBackend(env_str("SHARED_STATE_PATH", DEFAULT_SQLITE_PATH))
+        elif kind == "redis":
+            backend = RESPStateBackend(
+                env_str("SHARED_STATE_URL", "redis://localhost:6379/0"),
+                timeout=env_float("SHARED_STATE_TIMEOUT", 0.25),
+            )
+        elif kind:
+            logger.warning(f"[SharedState] SHARED_STATE_BACKEND desconhecido: '{kind}'; usando só memória.")
+            return None
+        else:
+            return None
+    except Exception as e:
+        logger.warning(f"[SharedState] Não foi possível abrir o backend '{kind}': {e}; usando só memória.")
+        return None
+
+    _shared_state = SharedState(backend, prefix)
+    logger.info(f"[SharedState] Estado compartilhado em {_shared_state.stats()['location']} ({kind})")
+    return _shared_state
+
+
+def reset_shared_state() -> None:
+    """Fecha o backend atual; o próximo get_shared_state() relê o ambiente."""
+    global _shared_state, _configured
+    if _shared_state is not None:
+        try:
+            _shared_state.backend.close()
+        except Exception:
+            pass
+    _shared_state = None
+    _configured = False
+
+
+async def flush_shared_state() -> None:
+    """Espera as gravações pendentes (run_soon): no shutdown, antes de fechar os pools."""
+    if _shared_state is not None:
+        # Uma thread só: quando este no-op roda, as anteriores já rodaram
+        await _shared_state.run(lambda: None)
+
+
+def shared_state_stats() -> Optional[Dict[str, Any]]:
+    state = get_shared_state()
+    return state.stats() if state is not None else None
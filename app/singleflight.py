@@ -0,0 +1,80 @@
+# app/singleflight.py
+
+"""
+Single-flight: chamadas concorrentes com a mesma chave compartilham uma
+única execução.
+
+Quando um professor compartilha uma pergunta em aula, dezenas de /ask
+idênticos chegam juntos. O primeiro (líder) dispara a chamada; os demais
+aguardam o mesmo resultado. A chamada compartilhada roda numa task própria
+protegida por asyncio.shield: se um cliente desistir (cancelamento), só a
+espera dele é cancelada — a chamada continua para os outros. Quando o
+último desiste (quorum atingido, deadline, cliente desconectado), a chamada
+é cancelada também, para não seguir gastando cota e vaga do limitador.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+logger = logging.getLogger("iscoolgpt.singleflight")
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._inflight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+        # Quantas chamadas aguardam cada execução
+        self._waiters: Dict["asyncio.Task[Any]", int] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def running(self, key: Hashable) -> bool:
+        """Já há uma execução com esta chave (uma nova chamada só aguardaria)."""
+        return key in self._inflight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    # Ninguém mais espera: quem chegar depois começa outra execução
+                    logger.debug(f"[SingleFlight:{self.name}] Todos desistiram; chamada cancelada.")
+                    if self._inflight.get(key) is task:
+                        del self._inflight[key]
+                    task.cancel()
+
+    def _forget(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+        # Evita "Task exception was never retrieved" quando todos os
+        # clientes desistiram antes do fim da chamada.
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"[SingleFlight:{self.name}] Chamada compartilhada falhou: {task.exception()}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": self.in_flight(),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
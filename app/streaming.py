@@ -0,0 +1,65 @@
+# app/streaming.py
+
+"""
+Codificação Server-Sent Events para o endpoint POST /ask/stream.
+"""
+
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Dict
+
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger("iscoolgpt.streaming")
+
+# Evita que proxies (nginx/ALB) acumulem a resposta antes de repassar
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que chama `on_close` quando a resposta acaba — também
+    se o cliente sair antes do primeiro evento, quando o gerador do corpo
+    nem chega a começar (e o `finally` dele nunca roda).
+    """
+
+    def __init__(self, content: Any, on_close: Callable[[], None], **kwargs: Any) -> None:
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """
+    Converte um evento do aggregator em texto SSE:
+
+        event: token
+        data: {"provider": "gemini", "data": "..."}
+    """
+    name = event.get("event", "message")
+    payload = {key: value for key, value in event.items() if key != "event"}
+    data = json.dumps(payload, ensure_ascii=False)
+    return f"event: {name}\ndata: {data}\n\n"
+
+
+async def encode_sse(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """
+    Itera os eventos e os codifica em SSE. Como os headers já foram enviados
+    quando um erro acontece, erros viram um evento "error" no próprio stream.
+    """
+    try:
+        async for event in events:
+            yield format_sse(event)
+    except Exception as e:
+        logger.exception(f"[Stream] Erro durante o streaming: {e}")
+        yield format_sse(
+            {"event": "error", "provider": None, "data": f"{type(e).__name__}: {e}"}
+        )
@@ -0,0 +1,217 @@
+# app/tracing.py
+
+"""
+Tempo de cada etapa de uma requisição (cache, Gemini, HF, reasoner,
+serialização...).
+
+Cada /ask abre um trace (start_trace) e as etapas abrem spans (span) —
+o span "pai" é propagado por contextvar, então chamadas em tasks paralelas
+(Gemini e HF) ficam penduradas no mesmo trace. Ao final:
+  - o header Server-Timing resume a duração de cada etapa;
+  - com X-Debug-Timings: 1, o campo `timings` da resposta traz o mesmo;
+  - com TRACING_EXPORTER, os spans são exportados no formato OTLP/JSON do
+    OpenTelemetry: "file" grava uma linha por trace em TRACING_FILE_PATH;
+    "otlp" envia para um collector em TRACING_OTLP_ENDPOINT
+    (padrão http://localhost:4318/v1/traces).
+A exportação roda em segundo plano e nunca atrasa a resposta.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import secrets
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from app.config import env_str
+from app.http_client import get_http_client
+
+logger = logging.getLogger("iscoolgpt.tracing")
+
+DEBUG_TIMINGS_HEADER = "X-Debug-Timings"
+SERVICE_NAME = "iscoolgpt-backend"
+DEFAULT_OTLP_ENDPOINT = "http://localhost:4318/v1/traces"
+DEFAULT_TRACE_FILE = "traces.jsonl"
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "_started", "attributes")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Dict[str, Any]) -> None:
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = self.start_ns + (time.perf_counter_ns() - self._started)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else (
+            self.start_ns + (time.perf_counter_ns() - self._started)
+        )
+        return (end - self.start_ns) / 1e6
+
+
+class Trace:
+    def __init__(self, name: str) -> None:
+        self.trace_id = secrets.token_hex(16)
+        self.root = Span(name, None, {})
+        self.spans: List[Span] = [self.root]
+
+    def timings(self) -> Dict[str, float]:
+        """Duração (ms) por etapa; etapas repetidas são somadas. `total` = até agora."""
+        result: Dict[str, float] = {}
+        for item in self.spans[1:]:
+            result[item.name] = round(result.get(item.name, 0.0) + item.duration_ms, 1)
+        result["total"] = round(self.root.duration_ms, 1)
+        return result
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{name};dur={duration}" for name, duration in self.timings().items())
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("iscoolgpt_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("iscoolgpt_span", default=None)
+
+
+def get_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(name: str) -> Iterator[Trace]:
+    trace = Trace(name)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(trace.root)
+    try:
+        yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        trace.root.end()
+        export_trace(trace)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Mede o bloco como uma etapa do trace atual (sem trace ativo, não faz nada)."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = Span(name, parent.span_id if parent is not None else None, attributes)
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+def wants_timings(headers) -> bool:
+    return headers.get(DEBUG_TIMINGS_HEADER, "").strip().lower() in ("1", "true", "yes")
+
+
+# ------------------------------------------------------
+# Exportação (formato OTLP/JSON)
+# ------------------------------------------------------
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def to_otlp(trace: Trace) -> Dict[str, Any]:
+    spans = []
+    for item in trace.spans:
+        item.end()
+        data: Dict[str, Any] = {
+            "traceId": trace.trace_id,
+            "spanId": item.span_id,
+            "name": item.name,
+            "kind": 2 if item.parent_id is None else 1,  # SERVER / INTERNAL
+            "startTimeUnixNano": str(item.start_ns),
+            "endTimeUnixNano": str(item.end_ns),
+            "attributes": [_attribute(key, value) for key, value in item.attributes.items()],
+        }
+        if item.parent_id is not None:
+            data["parentSpanId"] = item.parent_id
+        if "error" in item.attributes:
+            data["status"] = {"code": 2, "message": str(item.attributes["error"])}
+        spans.append(data)
+
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{"scope": {"name": "iscoolgpt"}, "spans": spans}],
+        }]
+    }
+
+
+_pending_exports: Set["asyncio.Future[Any]"] = set()
+
+
+def export_trace(trace: Trace) -> None:
+    exporter = env_str("TRACING_EXPORTER", "").lower()
+    if exporter not in ("file", "otlp"):
+        return
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    payload = to_otlp(trace)
+    if exporter == "file":
+        path = env_str("TRACING_FILE_PATH", DEFAULT_TRACE_FILE)
+        if loop is None:
+            _write_line(path, payload)
+            return
+        future = loop.run_in_executor(None, _write_line, path, payload)
+    else:
+        if loop is None:
+            return
+        future = asyncio.ensure_future(_post_otlp(payload))
+
+    _pending_exports.add(future)
+    future.add_done_callback(_pending_exports.discard)
+
+
+def _write_line(path: str, payload: Dict[str, Any]) -> None:
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+    except OSError as e:
+        logger.warning(f"[Tracing] Não foi possível gravar o trace em {path}: {e}")
+
+
+async def _post_otlp(payload: Dict[str, Any]) -> None:
+    endpoint = env_str("TRACING_OTLP_ENDPOINT", DEFAULT_OTLP_ENDPOINT)
+    try:
+        response = await get_http_client().post(endpoint, json=payload, timeout=5.0)
+        if response.status_code >= 300:
+            logger.warning(f"[Tracing] Collector respondeu HTTP {response.status_code}")
+    except Exception as e:
+        logger.warning(f"[Tracing] Falha ao enviar trace para {endpoint}: {e}")
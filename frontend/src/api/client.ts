@@ -10,6 +10,8 @@ export type ProviderAnswer = {
 export type AggregatedResponse = {
   final_answer: string;
   answers: ProviderAnswer[];
+  // providers que não responderam dentro do deadline da requisição
+  dropped_providers?: string[];
 };
 
 const API_URL = import.meta.env.VITE_API_URL || "http://localhost:8000";
@@ -0,0 +1,356 @@
+# scripts/bench_overhead.py
+
+"""
+Microbenchmarks do custo do NOSSO código por requisição (sem a latência dos
+providers, que ficam mockados):
+
+  - montagem dos prompts (_build_prompt, _build_synthesis_prompt, _build_body);
+  - construção dos clientes dos providers;
+  - aggregate_answers: fan-out com asyncio.gather, breaker, limitador,
+    métricas e checagem de concordância (single, fusion com e sem reasoner);
+  - validação e serialização do AggregatedResponse com respostas grandes;
+  - POST /ask completo em processo (ASGI, sem rede).
+
+Cada benchmark roda várias rodadas e reporta a melhor (µs por operação; o
+mínimo é o número menos sujeito a ruído da máquina). As rodadas são
+intercaladas entre os benchmarks, para que um trecho ruidoso da máquina
+atinja uma rodada de cada um, e não todas as rodadas de um só.
+Os tempos são normalizados por um loop de calibração em Python puro, para
+que a baseline gravada numa máquina sirva de referência em outra.
+
+Só conta como regressão o que passar da tolerância percentual E de um piso
+absoluto (--min-delta-us), e continuar acima dos dois numa segunda medição
+só dos suspeitos — sem isso, casos de menos de 1 µs oscilam dezenas de
+por cento entre execuções.
+
+Quem muda de propósito um caminho medido aqui grava a baseline no mesmo
+commit (--save-baseline).
+
+  python scripts/bench_overhead.py                    # compara com a baseline
+  python scripts/bench_overhead.py --save-baseline    # grava a baseline atual
+  python scripts/bench_overhead.py --threshold 0.15   # tolerância (padrão 25%)
+
+Sai com código 1 se algum benchmark ficar mais lento que a baseline além
+da tolerância.
+"""
+
+import sys
+import os
+
+# Adiciona a pasta raiz do projeto ao PYTHONPATH
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+os.environ.setdefault("HUGGINGFACE_API_KEY", "bench")
+os.environ.setdefault("DEEPSEEK_API_KEY", "bench")
+os.environ.setdefault("GEMINI_BACKEND", "rest")
+os.environ.setdefault("TRACING_EXPORTER", "")
+
+import argparse
+import asyncio
+import gc
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.aggregator import aggregate_answers, registry
+from app.breaker import reset_breakers
+from app.llm_base import LLMClient
+from app.llms.deepseek_chat_llm import DeepSeekChatLLM
+from app.llms.gemini_llm import GeminiLLM
+from app.llms.gemini_reasoner_llm import GeminiReasonerLLM
+from app.llms.huggingface_llm import HuggingFaceLLM
+from app.main import app
+from app.schemas import AggregatedResponse
+
+DEFAULT_BASELINE = os.path.join(ROOT, "scripts", "bench_overhead_baseline.json")
+
+QUESTION = "Qual a diferença entre Security Groups e NACLs numa VPC da AWS?"
+
+PARAGRAPH = (
+    "Security Groups são stateful e ficam associados às interfaces de rede; "
+    "NACLs são stateless, avaliadas por número de regra e aplicadas à subnet. "
+)
+# ~8 KB por resposta: o tamanho de uma resposta longa do Gemini
+LARGE_ANSWER = PARAGRAPH * 55
+
+
+class FakeLLM(LLMClient):
+    def __init__(self, answer: str) -> None:
+        self.answer = answer
+
+    async def ask(self, prompt: str) -> str:
+        return self.answer
+
+
+class FakeReasoner(FakeLLM):
+    async def synthesize(self, question: str, *answers: str) -> str:
+        return self.answer
+
+
+# ------------------------------------------------------
+# Medição
+# ------------------------------------------------------
+def _time_sync(func: Callable[[], Any], iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def _time_async(
+    loop: asyncio.AbstractEventLoop, func: Callable[[], Awaitable[Any]], iterations: int
+) -> float:
+    async def run() -> float:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            await func()
+        return (time.perf_counter() - started) / iterations * 1e6
+
+    return loop.run_until_complete(run())
+
+
+def calibrate(rounds: int) -> float:
+    """µs de um loop fixo em Python puro: mede a velocidade da máquina."""
+    def work() -> int:
+        total = 0
+        for i in range(2000):
+            total += i * i % 7
+        return total
+
+    return min(_time_sync(work, 200) for _ in range(rounds))
+
+
+# ------------------------------------------------------
+# Benchmarks
+# ------------------------------------------------------
+Benchmark = Tuple[str, bool, Callable[..., Any], int]
+
+
+def build_benchmarks() -> List[Benchmark]:
+    gemini = GeminiLLM()
+    reasoner = GeminiReasonerLLM()
+    hf = HuggingFaceLLM()
+    deepseek = DeepSeekChatLLM()
+
+    payload = AggregatedResponse(
+        final_answer=LARGE_ANSWER,
+        answers=[
+            {"provider": "gemini", "answer": LARGE_ANSWER},
+            {"provider": "huggingface", "answer": LARGE_ANSWER},
+        ],
+    )
+    payload_dict = payload.model_dump()
+
+    # Respostas diferentes forçam a síntese; iguais, o atalho por concordância
+    fusion_answers = {
+        "gemini": LARGE_ANSWER,
+        "huggingface": "Resposta curta e diferente sobre firewalls de rede. " * 20,
+    }
+
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+    async def ask_endpoint() -> None:
+        response = await client.post(
+            "/ask",
+            json={"question": QUESTION, "providers": ["fusion"]},
+            headers={"X-Cache-Bypass": "1"},
+        )
+        response.raise_for_status()
+
+    return [
+        ("prompt.gemini", False, lambda: gemini._build_prompt(QUESTION), 20000),
+        ("prompt.huggingface_body", False, lambda: hf._build_body(QUESTION), 20000),
+        ("prompt.deepseek_body", False, lambda: deepseek._build_body(QUESTION), 20000),
+        (
+            "prompt.synthesis",
+            False,
+            lambda: reasoner._build_synthesis_prompt(QUESTION, LARGE_ANSWER, LARGE_ANSWER),
+            20000,
+        ),
+        ("construct.gemini", False, GeminiLLM, 5000),
+        ("construct.huggingface", False, HuggingFaceLLM, 5000),
+        ("registry.get", False, lambda: registry.get("gemini"), 50000),
+        ("aggregate.single", True, lambda: aggregate_answers(QUESTION, ["gemini"]), 2000),
+        ("aggregate.fusion_synthesis", True, lambda: _fusion(fusion_answers), 500),
+        (
+            "aggregate.fusion_agreement",
+            True,
+            lambda: _fusion({"gemini": LARGE_ANSWER, "huggingface": LARGE_ANSWER}),
+            500,
+        ),
+        ("schema.validate", False, lambda: AggregatedResponse.model_validate(payload_dict), 5000),
+        ("schema.dump_json", False, payload.model_dump_json, 5000),
+        ("http.ask_fusion", True, ask_endpoint, 300),
+    ]
+
+
+async def _fusion(answers: Dict[str, str]) -> AggregatedResponse:
+    with registry.override("gemini", FakeLLM(answers["gemini"])), \
+            registry.override("huggingface", FakeLLM(answers["huggingface"])), \
+            registry.override("gemini_reasoner", FakeReasoner(LARGE_ANSWER)):
+        return await aggregate_answers(QUESTION, ["fusion"])
+
+
+def _fresh(timer: Callable[[], float]) -> float:
+    # A janela do circuit breaker cresce com as chamadas; zerar a cada rodada
+    # mantém as rodadas comparáveis entre si. O GC fica desligado durante a
+    # medição, como no timeit: uma coleta no meio de uma rodada pesa mais
+    # que o próprio benchmark nos casos curtos
+    reset_breakers()
+    gc.collect()
+    gc.disable()
+    try:
+        return timer()
+    finally:
+        gc.enable()
+
+
+def run(
+    benchmarks: List[Benchmark], rounds: int, scale: float, only: Optional[List[str]]
+) -> Tuple[Dict[str, float], float]:
+    """(µs por benchmark, µs da calibração). Cada rodada mede todos os
+    benchmarks uma vez, e a calibração entre eles; de tudo fica a melhor."""
+    loop = asyncio.new_event_loop()
+    timers: List[Tuple[str, Callable[[], float]]] = []
+    for name, is_async, func, iterations in benchmarks:
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        iterations = max(1, int(iterations * scale))
+        if is_async:
+            timers.append((name, lambda func=func, n=iterations: _time_async(loop, func, n)))
+        else:
+            timers.append((name, lambda func=func, n=iterations: _time_sync(func, n)))
+
+    results: Dict[str, float] = {}
+    calibration = calibrate(rounds)
+
+    with registry.override("gemini", FakeLLM(LARGE_ANSWER)), \
+            registry.override("huggingface", FakeLLM(LARGE_ANSWER)), \
+            registry.override("gemini_reasoner", FakeReasoner(LARGE_ANSWER)):
+        for _, timer in timers:
+            timer()  # aquecimento
+        for _ in range(rounds):
+            for name, timer in timers:
+                micros = _fresh(timer)
+                results[name] = min(results.get(name, micros), micros)
+            calibration = min(calibration, calibrate(1))
+
+    loop.close()
+    return results, calibration
+
+
+# ------------------------------------------------------
+# Baseline
+# ------------------------------------------------------
+def _change(
+    name: str, micros: float, calibration: float, baseline: Optional[Dict[str, Any]]
+) -> Optional[Tuple[float, float]]:
+    """(variação relativa, µs esperados) contra a baseline, ou None se não houver."""
+    previous = (baseline or {}).get("results", {}).get(name)
+    if not previous:
+        return None
+    # Normaliza pela calibração: mesma razão ⇒ mesmo custo relativo
+    expected = previous * calibration / baseline["calibration_us"]
+    return micros / expected - 1, expected
+
+
+def _is_regression(
+    micros: float, change: float, expected: float, threshold: float, min_delta_us: float
+) -> bool:
+    return change > threshold and micros - expected > min_delta_us
+
+
+def _regressions(
+    results: Dict[str, float],
+    calibration: float,
+    baseline: Optional[Dict[str, Any]],
+    threshold: float,
+    min_delta_us: float,
+) -> List[str]:
+    regressions = []
+    for name, micros in results.items():
+        compared = _change(name, micros, calibration, baseline)
+        if compared and _is_regression(micros, *compared, threshold, min_delta_us):
+            regressions.append(name)
+    return regressions
+
+
+def compare(
+    results: Dict[str, float],
+    calibration: float,
+    baseline: Optional[Dict[str, Any]],
+    threshold: float,
+    min_delta_us: float,
+) -> List[str]:
+    """Imprime a tabela e retorna os benchmarks que regrediram além do limite."""
+    regressions = []
+    for name, micros in results.items():
+        line = f"{name:<30} {micros:>12.2f} µs"
+        compared = _change(name, micros, calibration, baseline)
+        if compared:
+            change, expected = compared
+            line += f"   {change:+7.1%} vs baseline"
+            if _is_regression(micros, change, expected, threshold, min_delta_us):
+                line += "   << REGRESSÃO"
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmarks do overhead por requisição.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25, help="tolerância (0.25 = 25%%)")
+    parser.add_argument(
+        "--min-delta-us", type=float, default=1.0,
+        help="diferenças absolutas menores que isso não contam como regressão",
+    )
+    parser.add_argument("--rounds", type=int, default=15)
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="multiplica as iterações (ex.: 0.1 para rodar rápido)"
+    )
+    parser.add_argument("--only", nargs="+", default=None, help="prefixos de benchmarks")
+    args = parser.parse_args()
+
+    benchmarks = build_benchmarks()
+    results, calibration = run(benchmarks, args.rounds, args.scale, args.only)
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    suspects = _regressions(results, calibration, baseline, args.threshold, args.min_delta_us)
+    if suspects:
+        # Confirma os suspeitos numa segunda medição; fica o melhor das duas
+        retry, retry_calibration = run(benchmarks, args.rounds, args.scale, suspects)
+        for name, micros in retry.items():
+            results[name] = min(results[name], micros)
+        calibration = min(calibration, retry_calibration)
+
+    print(f"calibração: {calibration:.1f} µs\n")
+    regressions = compare(results, calibration, baseline, args.threshold, args.min_delta_us)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(
+                {"calibration_us": round(calibration, 2),
+                 "results": {name: round(value, 3) for name, value in results.items()}},
+                f, indent=2,
+            )
+            f.write("\n")
+        print(f"\nBaseline gravada em {args.baseline}")
+        return
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) acima de {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# scripts/bench_semantic_cache.py
+
+import sys
+import os
+
+# Adiciona a pasta raiz do projeto ao PYTHONPATH
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import random
+import time
+
+import numpy as np
+
+from app.semantic_cache import SemanticIndex, embed
+
+TERMS = (
+    "ec2 s3 vpc iam lambda ecs eks rds dynamodb cloudfront route53 sqs sns kinesis "
+    "glue athena redshift emr cloudwatch cloudtrail kms waf gke bigquery pubsub aks "
+    "fargate ebs efs elb alb nlb nat subnet peering transit vpn cognito eventbridge"
+).split()
+
+TEMPLATES = [
+    "o que é {a}",
+    "diferença entre {a} e {b}",
+    "como configurar {a} com {b}",
+    "quando usar {a} em vez de {b}",
+    "boas práticas de {a} para {c}",
+    "como integrar {a}, {b} e {c}",
+]
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    random.seed(1)
+
+    questions = set()
+    while len(questions) < size:
+        a, b, c = random.sample(TERMS, 3)
+        questions.add(
+            random.choice(TEMPLATES).format(a=a, b=b, c=c)
+            + f" caso {random.randint(0, 10**6)}"
+        )
+    questions = list(questions)
+
+    start = time.perf_counter()
+    vectors = [embed(question) for question in questions]
+    embed_us = (time.perf_counter() - start) / size * 1e6
+
+    index = SemanticIndex(capacity=size)
+    start = time.perf_counter()
+    for i, vector in enumerate(vectors):
+        index.add(vector, "bench", str(i))
+    add_us = (time.perf_counter() - start) / size * 1e6
+
+    def percentiles(queries) -> str:
+        latencies = []
+        for vector in queries:
+            start = time.perf_counter()
+            index.search(vector, "bench")
+            latencies.append(time.perf_counter() - start)
+        latencies_us = np.array(latencies) * 1e6
+        return f"p50={np.percentile(latencies_us, 50):.0f} us  p99={np.percentile(latencies_us, 99):.0f} us"
+
+    # Perguntas já indexadas (acerto) e perguntas novas (quase sempre miss,
+    # o caminho mais caro: visita também os buckets vizinhos)
+    indexed = [vectors[random.randrange(size)] for _ in range(2000)]
+    novel = []
+    for _ in range(2000):
+        a, b, c = random.sample(TERMS, 3)
+        novel.append(embed(random.choice(TEMPLATES).format(a=a, b=b, c=c) + f" outro {random.randint(0, 10**6)}"))
+
+    print(f"Entradas: {size}")
+    print(f"embed():  {embed_us:.1f} us/pergunta")
+    print(f"add():    {add_us:.1f} us/entrada")
+    print(f"search() já indexada: {percentiles(indexed)}")
+    print(f"search() nova:        {percentiles(novel)}")
+
+
+if __name__ == "__main__":
+    main()
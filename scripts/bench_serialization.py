@@ -0,0 +1,147 @@
+# scripts/bench_serialization.py
+
+"""
+Custo de CPU e bytes enviados por resposta do /ask, em cada combinação de
+serialização e compressão (app/responses.py):
+
+  - fastapi_default: o que o FastAPI faria com response_model
+    (validar de novo + jsonable_encoder + json da stdlib);
+  - pydantic: model_dump_json (caminho atual do /ask);
+  - orjson: model_dump + orjson (FAST_JSON=true);
+  - cada um dos anteriores + gzip (GZIP_LEVEL) e brotli (BROTLI_QUALITY),
+    quando o pacote brotli estiver instalado.
+
+A resposta simulada é a de um fusion: resposta final + N respostas de
+vários KB em português, com texto variado (texto repetido comprimiria bem
+demais e esconderia o custo real).
+
+  python scripts/bench_serialization.py
+  python scripts/bench_serialization.py --answers 3 --answer-kb 6 --rounds 7
+"""
+
+import sys
+import os
+
+# Adiciona a pasta raiz do projeto ao PYTHONPATH
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import argparse
+import json
+import random
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from app.responses import brotli, compress, orjson
+from app.schemas import AggregatedResponse, ProviderAnswer
+
+WORDS = (
+    "a AWS oferece VPC subnets públicas e privadas com tabelas de rota "
+    "o Security Group é stateful e avalia regras de entrada e saída "
+    "já a NACL é stateless e aplicada na subnet com regras numeradas "
+    "para alta disponibilidade distribua instâncias EC2 em várias zonas "
+    "use um Application Load Balancer com health checks e Auto Scaling "
+    "no exame Solutions Architect Associate esse tema aparece com frequência "
+    "lembre que o NAT Gateway permite saída para a internet sem entrada "
+    "e que o custo de transferência entre zonas não é zero "
+    "o IAM controla quem pode fazer o quê com políticas em JSON "
+    "prefira roles a chaves de acesso e aplique o menor privilégio"
+).split()
+
+
+def fake_answer(rng: random.Random, size_kb: float) -> str:
+    words: List[str] = []
+    length = 0
+    while length < size_kb * 1024:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20)))
+        sentence = sentence[0].upper() + sentence[1:] + ". "
+        words.append(sentence)
+        length += len(sentence)
+        if rng.random() < 0.15:
+            words.append("\n\n- ")
+    return "".join(words)
+
+
+def build_response(answers: int, answer_kb: float) -> AggregatedResponse:
+    rng = random.Random(42)
+    providers = ["gemini", "huggingface", "deepseek_chat", "gemini_extra"][:answers]
+    return AggregatedResponse(
+        final_answer=fake_answer(rng, answer_kb),
+        answers=[ProviderAnswer(provider=name, answer=fake_answer(rng, answer_kb)) for name in providers],
+    )
+
+
+# ------------------------------------------------------
+# Medição
+# ------------------------------------------------------
+def best_micros(func: Callable[[], bytes], iterations: int, rounds: int) -> float:
+    func()  # aquecimento
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        best = min(best, (time.perf_counter() - started) / iterations * 1e6)
+    return best
+
+
+def serializers(response: AggregatedResponse) -> Dict[str, Callable[[], bytes]]:
+    def fastapi_default() -> bytes:
+        validated = AggregatedResponse.model_validate(response.model_dump())
+        return json.dumps(
+            jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    result = {
+        "fastapi_default": fastapi_default,
+        "pydantic": lambda: response.model_dump_json(exclude={"timings"}).encode("utf-8"),
+    }
+    if orjson is not None:
+        result["orjson"] = lambda: orjson.dumps(response.model_dump(exclude={"timings"}))
+    return result
+
+
+def run(answers: int, answer_kb: float, iterations: int, rounds: int) -> List[Tuple[str, float, int]]:
+    response = build_response(answers, answer_kb)
+    encodings: List[Optional[str]] = [None, "gzip"] + (["br"] if brotli is not None else [])
+
+    rows = []
+    for name, serialize in serializers(response).items():
+        body = serialize()
+        serialize_us = best_micros(serialize, iterations, rounds)
+        for encoding in encodings:
+            if encoding is None:
+                rows.append((name, serialize_us, len(body)))
+                continue
+            compress_us = best_micros(lambda: compress(body, encoding), max(1, iterations // 5), rounds)
+            rows.append((f"{name}+{encoding}", serialize_us + compress_us, len(compress(body, encoding))))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="CPU e bytes por resposta do /ask.")
+    parser.add_argument("--answers", type=int, default=3, help="respostas de providers no fusion")
+    parser.add_argument("--answer-kb", type=float, default=6.0, help="tamanho de cada resposta (KB)")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = run(args.answers, args.answer_kb, args.iterations, args.rounds)
+    base_us, base_bytes = rows[0][1], rows[0][2]
+
+    print(f"{'caminho':<26} {'CPU µs':>10} {'bytes':>9} {'CPU vs padrão':>14} {'bytes economizados':>19}")
+    for name, micros, size in rows:
+        print(
+            f"{name:<26} {micros:>10.1f} {size:>9} {micros / base_us - 1:>+14.0%} "
+            f"{base_bytes - size:>10} ({1 - size / base_bytes:.0%})"
+        )
+    if orjson is None:
+        print("\norjson não instalado: pip install orjson")
+    if brotli is None:
+        print("brotli não instalado: pip install brotli")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+# scripts/load_test.py
+
+"""
+Teste de carga offline: sobe os stubs dos providers (scripts/stub_providers.py)
+e o backend (uvicorn app.main:app) apontado para eles, dispara os cenários
+com a concorrência pedida e grava o resultado em JSON.
+
+Cenários:
+  single  - POST /ask com providers=["gemini"]
+  hf      - POST /ask com providers=["huggingface"]
+  fusion  - POST /ask com providers=["fusion"]
+  stream  - POST /ask/stream (fusion); mede também o tempo até o 1º token
+  batch   - POST /ask/batch com --batch-size perguntas por requisição
+
+Por cenário: vazão (req/s), latência p50/p95/p99, erros e, no stream,
+time-to-first-token. O cache de respostas fica desligado e cada pergunta é
+única, então toda requisição chega aos stubs.
+
+Exemplo:
+  python scripts/load_test.py --scenarios single fusion stream --concurrency 32 --requests 400
+  python scripts/load_test.py --compare loadtest_results/anterior.json
+"""
+
+import sys
+import os
+
+# Adiciona a pasta raiz do projeto ao PYTHONPATH
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import argparse
+import asyncio
+import json
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+SCENARIOS = ("single", "hf", "fusion", "stream", "batch")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test do backend contra providers simulados.")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=16, help="requisições simultâneas")
+    parser.add_argument("--requests", type=int, default=200, help="requisições por cenário")
+    parser.add_argument("--batch-size", type=int, default=10, help="perguntas por /ask/batch")
+    parser.add_argument("--profile", default=None, help="JSON com ajustes dos perfis dos stubs")
+    parser.add_argument("--stub-port", type=int, default=8900)
+    parser.add_argument("--app-port", type=int, default=8901)
+    parser.add_argument(
+        "--app-url", default=None,
+        help="usa um backend já rodando (que já deve apontar para os stubs)",
+    )
+    parser.add_argument("--output", default=None, help="JSON de saída (padrão: loadtest_results/)")
+    parser.add_argument("--compare", default=None, help="JSON de uma execução anterior")
+    return parser.parse_args()
+
+
+# ------------------------------------------------------
+# Processos (stubs e backend)
+# ------------------------------------------------------
+def _spawn(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, *args], cwd=ROOT, env=env)
+
+
+def app_environment(stub_url: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "GEMINI_API_KEY": "stub",
+        "HUGGINGFACE_API_KEY": "stub",
+        "DEEPSEEK_API_KEY": "stub",
+        "GEMINI_BACKEND": "rest",
+        "GEMINI_API_BASE": f"{stub_url}/gemini/v1beta",
+        "HUGGINGFACE_API_BASE": f"{stub_url}/huggingface/v1",
+        "DEEPSEEK_API_BASE": f"{stub_url}/deepseek",
+        "ANSWER_CACHE_ENABLED": "false",
+        "TRACING_EXPORTER": "",
+    })
+    return env
+
+
+async def wait_until_up(url: str, timeout: float = 30.0) -> None:
+    started = time.monotonic()
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() - started < timeout:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} não respondeu em {timeout:.0f}s")
+
+
+# ------------------------------------------------------
+# Cenários
+# ------------------------------------------------------
+class Sample:
+    __slots__ = ("latency", "ttft", "ok", "items")
+
+    def __init__(self, latency: float, ok: bool, ttft: Optional[float] = None, items: int = 1):
+        self.latency = latency
+        self.ok = ok
+        self.ttft = ttft
+        self.items = items
+
+
+def _question(n: int) -> str:
+    return f"Qual a diferença entre VPC peering e Transit Gateway? (carga #{n})"
+
+
+def _answer_ok(data: Dict[str, Any]) -> bool:
+    return not str(data.get("final_answer", "")).startswith("[ERRO")
+
+
+def _ask(providers: List[str]) -> Callable[[httpx.AsyncClient, int], Awaitable[Sample]]:
+    async def run(client: httpx.AsyncClient, n: int) -> Sample:
+        started = time.perf_counter()
+        response = await client.post(
+            "/ask", json={"question": _question(n), "providers": providers}
+        )
+        ok = response.status_code == 200 and _answer_ok(response.json())
+        return Sample(time.perf_counter() - started, ok)
+
+    return run
+
+
+async def _stream(client: httpx.AsyncClient, n: int) -> Sample:
+    started = time.perf_counter()
+    ttft = None
+    ok = False
+    async with client.stream(
+        "POST", "/ask/stream", json={"question": _question(n), "providers": ["fusion"]}
+    ) as response:
+        async for line in response.aiter_lines():
+            if ttft is None and line == "event: token":
+                ttft = time.perf_counter() - started
+            if line == "event: final":
+                ok = response.status_code == 200
+    return Sample(time.perf_counter() - started, ok, ttft=ttft)
+
+
+def _batch(size: int) -> Callable[[httpx.AsyncClient, int], Awaitable[Sample]]:
+    async def run(client: httpx.AsyncClient, n: int) -> Sample:
+        questions = [
+            {"id": str(i), "question": _question(n * size + i)} for i in range(size)
+        ]
+        started = time.perf_counter()
+        response = await client.post(
+            "/ask/batch", json={"questions": questions, "providers": ["gemini"]}
+        )
+        results = [json.loads(line) for line in response.text.splitlines() if line]
+        ok = response.status_code == 200 and len(results) == size and all(
+            result["error"] is None for result in results
+        )
+        return Sample(time.perf_counter() - started, ok, items=size)
+
+    return run
+
+
+def build_scenario(name: str, batch_size: int) -> Callable[[httpx.AsyncClient, int], Awaitable[Sample]]:
+    if name == "single":
+        return _ask(["gemini"])
+    if name == "hf":
+        return _ask(["huggingface"])
+    if name == "fusion":
+        return _ask(["fusion"])
+    if name == "stream":
+        return _stream
+    return _batch(batch_size)
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    run: Callable[[httpx.AsyncClient, int], Awaitable[Sample]],
+    total: int,
+    concurrency: int,
+    offset: int,
+) -> Dict[str, Any]:
+    samples: List[Sample] = []
+    failures = 0
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        nonlocal failures
+        for n in counter:
+            try:
+                samples.append(await run(client, offset + n))
+            except httpx.HTTPError:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [sample.latency for sample in samples]
+    ttfts = [sample.ttft for sample in samples if sample.ttft is not None]
+    items = sum(sample.items for sample in samples)
+    result: Dict[str, Any] = {
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "items_per_s": round(items / elapsed, 2),
+        "errors": failures + sum(not sample.ok for sample in samples),
+        "latency_ms": percentiles(latencies),
+    }
+    if ttfts:
+        result["ttft_ms"] = percentiles(ttfts)
+    return result
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 (nearest-rank) e média, em ms."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        index = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered))) - 1))
+        return round(ordered[index] * 1000, 1)
+
+    return {
+        "p50": rank(50),
+        "p95": rank(95),
+        "p99": rank(99),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 1),
+    }
+
+
+# ------------------------------------------------------
+# Relatório
+# ------------------------------------------------------
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+            text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]]) -> None:
+    for name, result in results.items():
+        latency = result["latency_ms"]
+        line = (
+            f"{name:<7} {result['throughput_rps']:>8.1f} req/s  "
+            f"p50 {latency.get('p50', 0):>7.0f}ms  p95 {latency.get('p95', 0):>7.0f}ms  "
+            f"p99 {latency.get('p99', 0):>7.0f}ms  erros {result['errors']}"
+        )
+        if "ttft_ms" in result:
+            line += f"  ttft p50 {result['ttft_ms']['p50']:.0f}ms"
+
+        previous = (baseline or {}).get("results", {}).get(name)
+        if previous:
+            before = previous["latency_ms"].get("p95")
+            if before:
+                change = (latency["p95"] - before) / before * 100
+                line += f"  (p95 {change:+.1f}% vs {baseline['commit']})"
+        print(line)
+
+
+async def main() -> None:
+    args = parse_args()
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    app_url = args.app_url or f"http://127.0.0.1:{args.app_port}"
+    processes: List[subprocess.Popen] = []
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    try:
+        if args.app_url is None:
+            env = app_environment(stub_url)
+            stub_args = ["scripts/stub_providers.py", "--port", str(args.stub_port)]
+            if args.profile:
+                stub_args += ["--profile", args.profile]
+            processes.append(_spawn(stub_args, env))
+            processes.append(_spawn(
+                ["-m", "uvicorn", "app.main:app", "--port", str(args.app_port),
+                 "--log-level", "warning"],
+                env,
+            ))
+            await wait_until_up(f"{stub_url}/stats")
+        await wait_until_up(f"{app_url}/health")
+
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        results: Dict[str, Dict[str, Any]] = {}
+        async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=120.0) as client:
+            for index, name in enumerate(args.scenarios):
+                print(f"Cenário {name}: {args.requests} requisições, concorrência {args.concurrency}...")
+                results[name] = await run_scenario(
+                    client,
+                    build_scenario(name, args.batch_size),
+                    args.requests,
+                    args.concurrency,
+                    offset=index * args.requests * args.batch_size,
+                )
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "batch_size": args.batch_size,
+            "profile": args.profile,
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(
+        ROOT, "loadtest_results",
+        f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{report['commit']}.json",
+    )
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print()
+    print_report(results, baseline)
+    print(f"\nResultado salvo em {output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
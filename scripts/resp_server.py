@@ -0,0 +1,150 @@
+# scripts/resp_server.py
+
+"""
+Servidor local que fala o protocolo do Redis (RESP), com só os comandos que
+o app/shared_state.py usa: GET, SET (com PX), DEL, INCRBY, DECRBY, PEXPIRE,
+PING, FLUSHDB, AUTH e SELECT. Serve para testar SHARED_STATE_BACKEND=redis
+(vários workers ou várias instâncias) sem instalar um Redis:
+
+  python scripts/resp_server.py --port 6390
+  SHARED_STATE_BACKEND=redis SHARED_STATE_URL=redis://127.0.0.1:6390/0 \\
+    WEB_CONCURRENCY=4 python -m app.serve
+
+Tudo fica em memória de um processo; não há persistência nem réplica.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class RESPStore:
+    def __init__(self) -> None:
+        # chave -> (valor, expira em [monotonic] ou None)
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def _incr(self, key: bytes, amount: int) -> Any:
+        current = self._get(key)
+        try:
+            value = int(current or 0) + amount
+        except ValueError:
+            return RESPError("ERR value is not an integer or out of range")
+        expires_at = self.data[key][1] if current is not None else None
+        self.data[key] = (str(value).encode(), expires_at)
+        return value
+
+    def execute(self, args: List[bytes]) -> Any:
+        command = args[0].upper()
+        if command == b"PING":
+            return SimpleString("PONG")
+        if command in (b"AUTH", b"SELECT"):
+            return SimpleString("OK")
+        if command == b"FLUSHDB":
+            self.data.clear()
+            return SimpleString("OK")
+        if command == b"GET":
+            return self._get(args[1])
+        if command == b"SET":
+            expires_at = None
+            if len(args) >= 5 and args[3].upper() == b"PX":
+                expires_at = time.monotonic() + int(args[4]) / 1000
+            self.data[args[1]] = (args[2], expires_at)
+            return SimpleString("OK")
+        if command == b"DEL":
+            return sum(1 for key in args[1:] if self.data.pop(key, None) is not None)
+        if command == b"INCRBY":
+            return self._incr(args[1], int(args[2]))
+        if command == b"DECRBY":
+            return self._incr(args[1], -int(args[2]))
+        if command == b"PEXPIRE":
+            value = self._get(args[1])
+            if value is None:
+                return 0
+            self.data[args[1]] = (value, time.monotonic() + int(args[2]) / 1000)
+            return 1
+        return RESPError(f"ERR unknown command '{command.decode(errors='replace')}'")
+
+
+class SimpleString(str):
+    pass
+
+
+class RESPError(str):
+    pass
+
+
+def encode_reply(reply: Any) -> bytes:
+    if isinstance(reply, RESPError):
+        return b"-" + reply.encode() + b"\r\n"
+    if isinstance(reply, SimpleString):
+        return b"+" + reply.encode() + b"\r\n"
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if reply is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+
+async def read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # Comando inline ("PING\r\n"), como o redis-cli/telnet mandam
+        return line.strip().split()
+    args = []
+    for _ in range(int(line[1:])):
+        size = int((await reader.readline())[1:])
+        args.append((await reader.readexactly(size + 2))[:-2])
+    return args
+
+
+def make_handler(store: RESPStore):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                args = await read_command(reader)
+                if args is None:
+                    break
+                if args:
+                    writer.write(encode_reply(store.execute(args)))
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def serve(host: str, port: int, ready: Any = None) -> None:
+    """`ready` (um asyncio.Event ou threading.Event) é sinalizado quando a porta abre."""
+    server = await asyncio.start_server(make_handler(RESPStore()), host, port)
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor RESP mínimo para SHARED_STATE_BACKEND=redis.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    print(f"RESP em {args.host}:{args.port}")
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
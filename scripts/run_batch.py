@@ -0,0 +1,84 @@
+# scripts/run_batch.py
+
+import sys
+import os
+
+# Adiciona a pasta raiz do projeto ao PYTHONPATH
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import argparse
+import asyncio
+import time
+
+from app.batch import prepare_output, read_jsonl_questions, run_batch
+from app.http_client import close_http_client, open_http_client
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Responde um arquivo JSONL de perguntas e grava os resultados em JSONL.",
+        epilog=(
+            "Exemplo: python scripts/run_batch.py perguntas.jsonl respostas.jsonl "
+            "--providers gemini --concurrency 8\n"
+            "Rodar de novo com a mesma saída retoma de onde parou."
+        ),
+    )
+    parser.add_argument("input", help="JSONL de entrada ({\"id\", \"question\"} por linha)")
+    parser.add_argument("output", help="JSONL de saída (as linhas novas são acrescentadas)")
+    parser.add_argument("--providers", nargs="+", default=["fusion"])
+    parser.add_argument("--concurrency", type=int, default=None, help="perguntas em paralelo")
+    parser.add_argument(
+        "--per-provider", type=int, default=None, help="perguntas em paralelo por provider"
+    )
+    return parser.parse_args()
+
+
+async def main() -> None:
+    args = parse_args()
+
+    questions = read_jsonl_questions(args.input)
+    done = prepare_output(args.output)
+    todo = [item for item in questions if item.id not in done]
+
+    print(f"Perguntas: {len(questions)} | já respondidas: {len(done)} | a fazer: {len(todo)}")
+    if not todo:
+        return
+
+    await open_http_client()
+    started = time.perf_counter()
+    errors = 0
+
+    try:
+        with open(args.output, "a", encoding="utf-8") as out:
+            async for count, result in _enumerate(
+                run_batch(todo, args.providers, args.concurrency, args.per_provider)
+            ):
+                # Uma linha por resultado, gravada em disco na hora:
+                # se o processo cair, a próxima execução continua daqui.
+                out.write(result.model_dump_json() + "\n")
+                out.flush()
+                os.fsync(out.fileno())
+
+                errors += result.error is not None
+                status = "ERRO" if result.error else result.cache
+                print(f"[{count}/{len(todo)}] {result.id} {status} {result.elapsed_ms:.0f}ms")
+    finally:
+        await close_http_client()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"\nConcluído em {elapsed:.1f}s — {len(todo) / elapsed * 60:.1f} perguntas/min, "
+        f"{errors} com erro (rode de novo para repetir só essas)."
+    )
+
+
+async def _enumerate(results):
+    count = 0
+    async for result in results:
+        count += 1
+        yield count, result
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,196 @@
+# scripts/stub_providers.py
+
+"""
+Servidor local que imita as APIs dos providers, para testes de carga sem
+gastar cota:
+
+  POST /huggingface/v1/chat/completions        (formato OpenAI, com stream)
+  POST /deepseek/chat/completions              (formato OpenAI, com stream)
+  POST /gemini/v1beta/models/{model}:generateContent
+  POST /gemini/v1beta/models/{model}:streamGenerateContent?alt=sse
+
+Cada provider tem um perfil: latência log-normal (mediana e sigma), taxa de
+erro (responde 503, que o cliente real trata como falha transitória),
+tamanho da resposta e intervalo entre pedaços no streaming. Os perfis
+padrão estão em DEFAULT_PROFILES e podem ser sobrescritos com --profile
+(JSON no mesmo formato, só com os campos que mudam).
+
+Para apontar o backend para cá:
+  GEMINI_API_BASE=http://127.0.0.1:8900/gemini/v1beta
+  HUGGINGFACE_API_BASE=http://127.0.0.1:8900/huggingface/v1
+  DEEPSEEK_API_BASE=http://127.0.0.1:8900/deepseek
+
+Uso: python scripts/stub_providers.py --port 8900 [--profile perfis.json]
+"""
+
+import sys
+import os
+
+# Adiciona a pasta raiz do projeto ao PYTHONPATH
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import argparse
+import asyncio
+import json
+import math
+import random
+from typing import Any, AsyncIterator, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_PROFILES: Dict[str, Dict[str, float]] = {
+    # latency_ms: mediana da resposta completa (ask) e do primeiro token (stream)
+    # sigma: espalhamento da log-normal (0 = latência fixa)
+    # chunk_ms: intervalo entre pedaços no streaming
+    "gemini": {"latency_ms": 900, "sigma": 0.4, "error_rate": 0.01, "words": 120, "chunk_ms": 25},
+    "huggingface": {"latency_ms": 600, "sigma": 0.5, "error_rate": 0.02, "words": 90, "chunk_ms": 15},
+    "deepseek": {"latency_ms": 1500, "sigma": 0.5, "error_rate": 0.02, "words": 150, "chunk_ms": 30},
+}
+
+WORDS = (
+    "a vpc isola a rede da conta e as subnets dividem o bloco cidr entre zonas de "
+    "disponibilidade o iam controla quem pode fazer o que com políticas anexadas a "
+    "usuários grupos e roles o s3 guarda objetos com alta durabilidade e o kms "
+    "gerencia as chaves usadas para criptografar os dados em repouso"
+).split()
+
+CHUNK_WORDS = 4
+
+
+def load_profiles(path: str = None) -> Dict[str, Dict[str, float]]:
+    profiles = {name: dict(profile) for name, profile in DEFAULT_PROFILES.items()}
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            for name, overrides in json.load(f).items():
+                profiles.setdefault(name, dict(DEFAULT_PROFILES["gemini"])).update(overrides)
+    return profiles
+
+
+def sample_latency(profile: Dict[str, float]) -> float:
+    """Latência em segundos: log-normal com a mediana do perfil."""
+    median = max(1.0, float(profile["latency_ms"]))
+    return random.lognormvariate(math.log(median), float(profile["sigma"])) / 1000
+
+
+def should_fail(profile: Dict[str, float]) -> bool:
+    return random.random() < float(profile["error_rate"])
+
+
+def fake_answer(prompt: str, profile: Dict[str, float]) -> List[str]:
+    """Resposta determinística pela pergunta, já quebrada em pedaços de streaming."""
+    rng = random.Random(prompt)
+    words = [rng.choice(WORDS) for _ in range(int(profile["words"]))]
+    return [
+        " ".join(words[i:i + CHUNK_WORDS]) + " "
+        for i in range(0, len(words), CHUNK_WORDS)
+    ]
+
+
+def _overloaded() -> JSONResponse:
+    return JSONResponse({"error": "stub: sobrecarga simulada"}, status_code=503)
+
+
+def create_app(profiles: Dict[str, Dict[str, float]]) -> FastAPI:
+    app = FastAPI(title="IsCoolGPT - stubs de providers")
+    app.state.requests = {name: 0 for name in profiles}
+
+    async def _chat_completions(provider: str, request: Request):
+        profile = profiles[provider]
+        app.state.requests[provider] += 1
+        body = await request.json()
+        prompt = json.dumps(body.get("messages", []), ensure_ascii=False)
+
+        if should_fail(profile):
+            await asyncio.sleep(sample_latency(profile) / 4)
+            return _overloaded()
+
+        chunks = fake_answer(prompt, profile)
+        if not body.get("stream"):
+            await asyncio.sleep(sample_latency(profile))
+            return {"choices": [{"message": {"role": "assistant", "content": "".join(chunks)}}]}
+
+        return StreamingResponse(
+            _openai_stream(chunks, profile), media_type="text/event-stream"
+        )
+
+    @app.post("/huggingface/v1/chat/completions")
+    async def huggingface(request: Request):
+        return await _chat_completions("huggingface", request)
+
+    @app.post("/deepseek/chat/completions")
+    async def deepseek(request: Request):
+        return await _chat_completions("deepseek", request)
+
+    @app.post("/gemini/v1beta/models/{target}")
+    async def gemini(target: str, request: Request):
+        profile = profiles["gemini"]
+        app.state.requests["gemini"] += 1
+        body = await request.json()
+        prompt = json.dumps(body.get("contents", []), ensure_ascii=False)
+
+        if should_fail(profile):
+            await asyncio.sleep(sample_latency(profile) / 4)
+            return _overloaded()
+
+        chunks = fake_answer(prompt, profile)
+        if target.endswith(":streamGenerateContent"):
+            return StreamingResponse(
+                _gemini_stream(chunks, profile), media_type="text/event-stream"
+            )
+
+        await asyncio.sleep(sample_latency(profile))
+        return _gemini_payload("".join(chunks))
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+async def _paced(chunks: List[str], profile: Dict[str, float]) -> AsyncIterator[str]:
+    """Primeiro pedaço após a latência sorteada; os demais a cada chunk_ms."""
+    await asyncio.sleep(sample_latency(profile))
+    for i, chunk in enumerate(chunks):
+        if i:
+            await asyncio.sleep(float(profile["chunk_ms"]) / 1000)
+        yield chunk
+
+
+async def _openai_stream(chunks: List[str], profile: Dict[str, float]) -> AsyncIterator[str]:
+    async for chunk in _paced(chunks, profile):
+        data = {"choices": [{"delta": {"content": chunk}}]}
+        yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+async def _gemini_stream(chunks: List[str], profile: Dict[str, float]) -> AsyncIterator[str]:
+    async for chunk in _paced(chunks, profile):
+        yield f"data: {json.dumps(_gemini_payload(chunk), ensure_ascii=False)}\n\n"
+
+
+def _gemini_payload(text: str) -> Dict[str, Any]:
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Stubs locais dos providers para load test.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--profile", default=None, help="JSON com ajustes dos perfis")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    import uvicorn
+
+    uvicorn.run(create_app(load_profiles(args.profile)), host=args.host, port=args.port,
+                log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
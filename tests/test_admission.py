@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, patch
+
+from app import main, pipeline
+from app.admission import AdmissionController, Overloaded
+from app.cache import AnswerCache, MemoryCacheBackend
+from app.deadline import Deadline, deadline_scope
+from app.schemas import AggregatedResponse, ProviderAnswer
+from app.streaming import ReleasingStreamingResponse
+
+
+def make_response(provider: str) -> AggregatedResponse:
+    return AggregatedResponse(
+        final_answer=f"{provider.upper()}: ok",
+        answers=[ProviderAnswer(provider=provider, answer="ok")],
+    )
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    controller = AdmissionController(max_in_flight=1, max_queue=10, degrade_at=0.8, initial_latency=2.0)
+    monkeypatch.setattr(pipeline, "admission", controller)
+    monkeypatch.setattr(main, "admission", controller)
+    monkeypatch.setattr(pipeline, "answer_cache", AnswerCache([MemoryCacheBackend(16, 60)]))
+    monkeypatch.setattr(pipeline, "semantic_index", None)
+    return controller
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_estimated_wait_does_not_fit_the_deadline(controller):
+    await controller.acquire()  # a única vaga está ocupada
+
+    # Espera estimada = 1 / 1 vaga × 2s; + 2s de resposta > 3s de deadline
+    with deadline_scope(Deadline(3.0)):
+        with pytest.raises(Overloaded) as info:
+            controller.plan(["gemini"])
+    assert info.value.retry_after_header == "2"
+
+    # Com folga no deadline entra na fila
+    with deadline_scope(Deadline(10.0)):
+        assert controller.plan(["gemini"]) == ["gemini"]
+
+    controller.release("single", 0.5)
+    assert controller.in_flight == 0
+    assert controller.latency("single") == 0.5
+    assert controller.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_queue_is_fifo_and_timeouts_do_not_leak_slots(controller):
+    order = []
+
+    async def call(name: str, seconds: float) -> None:
+        with deadline_scope(Deadline(seconds)):
+            async with controller.slot("single"):
+                order.append(name)
+                await asyncio.sleep(0.02)
+
+    first = asyncio.create_task(call("a", 5.0))
+    await asyncio.sleep(0)
+    timed_out = asyncio.create_task(call("x", 0.001))
+    second = asyncio.create_task(call("b", 5.0))
+    third = asyncio.create_task(call("c", 5.0))
+
+    with pytest.raises(Overloaded):
+        await timed_out
+    await asyncio.gather(first, second, third)
+
+    assert order == ["a", "b", "c"]
+    assert controller.in_flight == 0
+    assert controller.stats()["queued_now"] == 0
+
+
+@pytest.mark.asyncio
+async def test_fusion_is_degraded_under_pressure(controller):
+    async def fake_aggregate(question, providers):
+        return make_response(providers[0])
+
+    await controller.acquire()
+    with patch("app.pipeline.aggregate_answers", new=AsyncMock(side_effect=fake_aggregate)) as mock_agg:
+        task = asyncio.create_task(pipeline.answer_question("O que é VPC?", ["fusion"]))
+        await asyncio.sleep(0.01)
+        controller.release("single", 0.1)
+        result, status = await task
+
+    assert mock_agg.await_args.args[1] == ["huggingface"]
+    assert result.degraded_from == "fusion"
+    assert status == "MISS"
+    assert controller.stats()["degraded"] == 1
+
+    # Sem pressão, o fusion segue como pedido
+    with patch("app.pipeline.aggregate_answers", new=AsyncMock(side_effect=fake_aggregate)) as mock_agg:
+        result, _ = await pipeline.answer_question("O que é IAM?", ["fusion"])
+    assert mock_agg.await_args.args[1] == ["fusion"]
+    assert result.degraded_from is None
+
+
+def test_ask_returns_503_with_retry_after(controller):
+    client = TestClient(main.app)
+    controller.in_flight = 1  # vaga ocupada por outra requisição
+
+    response = client.post(
+        "/ask",
+        json={"question": "O que é VPC?", "providers": ["gemini"]},
+        headers={"X-Request-Timeout": "3"},
+    )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+
+    # Cache hit não precisa de vaga
+    pipeline.answer_cache.set(
+        pipeline.cache_key("O que é S3?", "gemini", pipeline.describe_models(["gemini"])),
+        make_response("gemini").model_dump(),
+    )
+    response = client.post("/ask", json={"question": "O que é S3?", "providers": ["gemini"]})
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "HIT"
+
+
+def test_stream_waits_for_the_slot_before_sending_headers(controller, monkeypatch):
+    controller.initial_latency = 0.1
+    controller.in_flight = 1  # vaga ocupada por outra requisição
+    client = TestClient(main.app)
+
+    # Entra na fila, mas a vaga não chega dentro do deadline: 503, não um stream com erro
+    response = client.post(
+        "/ask/stream",
+        json={"question": "O que é VPC?", "providers": ["gemini"]},
+        headers={"X-Request-Timeout": "0.5"},
+    )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert controller.stats()["queued_now"] == 0
+
+    async def fake_stream(question, providers):
+        assert controller.in_flight == 1  # a vaga já é deste stream
+        yield {"event": "final", "data": {"final_answer": "ok"}}
+
+    controller.in_flight = 0
+    monkeypatch.setattr(main, "stream_answers", fake_stream)
+    response = client.post("/ask/stream", json={"question": "O que é VPC?", "providers": ["gemini"]})
+    assert response.status_code == 200
+    assert "event: final" in response.text
+    assert controller.in_flight == 0
+    assert controller.stats()["admitted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_slot_is_released_even_if_the_body_never_starts(controller):
+    admitted = await controller.admit_stream("single")
+    assert controller.in_flight == 1
+
+    async def events():
+        yield {"event": "final", "data": {}}
+
+    response = ReleasingStreamingResponse(admitted.events(events()), on_close=admitted.release)
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("cliente saiu")  # antes do primeiro byte
+
+    with pytest.raises(Exception):
+        await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+    assert controller.in_flight == 0
+    admitted.release()  # idempotente
+    assert controller.in_flight == 0
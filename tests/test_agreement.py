@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.aggregator import aggregate_answers, fusion_stats
+from app.agreement import merge_answers, similarity
+from app.breaker import reset_breakers
+
+EC2_GEMINI = (
+    "O Amazon EC2 fornece capacidade computacional redimensionável na nuvem. "
+    "Você paga apenas pelo que usa."
+)
+EC2_HF = (
+    "O Amazon EC2 fornece capacidade computacional redimensionável na nuvem. "
+    "Você paga só pelo que usa.\n\n"
+    "Exemplo: t3.micro."
+)
+
+
+def test_similarity_separates_agreeing_and_different_answers():
+    assert similarity(EC2_GEMINI, EC2_GEMINI) == 1.0
+    assert similarity(EC2_GEMINI, EC2_HF) >= 0.6
+    assert similarity(EC2_GEMINI, "Lambda roda funções sob demanda, sem servidores.") < 0.2
+    assert similarity("", EC2_GEMINI) == 0.0
+
+
+def test_merge_keeps_base_and_adds_only_new_paragraphs():
+    merged = merge_answers({"gemini": EC2_GEMINI, "huggingface": EC2_HF}, threshold=0.7)
+
+    assert merged.startswith(EC2_HF.split("\n\n")[0])
+    assert "t3.micro" in merged
+    assert "paga apenas" not in merged
+
+
+@pytest.mark.asyncio
+async def test_fusion_skips_reasoner_when_answers_agree(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "fake-key")
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+    monkeypatch.setenv("FUSION_AGREEMENT_THRESHOLD", "0.6")
+    reset_breakers()
+    before = fusion_stats["skipped_agreement"]
+
+    with patch("app.llms.gemini_llm.GeminiLLM.ask", new=AsyncMock(return_value=EC2_GEMINI)), \
+         patch("app.llms.huggingface_llm.HuggingFaceLLM.ask", new=AsyncMock(return_value=EC2_HF)), \
+         patch("app.llms.gemini_reasoner_llm.GeminiReasonerLLM.synthesize", new_callable=AsyncMock) as mock_reasoner:
+
+        result = await aggregate_answers("Explique EC2 (concordam)", ["fusion"])
+
+    mock_reasoner.assert_not_awaited()
+    assert "t3.micro" in result.final_answer
+    assert result.dropped_providers == []
+    assert fusion_stats["skipped_agreement"] == before + 1
+
+
+@pytest.mark.asyncio
+async def test_fusion_still_synthesizes_when_skip_is_disabled(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "fake-key")
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+    monkeypatch.setenv("FUSION_SKIP_ON_AGREEMENT", "false")
+    reset_breakers()
+
+    with patch("app.llms.gemini_llm.GeminiLLM.ask", new=AsyncMock(return_value=EC2_GEMINI)), \
+         patch("app.llms.huggingface_llm.HuggingFaceLLM.ask", new=AsyncMock(return_value=EC2_GEMINI)), \
+         patch("app.llms.gemini_reasoner_llm.GeminiReasonerLLM.synthesize",
+               new=AsyncMock(return_value="Síntese")) as mock_reasoner:
+
+        result = await aggregate_answers("Explique EC2 (sem atalho)", ["fusion"])
+
+    mock_reasoner.assert_awaited_once()
+    assert result.final_answer == "Síntese"
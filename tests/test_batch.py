@@ -0,0 +1,119 @@
+import asyncio
+import json
+
+import pytest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.batch import ProviderSlots, prepare_output, read_jsonl_questions, run_batch
+from app.main import app
+from app.schemas import AggregatedResponse, BatchQuestion, ProviderAnswer
+
+
+def fake_response(question: str) -> AggregatedResponse:
+    return AggregatedResponse(
+        final_answer=f"R: {question}",
+        answers=[ProviderAnswer(provider="gemini", answer=f"R: {question}")],
+    )
+
+
+@pytest.mark.asyncio
+async def test_run_batch_limits_concurrency_per_provider():
+    running = 0
+    peak = 0
+
+    async def fake_aggregate(question, providers):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return fake_response(question)
+
+    questions = [BatchQuestion(id=f"q{i}", question=f"Pergunta de lote {i}") for i in range(10)]
+
+    with patch("app.pipeline.aggregate_answers", side_effect=fake_aggregate):
+        results = [
+            r async for r in run_batch(questions, ["gemini"], concurrency=6, per_provider=2)
+        ]
+
+    assert peak == 2
+    assert sorted(r.id for r in results) == [f"q{i}" for i in range(10)]
+    assert all(r.error is None for r in results)
+
+
+@pytest.mark.asyncio
+async def test_provider_slots_count_fusion_as_both_providers():
+    slots = ProviderSlots(per_provider=1)
+
+    async with slots.hold(["fusion"]):
+        assert slots._semaphore("gemini").locked()
+        assert slots._semaphore("huggingface").locked()
+    assert not slots._semaphore("gemini").locked()
+
+
+@pytest.mark.asyncio
+async def test_run_batch_reports_errors_per_question():
+    questions = [BatchQuestion(id="x", question="Pergunta inválida", providers=["inexistente"])]
+
+    results = [r async for r in run_batch(questions, ["gemini"])]
+
+    assert results[0].response is None
+    assert results[0].error.startswith("ValueError")
+
+
+def test_ask_batch_endpoint_streams_ndjson():
+    async def fake_aggregate(question, providers):
+        return fake_response(question)
+
+    payload = {
+        "providers": ["gemini"],
+        "questions": [
+            {"id": "iam", "question": "O que é IAM? (lote)"},
+            {"question": "O que é SQS? (lote)"},
+        ],
+    }
+
+    with patch("app.pipeline.aggregate_answers", side_effect=fake_aggregate):
+        response = TestClient(app).post("/ask/batch", json=payload)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    # Sem id, a pergunta é identificada pela posição no lote
+    assert {line["id"] for line in lines} == {"iam", "1"}
+    assert {line["index"] for line in lines} == {0, 1}
+    assert all(line["response"]["final_answer"].startswith("R: ") for line in lines)
+
+
+def test_jsonl_resume_skips_answered_and_repairs_truncated_line(tmp_path):
+    source = tmp_path / "perguntas.jsonl"
+    source.write_text(
+        '{"request_id": "a", "title": "t", "body": "O que é EC2?"}\n'
+        '{"question": "O que é S3?"}\n',
+        encoding="utf-8",
+    )
+    questions = read_jsonl_questions(str(source))
+    assert [(q.id, q.question) for q in questions] == [("a", "O que é EC2?"), ("2", "O que é S3?")]
+
+    output = tmp_path / "respostas.jsonl"
+    done_line = json.dumps({
+        "id": "a",
+        "response": {"final_answer": "ok", "answers": [{"provider": "gemini", "answer": "ok"}]},
+        "error": None,
+    })
+    # Sem o campo error, mas com a mensagem de erro do provider como resposta
+    failed_line = json.dumps({
+        "id": "b",
+        "response": {
+            "final_answer": "Erro inesperado no Gemini: 503",
+            "answers": [{"provider": "gemini", "answer": "Erro inesperado no Gemini: 503"}],
+        },
+        "error": None,
+    })
+    output.write_text(done_line + "\n" + failed_line + '\n{"id": "2", "respo', encoding="utf-8")
+
+    assert prepare_output(str(output)) == {"a"}
+    assert output.read_text(encoding="utf-8").endswith("\n")
@@ -0,0 +1,114 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.aggregator import aggregate_answers, stream_answers
+from app.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, get_breaker, reset_breakers
+from app.main import app
+
+
+@pytest.fixture(autouse=True)
+def clean_breakers():
+    reset_breakers()
+    yield
+    reset_breakers()
+
+
+def test_breaker_opens_on_error_rate_and_recovers_after_probe():
+    breaker = CircuitBreaker("hf", min_calls=3, error_rate=0.5, open_seconds=0.0)
+
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    assert breaker.health_score() == 0.0
+
+    # open_seconds=0: a próxima chamada vira a única chamada de teste
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_breaker_fails_fast_while_open_and_counts_slow_calls():
+    breaker = CircuitBreaker(
+        "gemini", min_calls=2, slow_call_seconds=1.0, slow_call_rate=0.5, open_seconds=60
+    )
+    breaker.record(True, 5.0)
+    breaker.record(True, 5.0)
+
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fusion_does_not_synthesize_error_answers(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "fake-key")
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+
+    with patch("app.llms.gemini_llm.GeminiLLM.ask", new=AsyncMock(return_value="Resp Gemini")), \
+         patch("app.llms.huggingface_llm.HuggingFaceLLM.ask",
+               new=AsyncMock(return_value="[ERRO HuggingFace] HTTP 503: indisponível")), \
+         patch("app.llms.gemini_reasoner_llm.GeminiReasonerLLM.synthesize", new_callable=AsyncMock) as mock_reasoner:
+
+        result = await aggregate_answers("Explique EC2 (HF fora)", ["fusion"])
+
+    assert result.final_answer == "Resp Gemini"
+    assert result.dropped_providers == ["huggingface"]
+    assert len(result.answers) == 2
+    mock_reasoner.assert_not_awaited()
+    assert get_breaker("huggingface").stats()["error_rate"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_skips_provider_call(monkeypatch):
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+    monkeypatch.setenv("BREAKER_MIN_CALLS", "1")
+
+    get_breaker("huggingface").record(False, 0.1)
+
+    with patch("app.llms.huggingface_llm.HuggingFaceLLM.ask", new_callable=AsyncMock) as mock_hf:
+        result = await aggregate_answers("O que é S3? (breaker)", ["huggingface"])
+
+    mock_hf.assert_not_awaited()
+    assert "Circuit breaker aberto" in result.answers[0].answer
+
+
+@pytest.mark.asyncio
+async def test_stream_goes_through_the_breaker(monkeypatch):
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+    monkeypatch.setenv("BREAKER_MIN_CALLS", "1")
+    called = False
+
+    async def failing_stream(self, prompt):
+        nonlocal called
+        called = True
+        yield "[ERRO HuggingFace] HTTP 503: indisponível"
+
+    with patch("app.llms.huggingface_llm.HuggingFaceLLM.stream", new=failing_stream):
+        [event async for event in stream_answers("O que é S3? (stream)", ["huggingface"])]
+        assert called
+        assert get_breaker("huggingface").state == OPEN
+
+        called = False
+        events = [event async for event in stream_answers("O que é S3? (stream)", ["huggingface"])]
+
+    assert not called
+    assert "Circuit breaker aberto" in events[-1]["data"]["answers"][0]["answer"]
+
+
+def test_health_details_show_breaker_state():
+    get_breaker("gemini").record(True, 0.2)
+    client = TestClient(app)
+
+    assert client.get("/health").json() == {"status": "ok"}
+
+    body = client.get("/health", params={"details": "true"}).json()
+    assert body["status"] == "ok"
+    assert body["providers"]["gemini"]["state"] == CLOSED
+    assert body["providers"]["gemini"]["health_score"] == 1.0
@@ -0,0 +1,133 @@
+import threading
+import time
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+
+from app import pipeline
+from app.cache import (
+    AnswerCache,
+    MemoryCacheBackend,
+    SQLiteCacheBackend,
+    cache_key,
+    normalize_question,
+)
+from app.main import app
+from app.schemas import AggregatedResponse, ProviderAnswer
+from app.semantic_cache import SemanticIndex
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    cache = AnswerCache([MemoryCacheBackend(max_entries=16, ttl=60)])
+    monkeypatch.setattr(pipeline, "answer_cache", cache)
+    monkeypatch.setattr(pipeline, "semantic_index", SemanticIndex(capacity=64))
+    monkeypatch.setattr("app.main.answer_cache", cache)
+    return cache
+
+
+def test_normalize_question_and_key():
+    assert normalize_question("  O que é   VPC? ") == normalize_question("o que é vpc")
+
+    models = {"gemini": "gemini-2.5-flash"}
+    assert cache_key("O que é VPC?", "gemini", models) == cache_key("o que é vpc", "gemini", models)
+    assert cache_key("O que é VPC?", "gemini", models) != cache_key("O que é VPC?", "fusion", models)
+    assert cache_key("O que é VPC?", "gemini", models) != cache_key(
+        "O que é VPC?", "gemini", {"gemini": "gemini-2.5-pro"}
+    )
+
+
+def test_memory_backend_is_bounded_lru_with_ttl(monkeypatch):
+    backend = MemoryCacheBackend(max_entries=2, ttl=10)
+    backend.set("a", {"v": 1})
+    backend.set("b", {"v": 2})
+    backend.get("a")            # "a" passa a ser o mais recente
+    backend.set("c", {"v": 3})  # "b" é removido
+
+    assert backend.get("b") is None
+    assert backend.get("a") == {"v": 1}
+
+    now = time.monotonic()
+    monkeypatch.setattr("app.cache.time.monotonic", lambda: now + 11)
+    assert backend.get("a") is None
+
+
+def test_sqlite_backend_survives_restart(tmp_path):
+    path = str(tmp_path / "answers.db")
+    first = SQLiteCacheBackend(path, ttl=60)
+    first.set("k", {"final_answer": "ok", "answers": []})
+    first.close()
+
+    cache = AnswerCache([MemoryCacheBackend(8, 60), SQLiteCacheBackend(path, ttl=60)])
+    assert cache.get("k") == {"final_answer": "ok", "answers": []}
+    # Promovido para a memória
+    assert cache.backends[0].get("k") is not None
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_async_io_runs_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "answers.db")
+    sqlite_backend = SQLiteCacheBackend(path, ttl=60)
+    cache = AnswerCache([MemoryCacheBackend(8, 60), sqlite_backend])
+
+    threads = set()
+    original_get, original_set = sqlite_backend.get, sqlite_backend.set
+
+    def tracked_get(key):
+        threads.add(threading.get_ident())
+        return original_get(key)
+
+    def tracked_set(key, value):
+        threads.add(threading.get_ident())
+        original_set(key, value)
+
+    sqlite_backend.get, sqlite_backend.set = tracked_get, tracked_set
+
+    await cache.set_async("k", {"final_answer": "ok", "answers": []})
+    cache.backends[0].clear()
+    assert await cache.get_async("k") == {"final_answer": "ok", "answers": []}
+    assert cache.backends[0].get("k") is not None
+
+    assert threads and threading.get_ident() not in threads
+    sqlite_backend.close()
+
+
+def test_ask_endpoint_hit_miss_and_bypass(fresh_cache, monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "fake-key")
+    client = TestClient(app)
+    body = {"question": "O que é VPC?", "providers": ["gemini"]}
+
+    with patch("app.llms.gemini_llm.GeminiLLM.ask", new_callable=AsyncMock) as mock_ask:
+        mock_ask.return_value = "Resposta VPC"
+
+        first = client.post("/ask", json=body)
+        second = client.post("/ask", json={**body, "question": "o que é vpc"})
+        bypass = client.post("/ask", json=body, headers={"X-Cache-Bypass": "1"})
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert bypass.headers["X-Cache"] == "BYPASS"
+    assert second.json() == first.json()
+    assert mock_ask.await_count == 2
+
+    stats = client.get("/cache/stats").json()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["bypasses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_error_answers_are_not_cached(fresh_cache):
+    failed = AggregatedResponse(
+        final_answer="HUGGINGFACE: [ERRO HuggingFace] HTTP 429: rate limit",
+        answers=[ProviderAnswer(provider="huggingface", answer="[ERRO HuggingFace] HTTP 429: rate limit")],
+    )
+
+    with patch("app.pipeline.aggregate_answers", new_callable=AsyncMock) as mock_agg:
+        mock_agg.return_value = failed
+        await pipeline.answer_question("O que é S3?", ["huggingface"])
+        _, status = await pipeline.answer_question("O que é S3?", ["huggingface"])
+
+    assert status == "MISS"
+    assert mock_agg.await_count == 2
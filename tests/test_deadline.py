@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.aggregator import aggregate_answers, stream_answers
+from app.deadline import Deadline, deadline_scope, request_deadline
+from app.http_client import provider_timeout
+
+
+def test_request_deadline_from_header_is_capped(monkeypatch):
+    monkeypatch.setenv("ASK_DEADLINE_SECONDS", "20")
+    monkeypatch.setenv("ASK_DEADLINE_MAX_SECONDS", "30")
+
+    assert request_deadline({}).budget == 20
+    assert request_deadline({"X-Request-Timeout": "5"}).budget == 5
+    assert request_deadline({"X-Request-Timeout": "120"}).budget == 30
+    assert request_deadline({"X-Request-Timeout": "abc"}).budget == 20
+    assert request_deadline({"X-Request-Timeout": "nan"}).budget == 20
+    assert request_deadline({"X-Request-Timeout": "inf"}).budget == 20
+
+
+def test_provider_timeout_never_exceeds_remaining_budget():
+    with deadline_scope(Deadline(2.0)):
+        assert provider_timeout("huggingface").read <= 2.0
+    assert provider_timeout("huggingface").read == 40.0
+
+
+async def slow_hf(question):
+    await asyncio.sleep(0.5)
+    return "Resp HF"
+
+
+@pytest.mark.asyncio
+async def test_fusion_drops_slow_provider_and_skips_synthesis(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "fake-key")
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+
+    with patch("app.llms.gemini_llm.GeminiLLM.ask", new_callable=AsyncMock) as mock_gemini, \
+         patch("app.llms.huggingface_llm.HuggingFaceLLM.ask", new=AsyncMock(side_effect=slow_hf)), \
+         patch("app.llms.gemini_reasoner_llm.GeminiReasonerLLM.synthesize", new_callable=AsyncMock) as mock_reasoner:
+
+        mock_gemini.return_value = "Resp Gemini"
+
+        with deadline_scope(Deadline(0.3)):
+            result = await aggregate_answers("Explique EC2 (deadline)", ["fusion"])
+
+    assert result.final_answer == "Resp Gemini"
+    assert result.dropped_providers == ["huggingface"]
+    assert [a.provider for a in result.answers] == ["gemini"]
+    mock_reasoner.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_fusion_falls_back_when_reasoner_misses_deadline(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "fake-key")
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+    monkeypatch.setenv("FUSION_MIN_SYNTHESIS_SECONDS", "0")
+
+    async def slow_synthesis(question, gemini, hf):
+        await asyncio.sleep(1)
+        return "nunca chega"
+
+    with patch("app.llms.gemini_llm.GeminiLLM.ask", new=AsyncMock(return_value="Resp Gemini")), \
+         patch("app.llms.huggingface_llm.HuggingFaceLLM.ask", new=AsyncMock(return_value="Resp HF")), \
+         patch("app.llms.gemini_reasoner_llm.GeminiReasonerLLM.synthesize", new=AsyncMock(side_effect=slow_synthesis)):
+
+        with deadline_scope(Deadline(0.3)):
+            result = await aggregate_answers("Explique EC2 (reasoner lento)", ["fusion"])
+
+    assert result.final_answer == "Resp Gemini"
+    assert result.dropped_providers == ["gemini_reasoner"]
+    assert len(result.answers) == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_drops_provider_and_reasoner_past_the_deadline(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "fake-key")
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+    monkeypatch.setenv("FUSION_PROVIDERS", "gemini,huggingface,deepseek_chat")
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "fake-key")
+    monkeypatch.setenv("FUSION_MIN_SYNTHESIS_SECONDS", "0")
+
+    texts = {
+        "GeminiLLM": "Resp EC2 são máquinas virtuais cobradas por segundo.",
+        "HuggingFaceLLM": "Resp Instâncias com AMI, tipo e security group definidos no launch.",
+    }
+
+    async def fast_stream(self, prompt):
+        yield texts[type(self).__name__]
+
+    async def slow_stream(self, prompt):
+        yield "começo"
+        await asyncio.sleep(5)
+        yield "nunca chega"
+
+    async def slow_synthesis(self, question, *answers):
+        yield "Síntese "
+        await asyncio.sleep(5)
+        yield "nunca chega"
+
+    with patch("app.llms.gemini_llm.GeminiLLM.stream", new=fast_stream), \
+         patch("app.llms.huggingface_llm.HuggingFaceLLM.stream", new=fast_stream), \
+         patch("app.llms.deepseek_chat_llm.DeepSeekChatLLM.stream", new=slow_stream), \
+         patch("app.llms.gemini_reasoner_llm.GeminiReasonerLLM.stream_synthesis", new=slow_synthesis):
+
+        started = time.monotonic()
+        with deadline_scope(Deadline(0.5)):
+            events = [event async for event in stream_answers("Explique EC2 (stream lento)", ["fusion"])]
+        elapsed = time.monotonic() - started
+
+    assert elapsed < 2
+    errors = {e["provider"]: e["data"] for e in events if e["event"] == "error"}
+    assert "deadline estourado" in errors["deepseek_chat"]
+    assert "reasoner" in errors
+
+    final = events[-1]["data"]
+    assert final["dropped_providers"] == ["deepseek_chat", "gemini_reasoner"]
+    assert final["final_answer"].startswith("Resp ")
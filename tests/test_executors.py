@@ -0,0 +1,46 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.executors import ProviderExecutor
+
+
+class GatedLock:
+    """Lock que segura a thread do pool na entrada, até o teste liberar."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.worker_waiting = threading.Event()
+        self.gate = threading.Event()
+
+    def __enter__(self):
+        if threading.current_thread().name.startswith("gated-worker"):
+            self.worker_waiting.set()
+            self.gate.wait()
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+
+
+@pytest.mark.asyncio
+async def test_cancel_while_the_task_is_starting_decrements_queued_once():
+    executor = ProviderExecutor("gated", 1)
+    lock = GatedLock()
+    executor._lock = lock
+
+    future = executor.submit(lambda: "ok")
+    # A thread já pegou a tarefa, mas ainda não descontou da fila
+    await asyncio.get_running_loop().run_in_executor(None, lock.worker_waiting.wait)
+
+    future.cancel()
+    await asyncio.sleep(0)  # o callback de cancelamento roda primeiro
+    lock.gate.set()
+
+    while executor.stats()["completed"] < 1:
+        await asyncio.sleep(0.001)
+
+    assert executor.stats()["queued"] == 0
+    executor.shutdown()
@@ -0,0 +1,109 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.aggregator import aggregate_answers, stream_answers
+from app.llms.gemini_reasoner_llm import GeminiReasonerLLM
+
+
+@pytest.fixture(autouse=True)
+def provider_keys(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "fake-key")
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+    monkeypatch.setenv("DEEPSEEK_API_KEY", "fake-key")
+
+
+@pytest.mark.asyncio
+async def test_quorum_cancels_stragglers_and_synthesizes_the_fastest(monkeypatch):
+    monkeypatch.setenv("FUSION_PROVIDERS", "gemini,huggingface,deepseek_chat")
+    monkeypatch.setenv("FUSION_QUORUM", "2")
+    cancelled = asyncio.Event()
+
+    async def slow_deepseek(prompt):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return "nunca chega"
+
+    with patch("app.llms.gemini_llm.GeminiLLM.ask", new=AsyncMock(return_value="Resp Gemini")), \
+         patch("app.llms.huggingface_llm.HuggingFaceLLM.ask", new=AsyncMock(return_value="Resp HF")), \
+         patch("app.llms.deepseek_chat_llm.DeepSeekChatLLM.ask", new=AsyncMock(side_effect=slow_deepseek)), \
+         patch("app.llms.gemini_reasoner_llm.GeminiReasonerLLM.synthesize",
+               new=AsyncMock(return_value="Resp Final")) as mock_reasoner:
+
+        started = time.monotonic()
+        result = await aggregate_answers("Explique EC2 (quorum)", ["fusion"])
+
+    assert time.monotonic() - started < 1
+    assert result.final_answer == "Resp Final"
+    assert result.dropped_providers == ["deepseek_chat"]
+    assert [a.provider for a in result.answers] == ["gemini", "huggingface"]
+    mock_reasoner.assert_awaited_once_with("Explique EC2 (quorum)", "Resp Gemini", "Resp HF")
+    # A chamada do provider descartado é cancelada de fato (não segue gastando cota)
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_errors_do_not_count_towards_the_quorum(monkeypatch):
+    monkeypatch.setenv("FUSION_PROVIDERS", "gemini,huggingface,deepseek_chat")
+    monkeypatch.setenv("FUSION_QUORUM", "2")
+    monkeypatch.setenv("FUSION_SYNTHESIZER", "deepseek_reasoner")
+
+    async def later(prompt):
+        await asyncio.sleep(0.05)
+        return "Resp DeepSeek"
+
+    with patch("app.llms.gemini_llm.GeminiLLM.ask", new=AsyncMock(return_value="Resp Gemini")), \
+         patch("app.llms.huggingface_llm.HuggingFaceLLM.ask",
+               new=AsyncMock(return_value="[ERRO HuggingFace] HTTP 503: indisponível")), \
+         patch("app.llms.deepseek_chat_llm.DeepSeekChatLLM.ask", new=AsyncMock(side_effect=later)), \
+         patch("app.llms.deepseek_reasoner_llm.DeepSeekReasonerLLM.synthesize",
+               new=AsyncMock(return_value="Resp Final DeepSeek")) as mock_deepseek, \
+         patch("app.llms.gemini_reasoner_llm.GeminiReasonerLLM.synthesize", new_callable=AsyncMock) as mock_gemini:
+
+        result = await aggregate_answers("Explique S3 (quorum com erro)", ["fusion"])
+
+    assert result.final_answer == "Resp Final DeepSeek"
+    assert result.dropped_providers == ["huggingface"]
+    mock_deepseek.assert_awaited_once_with(
+        "Explique S3 (quorum com erro)", "Resp Gemini", "Resp DeepSeek"
+    )
+    mock_gemini.assert_not_awaited()
+
+
+def test_synthesis_prompt_lists_every_answer():
+    prompt = GeminiReasonerLLM.__new__(GeminiReasonerLLM)._build_synthesis_prompt(
+        "O que é IAM?", "um", "dois", "três"
+    )
+
+    assert "3 respostas" in prompt
+    assert "Resposta A:\num" in prompt
+    assert "Resposta C:\ntrês" in prompt
+
+
+@pytest.mark.asyncio
+async def test_stream_quorum_cancels_slow_stream(monkeypatch):
+    monkeypatch.setenv("FUSION_PROVIDERS", "gemini,huggingface")
+    monkeypatch.setenv("FUSION_QUORUM", "1")
+
+    async def fast_stream(self, prompt):
+        yield "Resp Gemini"
+
+    async def slow_stream(self, prompt):
+        yield "Resp "
+        await asyncio.sleep(5)
+        yield "HF"
+
+    with patch("app.llms.gemini_llm.GeminiLLM.stream", new=fast_stream), \
+         patch("app.llms.huggingface_llm.HuggingFaceLLM.stream", new=slow_stream):
+        events = [event async for event in stream_answers("Explique VPC (stream)", ["fusion"])]
+
+    assert {"event": "done", "provider": "gemini", "data": "Resp Gemini"} in events
+    assert any(e["event"] == "error" and e["provider"] == "huggingface" for e in events)
+    final = events[-1]["data"]
+    assert final["final_answer"] == "Resp Gemini"
+    assert final["dropped_providers"] == ["huggingface"]
@@ -78,3 +78,74 @@ def test_gemini_llm_ask_uses_prompt_engineering(monkeypatch):
     # 7) Só para garantir: a temperatura configurada deve ter sido usada
     assert isinstance(dummy_model.last_generation_config, dict)
     assert "temperature" in dummy_model.last_generation_config
+
+
+def test_gemini_llm_rest_backend_uses_shared_pool(monkeypatch):
+    """
+    Backend padrão (REST): nenhuma thread é usada, a chamada vai pelo pool
+    HTTP compartilhado e o texto é extraído do JSON da API.
+    """
+    import httpx
+
+    from app import http_client
+
+    monkeypatch.setenv("GEMINI_API_KEY", "fake-key")
+    monkeypatch.delenv("GEMINI_BACKEND", raising=False)
+
+    seen = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen["url"] = str(request.url)
+        seen["key"] = request.headers.get("x-goog-api-key")
+        return httpx.Response(
+            200,
+            json={"candidates": [{"content": {"parts": [{"text": "RESPOSTA_REST"}]}}]},
+        )
+
+    async def run():
+        shared = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(http_client, "_client", shared)
+        monkeypatch.setattr(http_client, "_client_loop", asyncio.get_running_loop())
+        try:
+            return await GeminiLLM().ask("O que é Cloud Run?")
+        finally:
+            await shared.aclose()
+
+    answer = asyncio.run(run())
+
+    assert answer == "RESPOSTA_REST"
+    assert seen["url"].endswith(":generateContent")
+    assert seen["key"] == "fake-key"
+
+
+def test_gemini_sdk_fallback_uses_dedicated_executor(monkeypatch):
+    """
+    No fallback bloqueante, a chamada roda no pool dedicado do provider,
+    cuja ocupação fica visível em executor_stats().
+    """
+    import threading
+
+    from app.executors import executor_stats
+
+    monkeypatch.setenv("GEMINI_API_KEY", "fake-key")
+    llm = GeminiLLM()
+
+    class DummyResponse:
+        text = "OK"
+
+    class DummyModel:
+        thread_name = None
+
+        def generate_content(self, prompt, generation_config=None):
+            DummyModel.thread_name = threading.current_thread().name
+            return DummyResponse()
+
+    llm._model = DummyModel()  # type: ignore[attr-defined]
+
+    assert asyncio.run(llm.ask("teste")) == "OK"
+    assert DummyModel.thread_name.startswith("gemini-worker")
+
+    stats = executor_stats()["gemini"]
+    assert stats["active"] == 0
+    assert stats["queued"] == 0
+    assert stats["completed"] >= 1
@@ -0,0 +1,81 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import http_client
+from app.http_client import (
+    close_http_client,
+    get_http_client,
+    open_http_client,
+    provider_timeout,
+)
+from app.llms.huggingface_llm import HuggingFaceLLM
+
+
+def test_provider_timeout_uses_defaults_and_env(monkeypatch):
+    monkeypatch.delenv("HUGGINGFACE_TIMEOUT", raising=False)
+    assert provider_timeout("huggingface").read == 40.0
+    assert provider_timeout("deepseek_reasoner").read == 50.0
+
+    monkeypatch.setenv("HUGGINGFACE_TIMEOUT", "12")
+    timeout = provider_timeout("huggingface")
+    assert timeout.read == 12.0
+    assert timeout.connect <= 12.0
+
+
+@pytest.mark.asyncio
+async def test_shared_client_is_reused_until_closed():
+    opened = await open_http_client()
+
+    assert get_http_client() is opened
+    assert get_http_client() is opened
+
+    await close_http_client()
+    assert opened.is_closed
+
+    # Depois de fechado, um novo pool é criado sob demanda
+    fresh = get_http_client()
+    assert fresh is not opened
+    await close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_huggingface_uses_shared_pool(monkeypatch):
+    """
+    O HuggingFaceLLM não deve mais abrir um httpx.AsyncClient próprio:
+    todas as chamadas passam pelo pool compartilhado.
+    """
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(
+            200, json={"choices": [{"message": {"content": "Resposta pool"}}]}
+        )
+
+    shared = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(http_client, "_client", shared)
+    monkeypatch.setattr(http_client, "_client_loop", asyncio.get_running_loop())
+
+    llm = HuggingFaceLLM()
+    first = await llm.ask("O que é VPC?")
+    second = await llm.ask("O que é EC2?")
+
+    assert first == second == "Resposta pool"
+    assert len(calls) == 2
+    assert not shared.is_closed
+
+    await shared.aclose()
+
+
+def test_open_replaces_a_client_from_a_finished_loop():
+    async def open_in_new_loop():
+        return await open_http_client()
+
+    stale = asyncio.run(open_in_new_loop())  # loop encerrado, pool não fechado
+    fresh = asyncio.run(open_in_new_loop())
+    assert fresh is not stale
+    asyncio.run(close_http_client())
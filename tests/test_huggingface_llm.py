@@ -1,6 +1,10 @@
+import asyncio
 import os
+
+import httpx
 import pytest
 
+from app import http_client
 from app.llms.huggingface_llm import HuggingFaceLLM
 
 
@@ -24,3 +28,24 @@ async def test_huggingface_smoke():
 
     assert isinstance(answer, str)
     assert len(answer.strip()) > 0
+
+
+@pytest.mark.asyncio
+async def test_huggingface_uses_configured_api_base(monkeypatch):
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+    monkeypatch.setenv("HUGGINGFACE_API_BASE", "http://127.0.0.1:8900/huggingface/v1/")
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(str(request.url))
+        return httpx.Response(200, json={"choices": [{"message": {"content": "Stub"}}]})
+
+    shared = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(http_client, "_client", shared)
+    monkeypatch.setattr(http_client, "_client_loop", asyncio.get_running_loop())
+
+    answer = await HuggingFaceLLM().ask("O que é EC2?")
+    await shared.aclose()
+
+    assert answer == "Stub"
+    assert seen == ["http://127.0.0.1:8900/huggingface/v1/chat/completions"]
@@ -0,0 +1,165 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.jobs import DONE, ERROR, QUEUED, RUNNING, JobManager, JobQueueFull, SQLiteJobBackend
+from app.main import app
+from app.schemas import AggregatedResponse, JobStatus, ProviderAnswer
+
+
+def fake_response(question: str) -> AggregatedResponse:
+    return AggregatedResponse(
+        final_answer=f"R: {question}",
+        answers=[ProviderAnswer(provider="gemini", answer=f"R: {question}")],
+    )
+
+
+async def fake_aggregate(question, providers):
+    await asyncio.sleep(0.01)
+    return fake_response(question)
+
+
+async def wait_finished(manager: JobManager, job_id: str, timeout: float = 2.0):
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        job = await manager.get(job_id)
+        if job is not None and job.status in (DONE, ERROR):
+            return job
+        await asyncio.sleep(0.005)
+    raise AssertionError(f"job {job_id} não terminou")
+
+
+def test_job_api_polling_and_websocket():
+    with patch("app.pipeline.aggregate_answers", side_effect=fake_aggregate), \
+            TestClient(app) as client:
+        created = client.post(
+            "/ask/jobs", json={"question": "Pergunta de job via HTTP", "providers": ["gemini"]}
+        )
+        assert created.status_code == 202
+        job_id = created.json()["id"]
+        assert created.headers["location"] == f"/ask/jobs/{job_id}"
+
+        with client.websocket_connect(f"/ask/jobs/{job_id}/ws") as ws:
+            statuses = []
+            while not statuses or statuses[-1]["status"] not in (DONE, ERROR):
+                statuses.append(ws.receive_json())
+
+        assert statuses[-1]["status"] == DONE
+        assert statuses[-1]["response"]["final_answer"] == "R: Pergunta de job via HTTP"
+
+        polled = client.get(f"/ask/jobs/{job_id}").json()
+        assert polled["status"] == DONE
+        assert polled["cache"] == "MISS"
+
+        assert client.get("/ask/jobs/inexistente").status_code == 404
+        assert client.get("/health?details=true").json()["jobs"]["done"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_and_http_answers_503():
+    release = asyncio.Event()
+
+    async def blocked(question, providers):
+        await release.wait()
+        return fake_response(question)
+
+    manager = JobManager(workers=1, max_queue=1, max_stored=100, ttl=60)
+    with patch("app.pipeline.aggregate_answers", side_effect=blocked):
+        first = await manager.submit("Pergunta bloqueada 1", ["gemini"])
+        await asyncio.sleep(0.01)  # o worker pega a primeira
+        second = await manager.submit("Pergunta bloqueada 2", ["gemini"])
+
+        with pytest.raises(JobQueueFull):
+            await manager.submit("Pergunta bloqueada 3", ["gemini"])
+        assert manager.stats()["rejected"] == 1
+
+        release.set()
+        assert (await wait_finished(manager, first.id)).status == DONE
+        assert (await wait_finished(manager, second.id)).status == DONE
+    await manager.stop()
+
+    def full(*args, **kwargs):
+        raise JobQueueFull("Fila de jobs cheia (1 aguardando).")
+
+    with patch("app.main.job_manager.submit", side_effect=full):
+        response = TestClient(app).post(
+            "/ask/jobs", json={"question": "Qualquer", "providers": ["gemini"]}
+        )
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+
+
+@pytest.mark.asyncio
+async def test_finished_jobs_expire_after_ttl():
+    manager = JobManager(workers=1, max_queue=10, max_stored=100, ttl=0.05)
+    with patch("app.pipeline.aggregate_answers", side_effect=fake_aggregate):
+        job = await manager.submit("Pergunta que expira", ["gemini"])
+        await wait_finished(manager, job.id)
+
+    await asyncio.sleep(0.06)
+    assert await manager.get(job.id) is None
+
+    await manager.submit("Outra pergunta", ["gemini"])  # limpa os expirados
+    assert manager.stats()["evicted"] == 1
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_survives_restart(tmp_path):
+    path = str(tmp_path / "jobs.db")
+
+    first = JobManager(workers=1, max_queue=10, max_stored=100, ttl=60, backend=SQLiteJobBackend(path))
+    await first.start()
+    with patch("app.pipeline.aggregate_answers", side_effect=fake_aggregate):
+        done = await first.submit("Pergunta persistida no SQLite", ["gemini"])
+        await wait_finished(first, done.id)
+    await first.stop()
+
+    # Um job que ficou na fila quando o processo caiu
+    pending = done.model_copy(update={"id": "pendente", "status": QUEUED, "question": "Pendente"})
+    await first.backend.save(pending, first.owner)
+    first.backend.close()
+
+    second = JobManager(workers=1, max_queue=10, max_stored=100, ttl=60, backend=SQLiteJobBackend(path))
+    with patch("app.pipeline.aggregate_answers", side_effect=fake_aggregate):
+        await second.start()
+        restored = await second.get(done.id)
+        assert restored.status == DONE
+        assert restored.response.final_answer == "R: Pergunta persistida no SQLite"
+
+        requeued = await wait_finished(second, "pendente")
+        assert requeued.response.final_answer == "R: Pendente"
+    await second.stop()
+    second.backend.close()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_job_is_requeued_by_a_single_worker(tmp_path):
+    path = str(tmp_path / "jobs.db")
+
+    crashed = JobManager(workers=1, max_queue=10, max_stored=100, ttl=60, backend=SQLiteJobBackend(path))
+    job = JobStatus(id="interrompido", status=RUNNING, question="Pendente em vários workers", providers=["gemini"],
+                    created_at=time.time())
+    await crashed.backend.save(job, crashed.owner)
+    crashed.backend.close()
+
+    # Vários workers sobem juntos sobre o mesmo arquivo
+    workers = [
+        JobManager(workers=1, max_queue=10, max_stored=100, ttl=60, backend=SQLiteJobBackend(path))
+        for _ in range(3)
+    ]
+    with patch("app.pipeline.aggregate_answers", side_effect=fake_aggregate) as mock_aggregate:
+        await asyncio.gather(*(worker.start() for worker in workers))
+        owners = [worker for worker in workers if worker.is_local("interrompido")]
+        assert len(owners) == 1
+
+        finished = await wait_finished(owners[0], "interrompido")
+        assert finished.response.final_answer == "R: Pendente em vários workers"
+    assert mock_aggregate.call_count == 1
+
+    for worker in workers:
+        await worker.stop()
+        worker.backend.close()
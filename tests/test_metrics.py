@@ -0,0 +1,70 @@
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.metrics import MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("demo_seconds", "Demo.", ("provider",), buckets=(0.1, 1.0))
+    latency.labels("gemini").observe(0.05)
+    latency.labels("gemini").observe(0.5)
+    latency.labels("gemini").observe(3.0)
+    registry.counter("demo_calls", "Demo.", ("outcome",)).labels('erro "x"').inc()
+
+    text = registry.render()
+
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{provider="gemini",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{provider="gemini",le="1"} 2' in text
+    assert 'demo_seconds_bucket{provider="gemini",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{provider="gemini"} 3' in text
+    assert 'demo_calls_total{outcome="erro \\"x\\""} 1' in text
+
+
+def test_metrics_endpoint_exposes_route_provider_and_cache_metrics(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "fake-key")
+    client = TestClient(app)
+
+    with patch("app.llms.gemini_llm.GeminiLLM.ask", new=AsyncMock(return_value="Resp Gemini")):
+        for _ in range(2):
+            response = client.post(
+                "/ask", json={"question": "O que é KMS? (métricas)", "providers": ["gemini"]}
+            )
+            assert response.status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+    text = response.text
+    assert 'iscoolgpt_http_requests_total{route="/ask",method="POST",mode="single",status="200"}' in text
+    assert 'iscoolgpt_http_request_duration_seconds_bucket{route="/ask",mode="single",le="+Inf"}' in text
+    assert 'iscoolgpt_provider_calls_total{provider="gemini",outcome="ok"}' in text
+    assert 'iscoolgpt_provider_call_duration_seconds_count{provider="gemini"}' in text
+    assert 'iscoolgpt_ask_cache_total{status="HIT"}' in text
+    assert "iscoolgpt_answer_cache_hit_ratio" in text
+    assert 'iscoolgpt_coalescing_calls_total{layer="request",role="leader"}' in text
+    assert 'iscoolgpt_http_requests_in_flight{route="/ask"} 0' in text
+
+
+def test_unknown_paths_share_one_route_label():
+    client = TestClient(app)
+    client.get("/wp-admin/setup.php")
+
+    assert 'route="other",method="GET",mode="-",status="404"' in client.get("/metrics").text
+
+
+def test_parametrized_paths_are_labelled_by_route_template():
+    client = TestClient(app)
+    client.get("/ask/jobs/job-que-nao-existe")
+    client.get("/sessions/sessao-x")
+    client.put("/ask/jobs/outro")
+
+    text = client.get("/metrics").text
+    assert 'route="/ask/jobs/{job_id}",method="GET",mode="-",status="404"' in text
+    assert 'route="/sessions/{session_id}",method="GET"' in text
+    assert 'route="/ask/jobs/{job_id}",method="PUT",mode="-",status="405"' in text
+    assert "job-que-nao-existe" not in text
@@ -0,0 +1,145 @@
+import asyncio
+import time
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.aggregator import aggregate_answers
+from app.breaker import reset_breakers
+from app.deadline import Deadline, deadline_scope
+from app.rate_limit import (
+    ProviderLimiter,
+    RateLimitExceeded,
+    TokenBucket,
+    get_limiter,
+    reset_limiters,
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_limiters():
+    reset_limiters()
+    reset_breakers()
+    yield
+    reset_limiters()
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(per_minute=60)  # 1 ficha por segundo
+    bucket.consume(60)
+
+    assert bucket.time_until(1) == pytest.approx(1.0, abs=0.05)
+    bucket.updated -= 2  # simula 2s passando
+    assert bucket.time_until(1) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_limiter_queues_callers_instead_of_failing():
+    limiter = ProviderLimiter("hf", rpm=600, max_wait=2.0)  # 10 req/s
+    limiter._requests.tokens = 1
+
+    started = time.monotonic()
+    for _ in range(3):
+        async with limiter.slot():
+            pass
+    elapsed = time.monotonic() - started
+
+    assert 0.15 <= elapsed < 1.0
+    stats = limiter.stats()
+    assert stats["admitted"] == 3
+    assert stats["delayed"] == 2
+    assert stats["rejected"] == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_rejects_after_bounded_wait():
+    limiter = ProviderLimiter("hf", rpm=1, max_wait=0.1)
+
+    async with limiter.slot():
+        pass
+
+    with pytest.raises(RateLimitExceeded):
+        async with limiter.slot():
+            pass
+    assert limiter.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_limiter_bounds_concurrency_and_exposes_queue_depth():
+    limiter = ProviderLimiter("gemini", max_concurrency=1, max_wait=1.0)
+    release = asyncio.Event()
+
+    async def hold():
+        async with limiter.slot():
+            await release.wait()
+
+    first = asyncio.create_task(hold())
+    second = asyncio.create_task(hold())
+    await asyncio.sleep(0.01)
+
+    assert limiter.stats()["active"] == 1
+    assert limiter.stats()["queued"] == 1
+
+    release.set()
+    await asyncio.gather(first, second)
+    assert limiter.stats()["max_queued"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_admission_refunds_quota_and_bounds_the_queue_lock():
+    limiter = ProviderLimiter("gemini", rpm=60, tpm=6000, max_concurrency=1, max_wait=0.05)
+    release = asyncio.Event()
+
+    async def hold():
+        async with limiter.slot(tokens=100):
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0.01)
+    # Os baldes só enchem com o tempo: sem devolução ficariam abaixo disto
+    requests_left, tokens_left = limiter._requests.tokens, limiter._tokens.tokens
+
+    # Cota consumida, mas a vaga não chega a tempo: a cota volta para o balde
+    with pytest.raises(RateLimitExceeded):
+        async with limiter.slot(tokens=500):
+            pass
+    assert limiter._requests.tokens >= requests_left
+    assert limiter._tokens.tokens >= tokens_left
+
+    # Cancelado esperando a vaga: idem
+    waiting = asyncio.create_task(hold())
+    await asyncio.sleep(0.01)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert limiter._requests.tokens >= requests_left
+    assert limiter._tokens.tokens >= tokens_left
+
+    # Quem está com a vez da fila não segura os outros além do orçamento deles
+    await limiter._turn.acquire()
+    started = time.monotonic()
+    with pytest.raises(RateLimitExceeded):
+        async with limiter.slot():
+            pass
+    assert time.monotonic() - started < 0.5
+    limiter._turn.release()
+
+    release.set()
+    await holder
+    assert limiter.stats()["rejected"] == 2
+
+
+@pytest.mark.asyncio
+async def test_aggregator_reports_rate_limited_provider(monkeypatch):
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+    monkeypatch.setenv("HUGGINGFACE_RPM", "1")
+
+    with patch("app.llms.huggingface_llm.HuggingFaceLLM.ask", new=AsyncMock(return_value="Resp HF")):
+        with deadline_scope(Deadline(0.2)):
+            first = await aggregate_answers("O que é SNS? (limite 1)", ["huggingface"])
+            second = await aggregate_answers("O que é SNS? (limite 2)", ["huggingface"])
+
+    assert first.answers[0].answer == "Resp HF"
+    assert "RateLimitExceeded" not in first.answers[0].answer
+    assert "Limite de uso" in second.answers[0].answer
+    assert get_limiter("huggingface").stats()["rejected"] == 1
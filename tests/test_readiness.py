@@ -0,0 +1,77 @@
+import subprocess
+import sys
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.llm_base import LLMClient
+from app.main import app
+from app.readiness import is_ready, readiness_report, reset_readiness, run_warm_up
+from app.registry import LazyFactory, ProviderRegistry
+
+
+class ProbeLLM(LLMClient):
+    ENV_VARS = ()
+
+    async def ask(self, prompt: str) -> str:
+        return "ok"
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    reset_readiness()
+    yield
+    reset_readiness()
+
+
+def test_importing_the_app_does_not_import_provider_sdks():
+    code = (
+        "import sys, app.main; "
+        "print('google.generativeai' in sys.modules, 'app.llms.gemini_llm' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "False False"
+
+
+@pytest.mark.asyncio
+async def test_warm_up_builds_only_configured_providers_and_probes(monkeypatch):
+    monkeypatch.setenv("WARMUP_PROVIDERS", "fast, inexistente")
+    monkeypatch.setenv("WARMUP_PROBE", "true")
+    slow = LazyFactory("app.llms.gemini_llm", "GeminiLLM")
+    reg = ProviderRegistry({"fast": LazyFactory(__name__, "ProbeLLM"), "gemini": slow})
+
+    assert not is_ready()
+    await run_warm_up(reg)
+
+    report = readiness_report(reg)
+    assert is_ready()
+    assert report["providers"] == {"fast": "ok"}
+    assert report["probes"]["fast"].startswith("ok")
+    assert report["imports"]["providers"]["fast"]["loaded"] is True
+    assert report["imports"]["providers"]["gemini"] == {
+        "module": "app.llms.gemini_llm", "loaded": False, "import_ms": None,
+    }
+
+
+def test_ready_endpoint_turns_200_after_startup_warm_up(monkeypatch):
+    monkeypatch.setenv("WARMUP_PROVIDERS", "huggingface")
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+
+    assert TestClient(app).get("/ready").status_code == 503
+
+    with TestClient(app) as client:
+        for _ in range(100):
+            response = client.get("/ready")
+            if response.status_code == 200:
+                break
+            time.sleep(0.05)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["ready"] is True
+        assert body["providers"] == {"huggingface": "ok"}
+        assert body["imports"]["app_ms"] > 0
+        # /health continua igual
+        assert client.get("/health").json() == {"status": "ok"}
@@ -0,0 +1,91 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.aggregator import aggregate_answers, registry
+from app.llm_base import LLMClient
+from app.registry import ProviderRegistry
+
+
+class CountingLLM(LLMClient):
+    ENV_VARS = ("FAKE_LLM_MODEL",)
+    builds = 0
+
+    def __init__(self):
+        CountingLLM.builds += 1
+        self.model_name = "modelo-padrao"
+
+    async def ask(self, prompt: str) -> str:
+        return f"{self.model_name}: {prompt}"
+
+
+@pytest.fixture(autouse=True)
+def reset_counter():
+    CountingLLM.builds = 0
+    yield
+
+
+def test_registry_builds_once_and_reuses(monkeypatch):
+    monkeypatch.delenv("FAKE_LLM_MODEL", raising=False)
+    reg = ProviderRegistry({"fake": CountingLLM})
+
+    first = reg.get("fake")
+    second = reg.get("fake")
+
+    assert first is second
+    assert CountingLLM.builds == 1
+
+
+def test_registry_rebuilds_when_env_changes(monkeypatch):
+    reg = ProviderRegistry({"fake": CountingLLM})
+    monkeypatch.setenv("FAKE_LLM_MODEL", "a")
+    first = reg.get("fake")
+
+    monkeypatch.setenv("FAKE_LLM_MODEL", "b")
+    second = reg.get("fake")
+
+    assert first is not second
+    assert CountingLLM.builds == 2
+
+    reg.reload()
+    reg.get("fake")
+    assert CountingLLM.builds == 3
+
+
+def test_registry_override_and_warm_up_errors():
+    class Broken(LLMClient):
+        def __init__(self):
+            raise RuntimeError("CHAVE_FAKE ausente")
+
+        async def ask(self, prompt: str) -> str:  # pragma: no cover
+            return ""
+
+    reg = ProviderRegistry({"fake": CountingLLM}, {"broken": Broken})
+
+    status = reg.warm_up()
+    assert status["fake"] == "ok"
+    assert "CHAVE_FAKE" in status["broken"]
+
+    double = CountingLLM()
+    with reg.override("broken", double):
+        assert reg.get("broken") is double
+
+    with pytest.raises(RuntimeError):
+        reg.get("broken")
+    with pytest.raises(KeyError):
+        reg.get("inexistente")
+
+
+@pytest.mark.asyncio
+async def test_aggregator_reuses_provider_between_requests(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "fake-key")
+    registry.reload()
+
+    with patch("app.llms.gemini_llm.GeminiLLM.ask", new_callable=AsyncMock) as mock_ask:
+        mock_ask.return_value = "ok"
+
+        await aggregate_answers("O que é S3?", ["gemini"])
+        first = registry.get("gemini")
+        await aggregate_answers("O que é IAM?", ["gemini"])
+
+        assert registry.get("gemini") is first
+        assert mock_ask.await_count == 2
@@ -0,0 +1,95 @@
+import gzip
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app import responses
+from app.main import app
+from app.responses import CompressionMiddleware, FastJSONResponse, choose_encoding, model_json
+from app.schemas import AggregatedResponse, ProviderAnswer
+
+BIG_TEXT = "Security Groups são stateful; NACLs são stateless e ficam na subnet. " * 60
+
+
+def build_app() -> FastAPI:
+    test_app = FastAPI(default_response_class=FastJSONResponse)
+    test_app.add_middleware(CompressionMiddleware)
+
+    @test_app.get("/big")
+    async def big():
+        return {"answer": BIG_TEXT}
+
+    @test_app.get("/small")
+    async def small():
+        return {"status": "ok"}
+
+    @test_app.get("/vary")
+    async def vary():
+        return PlainTextResponse(BIG_TEXT, headers={"Vary": "Origin"})
+
+    @test_app.get("/stream")
+    async def stream():
+        async def events():
+            for _ in range(3):
+                yield f"data: {BIG_TEXT}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return test_app
+
+
+def test_choose_encoding(monkeypatch):
+    monkeypatch.setattr(responses, "brotli", object())
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("gzip, br;q=0.5") == "gzip"
+    assert choose_encoding("br;q=0, gzip") == "gzip"
+    assert choose_encoding("*") == "br"
+    assert choose_encoding("identity") is None
+
+    monkeypatch.setattr(responses, "brotli", None)
+    assert choose_encoding("br") is None
+    assert choose_encoding("br, gzip") == "gzip"
+
+
+def test_compression_middleware_compresses_only_large_complete_bodies():
+    client = TestClient(build_app())
+    headers = {"Accept-Encoding": "gzip"}
+
+    big = client.get("/big", headers=headers)
+    assert big.headers["content-encoding"] == "gzip"
+    assert big.json() == {"answer": BIG_TEXT}  # o httpx descomprime
+    assert int(big.headers["content-length"]) < len(BIG_TEXT) / 5
+
+    assert "content-encoding" not in client.get("/small", headers=headers).headers
+    assert "content-encoding" not in client.get("/big", headers={"Accept-Encoding": "identity"}).headers
+    assert client.get("/vary", headers=headers).headers["vary"] == "Origin, Accept-Encoding"
+
+    # Streaming passa direto, sem buffer
+    stream = client.get("/stream", headers=headers)
+    assert "content-encoding" not in stream.headers
+    assert stream.text.count("data: ") == 3
+
+
+def test_fast_json_matches_the_default_output(monkeypatch):
+    pytest.importorskip("orjson")
+    response = AggregatedResponse(
+        final_answer="Ação é stateful", answers=[ProviderAnswer(provider="gemini", answer="é")]
+    )
+    default = model_json(response, exclude={"timings"})
+
+    monkeypatch.setenv("FAST_JSON", "true")
+    assert model_json(response, exclude={"timings"}) == default
+    assert json.loads(model_json(response)) == response.model_dump()
+
+    client = TestClient(app)
+    health = client.get("/health")
+    assert health.content == b'{"status":"ok"}'
+
+
+def test_gzip_output_is_deterministic():
+    body = BIG_TEXT.encode("utf-8")
+    assert responses.compress(body, "gzip") == responses.compress(body, "gzip")
+    assert gzip.decompress(responses.compress(body, "gzip")) == body
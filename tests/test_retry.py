@@ -0,0 +1,160 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app import http_client
+from app.deadline import Deadline, deadline_scope
+from app.llms.gemini_rest import GeminiAPIError
+from app.llms.huggingface_llm import HuggingFaceLLM
+from app.retry import classify, parse_retry_after, retry_stats, reset_retry_state, with_retries
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setenv("RETRY_BASE_DELAY", "0.001")
+    monkeypatch.setenv("RETRY_MAX_DELAY", "0.01")
+    reset_retry_state()
+    yield
+    reset_retry_state()
+
+
+def test_classify_only_retries_transient_failures():
+    assert classify(httpx.Response(429, headers={"Retry-After": "2"})) == (True, 2.0)
+    assert classify(httpx.Response(503)) == (True, None)
+    assert classify(httpx.Response(400)) == (False, None)
+    assert classify(httpx.ConnectError("reset")) == (True, None)
+    assert classify(httpx.ReadTimeout("lento")) == (False, None)
+    assert classify(GeminiAPIError(503, "overloaded")) == (True, None)
+    assert classify(GeminiAPIError(403, "chave inválida")) == (False, None)
+
+
+def test_parse_retry_after_accepts_seconds_and_http_dates():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("amanhã") is None
+
+
+@pytest.mark.asyncio
+async def test_huggingface_retries_429_and_honors_retry_after(monkeypatch):
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+    statuses = [429, 503, 200]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = statuses.pop(0)
+        if status != 200:
+            return httpx.Response(status, headers={"Retry-After": "0"}, text="ocupado")
+        return httpx.Response(200, json={"choices": [{"message": {"content": "Resposta"}}]})
+
+    shared = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(http_client, "_client", shared)
+    monkeypatch.setattr(http_client, "_client_loop", asyncio.get_running_loop())
+
+    answer = await HuggingFaceLLM().ask("O que é VPC?")
+    await shared.aclose()
+
+    assert answer == "Resposta"
+    stats = retry_stats()["providers"]["huggingface"]
+    assert stats["attempts"] == 3
+    assert stats["retries"] == 2
+    assert stats["recovered"] == 1
+
+
+@pytest.mark.asyncio
+async def test_gemini_reasoner_sdk_retries_transient_errors(monkeypatch):
+    from app.llms.gemini_reasoner_llm import GeminiReasonerLLM
+
+    monkeypatch.setenv("GEMINI_API_KEY", "fake-key")
+
+    class ServiceUnavailable(Exception):
+        code = 503
+
+    class DummyResponse:
+        text = "Síntese"
+
+    class DummyModel:
+        calls = 0
+
+        def generate_content(self, prompt, generation_config=None):
+            DummyModel.calls += 1
+            if DummyModel.calls == 1:
+                raise ServiceUnavailable("overloaded")
+            return DummyResponse()
+
+    reasoner = GeminiReasonerLLM()
+    reasoner._model = DummyModel()
+
+    assert await reasoner.synthesize("O que é VPC?", "A", "B") == "Síntese"
+    assert DummyModel.calls == 2
+    assert retry_stats()["providers"]["gemini_reasoner"]["recovered"] == 1
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_attempts_and_returns_last_response(monkeypatch):
+    monkeypatch.setenv("RETRY_MAX_ATTEMPTS", "2")
+    calls = 0
+
+    async def attempt():
+        nonlocal calls
+        calls += 1
+        return httpx.Response(502)
+
+    response = await with_retries("deepseek_chat", attempt)
+
+    assert response.status_code == 502
+    assert calls == 2
+    assert retry_stats()["providers"]["deepseek_chat"]["gave_up"] == 1
+
+
+@pytest.mark.asyncio
+async def test_does_not_retry_past_the_deadline():
+    calls = 0
+
+    async def attempt():
+        nonlocal calls
+        calls += 1
+        return httpx.Response(429, headers={"Retry-After": "5"})
+
+    with deadline_scope(Deadline(1.0)):
+        response = await with_retries("gemini", attempt)
+
+    assert response.status_code == 429
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_after_above_max_delay_gives_up(monkeypatch):
+    monkeypatch.setenv("RETRY_MAX_DELAY", "2")
+    calls = 0
+
+    async def attempt():
+        nonlocal calls
+        calls += 1
+        return httpx.Response(503, headers={"Retry-After": "3600"})
+
+    # Sem deadline: sem o teto, ficaria uma hora dormindo
+    started = time.monotonic()
+    response = await with_retries("gemini", attempt)
+
+    assert response.status_code == 503
+    assert calls == 1
+    assert time.monotonic() - started < 1.0
+    assert retry_stats()["providers"]["gemini"]["retries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_global_budget_stops_retry_amplification(monkeypatch):
+    monkeypatch.setenv("RETRY_BUDGET_MIN", "1")
+    monkeypatch.setenv("RETRY_BUDGET_RATIO", "0")
+
+    async def attempt():
+        raise httpx.ConnectError("conexão recusada")
+
+    for _ in range(3):
+        with pytest.raises(httpx.ConnectError):
+            await with_retries("huggingface", attempt)
+
+    stats = retry_stats()
+    assert stats["providers"]["huggingface"]["retries"] == 1
+    assert stats["budget"]["exhausted"] == 3
@@ -0,0 +1,94 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.router import (
+    record_cache_hit,
+    record_llm_calls,
+    reset_router,
+    resolve_providers,
+    router_stats,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_router():
+    reset_router()
+    yield
+    reset_router()
+
+
+def test_definitions_go_to_the_fast_provider_and_comparisons_to_fusion():
+    assert resolve_providers("O que é EC2?", ["auto"]) == ["huggingface"]
+    assert resolve_providers(
+        "Qual a diferença entre Security Groups e NACLs?", ["auto"]
+    ) == ["fusion"]
+    assert resolve_providers("O que é EC2?", ["gemini"]) == ["gemini"]
+
+    stats = router_stats()
+    assert stats["routes"] == {"single": 1, "fusion": 1}
+    # Só a decisão não gasta nada: as chamadas contam quando vão aos providers
+    assert stats["llm_calls"] == 0
+
+    record_llm_calls(["huggingface"])
+    record_llm_calls(["fusion"])
+    stats = router_stats()
+    assert stats["llm_calls"] == 4
+    # Padrão: fusion = 2 providers + síntese; a rota single economizou 2 chamadas
+    assert stats["llm_calls_saved"] == 2
+    assert stats["savings_ratio"] == round(2 / 6, 3)
+
+
+def test_thresholds_and_fast_provider_are_configurable(monkeypatch):
+    monkeypatch.setenv("ROUTER_FUSION_THRESHOLD", "3")
+    monkeypatch.setenv("ROUTER_FAST_PROVIDER", "gemini")
+
+    assert resolve_providers("Qual a diferença entre S3 e EBS?", ["auto"]) == ["gemini"]
+
+    monkeypatch.setenv("ROUTER_FUSION_THRESHOLD", "1")
+    monkeypatch.setenv("ROUTER_LONG_QUESTION_WORDS", "3")
+    assert resolve_providers("Como funciona o Route 53?", ["auto"]) == ["fusion"]
+
+
+def test_popular_questions_escalate_to_fusion():
+    question = "Como funciona o KMS?"
+    assert resolve_providers(question, ["auto"]) == ["huggingface"]
+
+    for _ in range(3):
+        record_cache_hit("como funciona o   KMS")
+
+    assert resolve_providers(question, ["auto"]) == ["fusion"]
+
+
+def test_ask_auto_routes_simple_question_to_single_provider(monkeypatch):
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+    client = TestClient(app)
+
+    with patch("app.llms.huggingface_llm.HuggingFaceLLM.ask",
+               new=AsyncMock(return_value="Resp HF")) as mock_hf:
+        response = client.post(
+            "/ask", json={"question": "O que é CloudFront? (auto)", "providers": ["auto"]}
+        )
+
+    assert response.status_code == 200
+    assert [a["provider"] for a in response.json()["answers"]] == ["huggingface"]
+    mock_hf.assert_awaited_once()
+    assert client.get("/health?details=true").json()["router"]["routes"]["single"] == 1
+
+
+def test_cache_hits_do_not_count_as_llm_calls(monkeypatch):
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+    client = TestClient(app)
+    payload = {"question": "O que é Lambda? (auto, cache)", "providers": ["auto"]}
+
+    with patch("app.llms.huggingface_llm.HuggingFaceLLM.ask",
+               new=AsyncMock(return_value="Resp HF")):
+        assert client.post("/ask", json=payload).headers["X-Cache"] == "MISS"
+        assert client.post("/ask", json=payload).headers["X-Cache"] == "HIT"
+
+    router = client.get("/health?details=true").json()["router"]
+    assert router["routes"]["single"] == 2
+    assert router["llm_calls"] == 1
+    assert router["llm_calls_saved"] == 2
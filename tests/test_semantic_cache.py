@@ -0,0 +1,108 @@
+import time
+
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app import pipeline
+from app.cache import AnswerCache, MemoryCacheBackend
+from app.schemas import AggregatedResponse, ProviderAnswer
+from app.semantic_cache import SemanticIndex, embed, semantic_scope
+
+
+def test_embedding_matches_paraphrases_but_not_other_topics():
+    vpc = embed("o que é uma VPC")
+
+    assert float(vpc @ embed("O que significa VPC?")) >= 0.85
+    assert float(vpc @ embed("o que é EC2")) < 0.5
+    assert float(
+        embed("Diferença entre EC2 e Lambda") @ embed("qual a diferença entre Lambda e EC2?")
+    ) >= 0.85
+    assert float(
+        embed("Diferença entre EC2 e Lambda") @ embed("Diferença entre EC2 e ECS")
+    ) < 0.85
+
+
+def test_negations_and_deployment_words(monkeypatch):
+    # Quase o mesmo vetor, sentido oposto: as negações separam os namespaces
+    assert float(embed("Quando não usar Lambda") @ embed("Quando usar Lambda")) >= 0.85
+    assert semantic_scope("ns", "Quando não usar Lambda") == "ns|não"
+    assert semantic_scope("ns", "Quando nao usar Lambda?") == "ns|não"
+    assert semantic_scope("ns", "Quando usar Lambda") == "ns"
+
+    index = SemanticIndex(capacity=4)
+    index.add(embed("Quando usar Lambda"), semantic_scope("ns", "Quando usar Lambda"), "k-usar")
+    question = "Quando não usar Lambda"
+    assert index.search(embed(question), semantic_scope("ns", question)) is None
+
+    assert float(embed("VPC") @ embed("VPC na AWS")) < 0.85
+    monkeypatch.setenv("SEMANTIC_CACHE_IGNORE_WORDS", "aws, amazon")
+    assert float(embed("VPC") @ embed("VPC na AWS")) == pytest.approx(1.0)
+
+
+def test_index_search_respects_namespace_and_capacity():
+    index = SemanticIndex(capacity=2, threshold=0.85)
+    index.add(embed("o que é VPC"), "gemini", "k-vpc")
+    index.add(embed("o que é S3"), "gemini", "k-s3")
+
+    assert index.search(embed("defina VPC"), "gemini")[0] == "k-vpc"
+    assert index.search(embed("defina VPC"), "fusion") is None
+
+    # Cheio: a entrada usada há mais tempo ("k-s3") sai
+    index.add(embed("o que é IAM"), "gemini", "k-iam")
+    assert len(index) == 2
+    assert index.evictions == 1
+    assert index.search(embed("o que é S3"), "gemini") is None
+    assert index.search(embed("o que é VPC"), "gemini")[0] == "k-vpc"
+
+
+def test_index_save_and_load_roundtrip(tmp_path):
+    path = str(tmp_path / "semantic.npz")
+    index = SemanticIndex(capacity=8)
+    index.add(embed("o que é VPC"), "gemini", "k-vpc")
+    index.save(path)
+
+    restored = SemanticIndex.load(path, capacity=8, threshold=0.85)
+    assert len(restored) == 1
+    assert restored.search(embed("O que é a VPC?"), "gemini")[0] == "k-vpc"
+
+
+def test_index_lookup_is_fast_at_scale():
+    rng = np.random.default_rng(0)
+    size = 20_000
+    vectors = rng.standard_normal((size, 256)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    index = SemanticIndex(capacity=size)
+    for i, vector in enumerate(vectors):
+        index.add(vector, "ns", str(i))
+
+    start = time.perf_counter()
+    for i in range(200):
+        assert index.search(vectors[i], "ns")[0] == str(i)
+    per_lookup = (time.perf_counter() - start) / 200
+
+    assert per_lookup < 0.005
+
+
+@pytest.mark.asyncio
+async def test_pipeline_serves_paraphrase_from_semantic_cache(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "fake-key")
+    monkeypatch.setattr(pipeline, "answer_cache", AnswerCache([MemoryCacheBackend(16, 60)]))
+    monkeypatch.setattr(pipeline, "semantic_index", SemanticIndex(capacity=16))
+
+    response = AggregatedResponse(
+        final_answer="GEMINI: VPC é uma rede virtual",
+        answers=[ProviderAnswer(provider="gemini", answer="VPC é uma rede virtual")],
+    )
+
+    with patch("app.pipeline.aggregate_answers", new_callable=AsyncMock) as mock_agg:
+        mock_agg.return_value = response
+
+        _, first = await pipeline.answer_question("o que é uma VPC", ["gemini"])
+        result, second = await pipeline.answer_question("O que significa VPC?", ["gemini"])
+        _, other = await pipeline.answer_question("o que é EC2", ["gemini"])
+
+    assert (first, second, other) == ("MISS", "SEMANTIC", "MISS")
+    assert result == response
+    assert mock_agg.await_count == 2
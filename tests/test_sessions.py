@@ -0,0 +1,164 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.aggregator import registry
+from app.conversation import Conversation, conversation_scope, openai_history
+from app.llm_base import LLMClient
+from app.llms import gemini_rest
+from app.llms.huggingface_llm import HuggingFaceLLM
+from app.main import app
+from app.rate_limit import estimate_tokens
+from app.sessions import SessionStore, session_store
+
+
+class SummaryLLM(LLMClient):
+    def __init__(self) -> None:
+        self.prompts = []
+
+    async def ask(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return "Aluno estuda VPC e subnets."
+
+
+@pytest.fixture(autouse=True)
+def fresh_sessions():
+    session_store.clear()
+    yield
+    session_store.clear()
+
+
+def test_history_is_sent_as_chat_messages(monkeypatch):
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+    conversation = Conversation("Falamos de VPC.", (("user", "O que é VPC?"), ("assistant", "Uma rede isolada.")))
+
+    with conversation_scope(conversation):
+        messages = HuggingFaceLLM()._build_messages("E subnets?")
+        body = gemini_rest.build_body("E subnets?", 0.3, history=[{"role": "model", "parts": [{"text": "x"}]}])
+
+    assert [m["role"] for m in messages] == ["system", "system", "user", "assistant", "user"]
+    assert messages[1]["content"].endswith("Falamos de VPC.")
+    assert messages[-1]["content"] == "E subnets?"
+    assert [c["role"] for c in body["contents"]] == ["model", "user"]
+
+    # Sem sessão, a requisição continua igual
+    assert [m["role"] for m in HuggingFaceLLM()._build_messages("E subnets?")] == ["system", "user"]
+
+
+def test_ask_with_session_keeps_history_server_side(monkeypatch):
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+    monkeypatch.setenv("SESSION_SUMMARY_PROVIDER", "local")
+    seen = []
+
+    async def fake_ask(self, prompt):
+        seen.append(openai_history())
+        return f"Resposta para: {prompt}"
+
+    client = TestClient(app)
+    with patch.object(HuggingFaceLLM, "ask", new=fake_ask):
+        first = client.post(
+            "/ask", json={"question": "O que é uma VPC?", "providers": ["huggingface"], "session_id": "s1"}
+        )
+        second = client.post(
+            "/ask", json={"question": "E quanto custa?", "providers": ["huggingface"], "session_id": "s1"}
+        )
+
+    assert first.status_code == second.status_code == 200
+    assert seen[0] == []
+    assert seen[1] == [
+        {"role": "user", "content": "O que é uma VPC?"},
+        {"role": "assistant", "content": first.json()["final_answer"]},
+    ]
+    # Resposta que depende do histórico não passa pelo cache
+    assert second.headers["x-cache"] == "SESSION"
+
+    stored = client.get("/sessions/s1").json()
+    assert stored["total_turns"] == 2
+    assert client.delete("/sessions/s1").status_code == 204
+    assert client.get("/sessions/s1").status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_context_stays_bounded_in_long_conversations(monkeypatch):
+    monkeypatch.setenv("SESSION_CONTEXT_TOKENS", "200")
+    monkeypatch.setenv("SESSION_SUMMARY_TOKENS", "60")
+    monkeypatch.setenv("SESSION_SUMMARY_PROVIDER", "local")
+    store = SessionStore(max_sessions=10, ttl=60)
+    session = await store.get_or_create("longa")
+
+    sizes = []
+    for turn in range(40):
+        store.record_turn(session, f"Pergunta {turn} sobre redes na AWS?", "Resposta detalhada. " * 15)
+        await store.drain()
+        context = store.context(session)
+        sizes.append(estimate_tokens(context.summary) + sum(estimate_tokens(t) for _, t in context.turns))
+
+    assert max(sizes) <= 200
+    assert session.summarized_turns > 30
+    assert "Pergunta 3" in session.summary or "Pergunta 39" in session.summary
+    assert store.stats()["summary_fallbacks"] > 0
+    assert store.context(session).turns[0][0] == "user"
+
+
+@pytest.mark.asyncio
+async def test_rolling_summary_uses_the_configured_provider(monkeypatch):
+    monkeypatch.setenv("SESSION_CONTEXT_TOKENS", "200")
+    monkeypatch.setenv("SESSION_SUMMARY_TOKENS", "60")
+    monkeypatch.setenv("SESSION_SUMMARY_PROVIDER", "huggingface")
+    store = SessionStore(max_sessions=10, ttl=60)
+    session = await store.get_or_create("resumo")
+    summarizer = SummaryLLM()
+
+    with registry.override("huggingface", summarizer), conversation_scope(
+        Conversation("não deve vazar", (("user", "x"),))
+    ):
+        for turn in range(6):
+            store.record_turn(session, f"Pergunta {turn} sobre VPC?", "Resposta sobre subnets. " * 10)
+        await store.drain()
+
+    assert session.summary == "Aluno estuda VPC e subnets."
+    assert "Pergunta 0 sobre VPC?" in summarizer.prompts[0]
+    assert "não deve vazar" not in summarizer.prompts[0]
+
+
+def test_jobs_and_batch_reject_session_id():
+    client = TestClient(app)
+
+    job = client.post(
+        "/ask/jobs", json={"question": "E quanto custa?", "providers": ["huggingface"], "session_id": "s1"}
+    )
+    batch = client.post(
+        "/ask/batch", json={"questions": [{"question": "E quanto custa?"}], "session_id": "s1"}
+    )
+    item = client.post(
+        "/ask/batch", json={"questions": [{"question": "E quanto custa?", "session_id": "s1"}]}
+    )
+
+    assert job.status_code == batch.status_code == item.status_code == 422
+    assert "session_id" in job.json()["detail"]
+    assert client.get("/sessions/s1").status_code == 404
+
+
+def test_shutdown_waits_for_pending_summaries():
+    with patch.object(session_store, "drain", new=AsyncMock()) as drain:
+        with TestClient(app):
+            pass
+    drain.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_sessions_expire_and_are_evicted_lru():
+    store = SessionStore(max_sessions=2, ttl=60)
+    await store.get_or_create("a")
+    await store.get_or_create("b")
+    await store.get_or_create("a")
+    await store.get_or_create("c")
+
+    assert await store.get("b") is None
+    assert await store.get("a") is not None
+    assert store.stats()["evicted"] == 1
+
+    expiring = SessionStore(max_sessions=2, ttl=0)
+    await expiring.get_or_create("x")
+    assert await expiring.get("x") is None
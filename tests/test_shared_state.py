@@ -0,0 +1,188 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+
+from app.breaker import OPEN, CircuitBreaker
+from app.cache import AnswerCache, MemoryCacheBackend, SharedCacheBackend
+from app.rate_limit import ProviderLimiter, RateLimitExceeded
+from app.serve import cgroup_cpu_limit
+from app.shared_state import RESPStateBackend, SharedState, SQLiteStateBackend
+from scripts.resp_server import serve
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def sqlite_path(tmp_path):
+    return str(tmp_path / "state.db")
+
+
+@pytest.fixture(scope="module")
+def resp_url():
+    port = free_port()
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    server = loop.create_task(serve("127.0.0.1", port, ready))
+
+    def run() -> None:
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(server)
+        except asyncio.CancelledError:
+            pass
+        loop.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert ready.wait(5)
+    yield f"redis://127.0.0.1:{port}/0"
+    loop.call_soon_threadsafe(server.cancel)
+    thread.join(5)
+
+
+def test_sqlite_bucket_is_shared_between_processes(sqlite_path):
+    # Dois backends no mesmo arquivo = dois workers
+    first = SharedState(SQLiteStateBackend(sqlite_path))
+    second = SharedState(SQLiteStateBackend(sqlite_path))
+
+    assert first.take("rpm", 1, per_minute=3) == 0.0
+    assert second.take("rpm", 1, per_minute=3) == 0.0
+    assert first.take("rpm", 1, per_minute=3) == 0.0
+    assert second.take("rpm", 1, per_minute=3) == pytest.approx(20.0, abs=0.5)
+
+    second.refund("rpm", 1, per_minute=3)
+    assert first.take("rpm", 1, per_minute=3) == 0.0
+
+    first.set("answer", "VPC", ttl=60)
+    assert second.get("answer") == "VPC"
+    second.set("gone", "x", ttl=-1)
+    assert first.get("gone") is None
+
+
+def test_resp_backend_against_local_server(resp_url):
+    state = SharedState(RESPStateBackend(resp_url), prefix="test:")
+    state.backend.clear()
+    assert state.backend.ping()
+
+    state.set("session:1", '{"turns": []}', ttl=60)
+    assert state.get("session:1") == '{"turns": []}'
+    state.delete("session:1")
+    assert state.get("session:1") is None
+
+    # Outra conexão (outro worker) vê o mesmo balde
+    other = SharedState(RESPStateBackend(resp_url), prefix="test:")
+    assert state.take("tpm", 400, per_minute=1000) == 0.0
+    assert other.take("tpm", 500, per_minute=1000) == 0.0
+    assert state.take("tpm", 200, per_minute=1000) > 0
+    other.refund("tpm", 500, per_minute=1000)
+    assert state.take("tpm", 200, per_minute=1000) == 0.0
+    assert state.errors == other.errors == 0
+
+
+def test_unreachable_backend_fails_open():
+    state = SharedState(RESPStateBackend(f"redis://127.0.0.1:{free_port()}/0", timeout=0.1))
+
+    assert state.get("x") is None
+    state.set("x", "1", ttl=60)
+    assert state.take("rpm", 1, per_minute=1) == 0.0
+    assert state.errors == 3
+
+
+def test_answer_cache_is_shared_between_workers(sqlite_path):
+    state = SharedState(SQLiteStateBackend(sqlite_path))
+    worker_a = AnswerCache([MemoryCacheBackend(10, 60), SharedCacheBackend(state, 60)])
+    worker_b = AnswerCache([MemoryCacheBackend(10, 60), SharedCacheBackend(state, 60)])
+
+    worker_a.set("k", {"final_answer": "Ação stateful"})
+    assert worker_b.get("k") == {"final_answer": "Ação stateful"}
+    # Promovido para a memória do worker B
+    assert worker_b.backends[0].get("k") == {"final_answer": "Ação stateful"}
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_and_breaker_hold_across_workers(sqlite_path):
+    state = SharedState(SQLiteStateBackend(sqlite_path))
+    worker_a = ProviderLimiter("hf", rpm=2, max_wait=0.0, shared=state)
+    worker_b = ProviderLimiter("hf", rpm=2, max_wait=0.0, shared=state)
+
+    async with worker_a.slot():
+        pass
+    async with worker_b.slot():
+        pass
+    # Dois workers, mas o limite de 2 RPM vale para os dois juntos
+    with pytest.raises(RateLimitExceeded):
+        async with worker_a.slot():
+            pass
+
+    breaker_a = CircuitBreaker("hf", min_calls=2, open_seconds=30, shared=state, shared_poll_seconds=0)
+    breaker_b = CircuitBreaker("hf", min_calls=2, open_seconds=30, shared=state, shared_poll_seconds=0)
+    for _ in range(2):
+        breaker_a.record(False, 0.1)
+    assert breaker_a.state == OPEN
+
+    await breaker_b.sync_shared()
+    assert not breaker_b.allow()
+    assert breaker_b.state == OPEN
+    assert breaker_b.retry_in() == pytest.approx(30, abs=1)
+
+
+class SlowBackend:
+    """Backend que bloqueia como um SQLite travado no lock do arquivo."""
+
+    name = "slow"
+
+    def __init__(self) -> None:
+        self.data = {}
+        self.threads = set()
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        time.sleep(0.2)
+        return self.data.get(key)
+
+    def set(self, key, value, ttl):
+        self.threads.add(threading.get_ident())
+        time.sleep(0.05)
+        self.data[key] = value
+
+
+@pytest.mark.asyncio
+async def test_backend_io_does_not_block_the_event_loop():
+    backend = SlowBackend()
+    state = SharedState(backend)
+    cache = AnswerCache([MemoryCacheBackend(10, 60), SharedCacheBackend(state, 60)])
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    running = asyncio.create_task(ticker())
+    try:
+        # Gravação sem esperar, seguida de leitura: saem na ordem pedida
+        state.run_soon(lambda: state.set("k", "v", ttl=60))
+        assert await state.run(lambda: state.get("k")) == "v"
+        assert await cache.get_async("outra") is None
+    finally:
+        running.cancel()
+
+    assert ticks >= 20  # o loop seguiu rodando durante os ~0.45s de I/O
+    assert threading.get_ident() not in backend.threads
+
+
+def test_cgroup_cpu_limit(tmp_path):
+    cpu_max = tmp_path / "cpu.max"
+    cpu_max.write_text("150000 100000\n")
+    assert cgroup_cpu_limit(str(cpu_max)) == 1.5
+    cpu_max.write_text("max 100000\n")
+    assert cgroup_cpu_limit(str(cpu_max)) is None
+    assert cgroup_cpu_limit(str(tmp_path / "missing")) is None
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app import pipeline
+from app.cache import AnswerCache, MemoryCacheBackend
+from app.schemas import AggregatedResponse, ProviderAnswer
+from app.semantic_cache import SemanticIndex
+from app.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = 0
+    release = asyncio.Event()
+
+    async def slow_call():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "resposta"
+
+    waiters = [asyncio.create_task(flight.do("k", slow_call)) for _ in range(10)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*waiters) == ["resposta"] * 10
+    assert calls == 1
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 9}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_call():
+    flight = SingleFlight("test")
+    release = asyncio.Event()
+
+    async def slow_call():
+        await release.wait()
+        return "ok"
+
+    leader = asyncio.create_task(flight.do("k", slow_call))
+    follower = asyncio.create_task(flight.do("k", slow_call))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await follower == "ok"
+    assert leader.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_shared_call_is_cancelled_when_every_waiter_gives_up():
+    flight = SingleFlight("test")
+    cancelled = asyncio.Event()
+
+    async def slow_call():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiters = [asyncio.create_task(flight.do("k", slow_call)) for _ in range(2)]
+    await asyncio.sleep(0)
+    for waiter in waiters:
+        waiter.cancel()
+
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    assert flight.in_flight() == 0
+
+    # Quem chega depois começa uma execução nova
+    assert await flight.do("k", AsyncMock(return_value="nova")) == "nova"
+
+
+@pytest.mark.asyncio
+async def test_identical_ask_requests_are_coalesced(monkeypatch):
+    monkeypatch.setattr(pipeline, "answer_cache", AnswerCache([MemoryCacheBackend(16, 60)]))
+    monkeypatch.setattr(pipeline, "semantic_index", SemanticIndex(capacity=16))
+
+    response = AggregatedResponse(
+        final_answer="GEMINI: ok",
+        answers=[ProviderAnswer(provider="gemini", answer="ok")],
+    )
+
+    async def slow_aggregate(question, providers):
+        await asyncio.sleep(0.01)
+        return response
+
+    with patch("app.pipeline.aggregate_answers", new=AsyncMock(side_effect=slow_aggregate)) as mock_agg:
+        results = await asyncio.gather(
+            *[pipeline.answer_question("O que é VPC?", ["gemini"]) for _ in range(5)]
+        )
+
+    statuses = sorted(status for _, status in results)
+    assert statuses == ["COALESCED"] * 4 + ["MISS"]
+    assert mock_agg.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_ready_answer_is_stored_even_if_the_last_waiter_leaves():
+    stored = asyncio.Event()
+    storing = asyncio.Event()
+    response = AggregatedResponse(
+        final_answer="GEMINI: ok",
+        answers=[ProviderAnswer(provider="gemini", answer="ok")],
+    )
+
+    async def slow_store(result):
+        storing.set()
+        await asyncio.sleep(0.05)
+        stored.set()
+
+    with patch("app.pipeline.aggregate_answers", new=AsyncMock(return_value=response)):
+        waiter = asyncio.create_task(
+            pipeline._aggregate_once("k-store", "O que é VPC?", ["gemini"], store=slow_store)
+        )
+        await asyncio.wait_for(storing.wait(), timeout=1)
+        waiter.cancel()
+
+    await asyncio.wait_for(stored.wait(), timeout=1)
+    assert waiter.cancelled()
@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from app import http_client
+from app.aggregator import stream_answers
+from app.llms.huggingface_llm import HuggingFaceLLM
+from app.main import app
+
+
+async def fake_gemini_stream(self, prompt):
+    for chunk in ["Resp ", "Gemini"]:
+        yield chunk
+
+
+async def fake_hf_stream(self, prompt):
+    yield "Resp HF"
+
+
+async def fake_reasoner_stream(self, question, gemini, hf):
+    assert gemini == "Resp Gemini"
+    assert hf == "Resp HF"
+    for chunk in ["Resp ", "Final"]:
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_stream_fusion_events_are_tagged_per_provider(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "fake-key")
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+
+    with patch("app.llms.gemini_llm.GeminiLLM.stream", new=fake_gemini_stream), \
+         patch("app.llms.huggingface_llm.HuggingFaceLLM.stream", new=fake_hf_stream), \
+         patch("app.llms.gemini_reasoner_llm.GeminiReasonerLLM.stream_synthesis", new=fake_reasoner_stream):
+
+        events = [event async for event in stream_answers("Explique EC2", ["fusion"])]
+
+    tokens = [e for e in events if e["event"] == "token"]
+    assert {e["provider"] for e in tokens} == {"gemini", "huggingface", "reasoner"}
+
+    # O reasoner é sempre o último canal
+    reasoner_index = [i for i, e in enumerate(events) if e.get("provider") == "reasoner"]
+    provider_index = [
+        i for i, e in enumerate(events) if e.get("provider") in ("gemini", "huggingface")
+    ]
+    assert min(reasoner_index) > max(provider_index)
+
+    final = events[-1]
+    assert final["event"] == "final"
+    assert final["data"]["final_answer"] == "Resp Final"
+    assert {a["provider"] for a in final["data"]["answers"]} == {"gemini", "huggingface"}
+
+
+def test_ask_stream_endpoint_emits_sse(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "fake-key")
+
+    with patch("app.llms.gemini_llm.GeminiLLM.stream", new=fake_gemini_stream):
+        client = TestClient(app)
+        response = client.post(
+            "/ask/stream", json={"question": "O que é EC2?", "providers": ["gemini"]}
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    blocks = [b for b in response.text.split("\n\n") if b.strip()]
+    names = [b.split("\n")[0].removeprefix("event: ") for b in blocks]
+    assert names == ["token", "token", "done", "final"]
+
+    final = json.loads(blocks[-1].split("\n")[1].removeprefix("data: "))
+    assert final["data"]["final_answer"] == "GEMINI: Resp Gemini"
+
+
+@pytest.mark.asyncio
+async def test_huggingface_stream_parses_chat_completion_chunks(monkeypatch):
+    monkeypatch.setenv("HUGGINGFACE_API_KEY", "fake-key")
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        lines = [
+            'data: {"choices": [{"delta": {"role": "assistant"}}]}',
+            'data: {"choices": [{"delta": {"content": "Olá"}}]}',
+            'data: {"choices": [{"delta": {"content": " mundo"}}]}',
+            "data: [DONE]",
+        ]
+        return httpx.Response(200, text="\n\n".join(lines) + "\n\n")
+
+    shared = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(http_client, "_client", shared)
+    monkeypatch.setattr(http_client, "_client_loop", asyncio.get_running_loop())
+
+    chunks = [chunk async for chunk in HuggingFaceLLM().stream("oi")]
+    await shared.aclose()
+
+    assert chunks == ["Olá", " mundo"]
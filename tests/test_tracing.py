@@ -0,0 +1,65 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import tracing
+from app.main import app
+from app.tracing import span, start_trace
+
+
+def test_ask_reports_stage_durations_in_server_timing(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "fake-key")
+    client = TestClient(app)
+
+    with patch("app.llms.gemini_llm.GeminiLLM.ask", new=AsyncMock(return_value="Resp Gemini")):
+        response = client.post(
+            "/ask", json={"question": "O que é IAM? (tracing)", "providers": ["gemini"]}
+        )
+
+    assert response.status_code == 200
+    timing = response.headers["Server-Timing"]
+    assert "gemini;dur=" in timing
+    assert "total;dur=" in timing
+    # Sem o header de debug, o corpo continua igual ao de antes
+    assert "timings" not in response.json()
+
+
+def test_debug_header_adds_timings_to_the_body(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "fake-key")
+    client = TestClient(app)
+
+    with patch("app.llms.gemini_llm.GeminiLLM.ask", new=AsyncMock(return_value="Resp Gemini")):
+        response = client.post(
+            "/ask",
+            json={"question": "O que é S3? (tracing)", "providers": ["gemini"]},
+            headers={"X-Debug-Timings": "1", "X-Cache-Bypass": "1"},
+        )
+
+    timings = response.json()["timings"]
+    assert {"gemini", "serialize", "total"} <= set(timings)
+    assert timings["gemini"] <= timings["total"]
+
+
+@pytest.mark.asyncio
+async def test_file_exporter_writes_otlp_json_with_parent_spans(monkeypatch, tmp_path):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setenv("TRACING_EXPORTER", "file")
+    monkeypatch.setenv("TRACING_FILE_PATH", str(path))
+
+    with start_trace("POST /ask"):
+        with span("gemini", model="gemini-2.5-flash"):
+            pass
+
+    # A gravação roda em executor; espera terminar antes de ler o arquivo
+    await asyncio.gather(*tracing._pending_exports)
+
+    payload = json.loads(path.read_text(encoding="utf-8").strip())
+    spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    root, child = spans
+    assert root["name"] == "POST /ask" and "parentSpanId" not in root
+    assert child["parentSpanId"] == root["spanId"]
+    assert child["traceId"] == root["traceId"]
+    assert {"key": "model", "value": {"stringValue": "gemini-2.5-flash"}} in child["attributes"]